@@ -7,6 +7,9 @@ class PlanItem(BaseModel):
     path: str = Field(..., description="Relative file path")
     action: str = Field(..., description="create|update|delete")
     content: str | None = None
+    depends_on: List[str] = Field(
+        default_factory=list, description="Paths of items that must apply first"
+    )
 
 
 class Plan(BaseModel):
@@ -5,7 +5,11 @@ ledger_event.py
 Data model for a ledger event in the autonomous Document
 Versioning module. The ledger is an append‑only journal of
 lifecycle operations on ID Cards. Each event contains a type,
-timestamp, ULID reference, and arbitrary additional data.
+timestamp, ULID reference, and arbitrary additional data. Ledgers
+written with hash chaining also record ``prev_hash``, the SHA-256 of
+the previous line. An event committed after a later-stamped one
+keeps its ``timestamp`` and records the time it was ordered at in
+``committed_at``.
 
 While this model does not enforce validation on its own,
 ``id.ledger.append`` is responsible for ensuring events conform
@@ -14,7 +18,7 @@ to the schema in ``schemas/ledger_event.schema.json``.
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 @dataclass
@@ -26,13 +30,38 @@ class LedgerEvent:
     ulid: str
     doc_key: str
     data: Dict[str, Any] = field(default_factory=dict)
+    prev_hash: Optional[str] = None
+    committed_at: Optional[str] = None
+
+    @property
+    def ordered_at(self) -> str:
+        """Time the ledger is ordered by: ``committed_at`` if set, else ``timestamp``."""
+        return self.committed_at or self.timestamp
 
     def to_dict(self) -> Dict[str, Any]:
         """Serialise the event to a dictionary suitable for JSONL."""
-        return {
+        out = {
             "event_type": self.event_type,
             "timestamp": self.timestamp,
             "ulid": self.ulid,
             "doc_key": self.doc_key,
             "data": self.data,
         }
+        if self.prev_hash is not None:
+            out["prev_hash"] = self.prev_hash
+        if self.committed_at is not None:
+            out["committed_at"] = self.committed_at
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LedgerEvent":
+        """Build an event from a decoded JSONL line."""
+        return cls(
+            event_type=data["event_type"],
+            timestamp=data["timestamp"],
+            ulid=data["ulid"],
+            doc_key=data.get("doc_key", ""),
+            data=data.get("data", {}),
+            prev_hash=data.get("prev_hash"),
+            committed_at=data.get("committed_at"),
+        )
@@ -7,11 +7,43 @@ Simple in‑memory representation of a bidirectional ID registry.
 The registry maps ULIDs to human‑readable doc_keys and vice versa.
 It is generated from the authoritative ID cards by the
 ``id.registry.build`` plugin and persisted to YAML for fast lookup.
+
+Besides the key mappings, both registries keep inverted indexes on
+the card fields listed in :data:`INDEXED_FIELDS` so that questions
+such as "active policy docs owned by Platform.Engineering" are
+answered by :meth:`Registry.query` without reading any card.
+
+:class:`CompactRegistry` offers the same lookup API for registries
+with millions of entries, trading a little lookup speed for a much
+smaller memory footprint.
 """
 from __future__ import annotations
 
+import re
+from array import array
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+#: Card fields with an inverted index in the registry.
+INDEXED_FIELDS = ("status", "owner", "contract_type")
+
+
+def _check_fields(names: Iterable[str]) -> None:
+    unknown = set(names) - set(INDEXED_FIELDS)
+    if unknown:
+        raise ValueError(f"not an indexed registry field: {', '.join(sorted(unknown))}")
+
+
+def _intersect(postings: List[Set[Any]]) -> Set[Any]:
+    """Intersect posting sets, smallest first."""
+    postings = sorted(postings, key=len)
+    result = set(postings[0])
+    for other in postings[1:]:
+        result &= other
+        if not result:
+            break
+    return result
 
 
 @dataclass
@@ -21,21 +53,52 @@ class Registry:
     by_ulid: Dict[str, str] = field(default_factory=dict)
     by_key: Dict[str, str] = field(default_factory=dict)
     aliases: Dict[str, List[str]] = field(default_factory=dict)
+    indexes: Dict[str, Dict[str, Set[str]]] = field(default_factory=dict)
+    #: field -> ULID -> value; the reverse of ``indexes``.
+    field_values: Dict[str, Dict[str, str]] = field(default_factory=dict)
 
-    def add_entry(self, ulid: str, doc_key: str, aliases: Optional[List[str]] = None) -> None:
+    def add_entry(
+        self, ulid: str, doc_key: str, aliases: Optional[List[str]] = None, **fields: str
+    ) -> None:
         """Add an entry to the registry.
 
         Args:
             ulid: The machine identifier.
             doc_key: The human identifier.
             aliases: Optional list of alternative keys pointing to the same ULID.
+            **fields: Values for any of :data:`INDEXED_FIELDS`.
         """
+        _check_fields(fields)
         self.by_ulid[ulid] = doc_key
         self.by_key[doc_key] = ulid
         if aliases:
             for alias in aliases:
                 self.by_key[alias] = ulid
                 self.aliases.setdefault(ulid, []).append(alias)
+        for name, value in fields.items():
+            index = self.indexes.setdefault(name, {})
+            current = self.field_values.setdefault(name, {})
+            old = current.get(ulid)
+            if old is not None:
+                index[old].discard(ulid)
+            current[ulid] = value
+            index.setdefault(value, set()).add(ulid)
+
+    def field_value(self, ulid: str, name: str) -> Optional[str]:
+        """Return the indexed value of ``name`` for ``ulid``, if recorded."""
+        return self.field_values.get(name, {}).get(ulid)
+
+    def query(self, **filters: str) -> List[str]:
+        """Return the ULIDs matching every filter, sorted.
+
+        Example: ``registry.query(status="active", owner="Platform.Engineering")``.
+        With no filters every ULID is returned.
+        """
+        _check_fields(filters)
+        if not filters:
+            return sorted(self.by_ulid)
+        postings = [self.indexes.get(n, {}).get(v, set()) for n, v in filters.items()]
+        return sorted(_intersect(postings))
 
     def lookup_ulid(self, doc_key: str) -> Optional[str]:
         """Return the ULID for a given document key or alias."""
@@ -44,3 +107,279 @@ class Registry:
     def lookup_key(self, ulid: str) -> Optional[str]:
         """Return the primary document key for a given ULID."""
         return self.by_ulid.get(ulid)
+
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_TO_BASE32 = str.maketrans(_CROCKFORD, "0123456789abcdefghijklmnopqrstuv")
+_CANONICAL_ULID = re.compile(r"[0-7][0-9A-HJKMNP-TV-Z]{25}")
+
+
+def ulid_to_bytes(ulid: str) -> Optional[bytes]:
+    """Return the 16-byte binary form of a canonical ULID, else ``None``."""
+    if not _CANONICAL_ULID.fullmatch(ulid):
+        return None
+    return int(ulid.translate(_TO_BASE32), 32).to_bytes(16, "big")
+
+
+def ulid_from_bytes(raw: bytes) -> str:
+    """Inverse of :func:`ulid_to_bytes`."""
+    n = int.from_bytes(raw, "big")
+    chars = []
+    for _ in range(26):
+        n, rem = divmod(n, 32)
+        chars.append(_CROCKFORD[rem])
+    return "".join(reversed(chars))
+
+
+class _Names:
+    """Append-only byte-string area with an open-addressing hash table.
+
+    Each distinct value gets a small integer id; the table maps a value
+    to its id without keeping a Python object per entry. With a fixed
+    ``width`` no offset array is needed at all.
+    """
+
+    __slots__ = ("data", "width", "off", "slots")
+
+    def __init__(self, width: int = 0) -> None:
+        self.data = bytearray()
+        self.width = width
+        self.off = array("I", [0])
+        self.slots = array("i", [-1]) * 8
+
+    def __len__(self) -> int:
+        return len(self.data) // self.width if self.width else len(self.off) - 1
+
+    def get(self, raw: bytes) -> int:
+        """Return the id of ``raw`` or -1."""
+        mask = len(self.slots) - 1
+        slot = hash(raw) & mask
+        while True:
+            sid = self.slots[slot]
+            if sid < 0 or self._slice(sid) == raw:
+                return sid
+            slot = (slot + 1) & mask
+
+    def add(self, raw: bytes) -> int:
+        """Return the id of ``raw``, storing it if new."""
+        mask = len(self.slots) - 1
+        slot = hash(raw) & mask
+        while True:
+            sid = self.slots[slot]
+            if sid < 0:
+                break
+            if self._slice(sid) == raw:
+                return sid
+            slot = (slot + 1) & mask
+        sid = len(self)
+        self.data += raw
+        if not self.width:
+            self.off.append(len(self.data))
+        if (sid + 1) * 2 > len(self.slots):
+            self._grow()
+        else:
+            self.slots[slot] = sid
+        return sid
+
+    def bytes(self, sid: int) -> bytes:
+        return bytes(self._slice(sid))
+
+    def _slice(self, sid: int) -> bytearray:
+        if self.width:
+            return self.data[sid * self.width:(sid + 1) * self.width]
+        return self.data[self.off[sid]:self.off[sid + 1]]
+
+    def _grow(self) -> None:
+        self.slots = array("i", [-1]) * (len(self.slots) * 2)
+        mask = len(self.slots) - 1
+        for sid in range(len(self)):
+            slot = hash(self.bytes(sid)) & mask
+            while self.slots[slot] >= 0:
+                slot = (slot + 1) & mask
+            self.slots[slot] = sid
+
+
+class _View(Mapping):  # type: ignore[type-arg]
+    """Read-only mapping over a :class:`CompactRegistry` for export plugins."""
+
+    __slots__ = ("_get", "_keys")
+
+    def __init__(self, get: Callable[[str], Any], keys: Callable[[], Iterator[str]]) -> None:
+        self._get = get
+        self._keys = keys
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return self._keys()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._keys())
+
+
+class CompactRegistry:
+    """Memory-compact registry with the same API as :class:`Registry`.
+
+    Canonical ULIDs are held as 16-byte binary values and doc_keys and
+    aliases live in a single UTF-8 string area, each indexed by an
+    array-backed hash table, so an entry costs a few dozen bytes
+    instead of several Python objects. Non-canonical ULIDs (e.g. test
+    fixtures) are kept verbatim in a separate string area. ``by_ulid``,
+    ``by_key`` and ``aliases`` are read-only views for code written
+    against :class:`Registry`.
+    """
+
+    __slots__ = ("_ulids", "_odd", "_ulid_entry", "_odd_entry", "_ulid_ref", "_names",
+                 "_primary", "_key_entry", "_alias_head", "_alias_name", "_alias_next",
+                 "_fields", "_values", "_field_of")
+
+    def __init__(self) -> None:
+        self._ulids = _Names(width=16)     # canonical ULIDs as 16 bytes
+        self._odd = _Names()               # non-canonical ULIDs as UTF-8
+        self._ulid_entry = array("i")      # ulid id -> entry
+        self._odd_entry = array("i")       # odd ulid id -> entry
+        self._ulid_ref = array("i")        # entry -> ulid id, or ~odd id
+        self._names = _Names()             # doc_keys and aliases
+        self._primary = array("i")         # entry -> name id of its doc_key
+        self._key_entry = array("i")       # name id -> entry it resolves to
+        self._alias_head = array("i")      # entry -> newest alias node or -1
+        self._alias_name = array("i")      # alias node -> name id
+        self._alias_next = array("i")      # alias node -> previous node or -1
+        self._fields: Dict[str, Dict[str, Set[int]]] = {}  # field -> value -> entries
+        self._values = _Names()            # indexed field values
+        self._field_of: Dict[str, array[int]] = {}  # field -> entry -> value id
+
+    def __len__(self) -> int:
+        return len(self._primary)
+
+    def add_entry(
+        self, ulid: str, doc_key: str, aliases: Optional[List[str]] = None, **fields: str
+    ) -> None:
+        """Add an entry to the registry (see :meth:`Registry.add_entry`)."""
+        _check_fields(fields)
+        raw = ulid_to_bytes(ulid)
+        names, entries = (self._ulids, self._ulid_entry) if raw else (self._odd, self._odd_entry)
+        uid = names.add(raw or ulid.encode("utf-8"))
+        if uid < len(entries):
+            idx = entries[uid]
+        else:
+            idx = len(self._primary)
+            entries.append(idx)
+            self._ulid_ref.append(uid if raw else ~uid)
+            self._primary.append(-1)
+            self._alias_head.append(-1)
+        self._primary[idx] = self._bind(doc_key, idx)
+        for alias in aliases or ():
+            self._alias_name.append(self._bind(alias, idx))
+            self._alias_next.append(self._alias_head[idx])
+            self._alias_head[idx] = len(self._alias_name) - 1
+        for name, value in fields.items():
+            self._set_field(idx, name, value)
+
+    def field_value(self, ulid: str, name: str) -> Optional[str]:
+        """Return the indexed value of ``name`` for ``ulid``, if recorded."""
+        idx = self._entry(ulid)
+        of = self._field_of.get(name)
+        if idx < 0 or of is None or idx >= len(of) or of[idx] < 0:
+            return None
+        return self._values.bytes(of[idx]).decode("utf-8")
+
+    def query(self, **filters: str) -> List[str]:
+        """Return the ULIDs matching every filter, sorted (see :meth:`Registry.query`)."""
+        _check_fields(filters)
+        if not filters:
+            return sorted(self.ulids())
+        postings = [self._fields.get(n, {}).get(v, set()) for n, v in filters.items()]
+        return sorted(self._ulid_at(idx) for idx in _intersect(postings))
+
+    def lookup_ulid(self, doc_key: str) -> Optional[str]:
+        """Return the ULID for a given document key or alias."""
+        sid = self._names.get(doc_key.encode("utf-8"))
+        return self._ulid_at(self._key_entry[sid]) if sid >= 0 else None
+
+    def lookup_key(self, ulid: str) -> Optional[str]:
+        """Return the primary document key for a given ULID."""
+        idx = self._entry(ulid)
+        return self._name(self._primary[idx]) if idx >= 0 else None
+
+    def aliases_of(self, ulid: str) -> List[str]:
+        """Return the aliases added for ``ulid``, oldest first."""
+        idx = self._entry(ulid)
+        out: List[str] = []
+        node = self._alias_head[idx] if idx >= 0 else -1
+        while node >= 0:
+            out.append(self._name(self._alias_name[node]))
+            node = self._alias_next[node]
+        return out[::-1]
+
+    def ulids(self) -> Iterator[str]:
+        for idx in range(len(self._primary)):
+            yield self._ulid_at(idx)
+
+    @property
+    def by_ulid(self) -> Mapping[str, str]:
+        return _View(self.lookup_key, self.ulids)
+
+    @property
+    def by_key(self) -> Mapping[str, str]:
+        return _View(self.lookup_ulid, lambda: (self._name(s) for s in range(len(self._names))))
+
+    @property
+    def aliases(self) -> Mapping[str, List[str]]:
+        def keys() -> Iterator[str]:
+            for idx in range(len(self._primary)):
+                if self._alias_head[idx] >= 0:
+                    yield self._ulid_at(idx)
+        return _View(lambda u: self.aliases_of(u) or None, keys)
+
+    @classmethod
+    def from_registry(cls, registry: Registry) -> "CompactRegistry":
+        """Build a compact copy of ``registry``."""
+        compact = cls()
+        for ulid, doc_key in registry.by_ulid.items():
+            fields = {n: registry.field_value(ulid, n) for n in registry.indexes}
+            compact.add_entry(ulid, doc_key, aliases=registry.aliases.get(ulid),
+                              **{n: v for n, v in fields.items() if v is not None})
+        for key, ulid in registry.by_key.items():
+            if compact.lookup_ulid(key) != ulid and compact._entry(ulid) >= 0:
+                compact._bind(key, compact._entry(ulid))
+        return compact
+
+    def _set_field(self, idx: int, name: str, value: str) -> None:
+        index = self._fields.setdefault(name, {})
+        of = self._field_of.setdefault(name, array("i"))
+        if len(of) <= idx:
+            of.extend([-1] * (len(self._primary) - len(of)))
+        if of[idx] >= 0:
+            index[self._values.bytes(of[idx]).decode("utf-8")].discard(idx)
+        of[idx] = self._values.add(value.encode("utf-8"))
+        index.setdefault(value, set()).add(idx)
+
+    def _bind(self, key: str, idx: int) -> int:
+        sid = self._names.add(key.encode("utf-8"))
+        if sid == len(self._key_entry):
+            self._key_entry.append(idx)
+        else:
+            self._key_entry[sid] = idx
+        return sid
+
+    def _entry(self, ulid: str) -> int:
+        raw = ulid_to_bytes(ulid)
+        if raw is None:
+            oid = self._odd.get(ulid.encode("utf-8"))
+            return self._odd_entry[oid] if oid >= 0 else -1
+        uid = self._ulids.get(raw)
+        return self._ulid_entry[uid] if uid >= 0 else -1
+
+    def _ulid_at(self, idx: int) -> str:
+        ref = self._ulid_ref[idx]
+        if ref < 0:
+            return self._odd.bytes(~ref).decode("utf-8")
+        return ulid_from_bytes(self._ulids.bytes(ref))
+
+    def _name(self, sid: int) -> str:
+        return self._names.bytes(sid).decode("utf-8")
@@ -0,0 +1,244 @@
+"""
+batch.py
+========
+
+Transactional batches of lifecycle operations. Running a reorg through
+:class:`.rekey.RekeyPlugin`, :class:`.deprecate.DeprecatePlugin` and
+:class:`.consolidate.ConsolidatePlugin` one call at a time costs a
+read-modify-write of the card and a ledger append per operation.
+:class:`BatchPlugin` takes the whole list of :class:`Operation` objects
+instead:
+
+1. every touched card is loaded once and the operations are folded
+   into an in-memory working set with the reducers from :mod:`.replay`,
+   so a batch produces exactly the state a replay of its events would;
+2. the whole batch is checked before anything is written: unknown
+   cards, doc_keys already taken by another card or assigned twice in
+   the batch, consolidations that would form a merge cycle, and
+   (optionally) schema violations of the resulting cards are collected
+   and raised together as :class:`BatchError`;
+3. each changed card is written once, all of them staged to temporary
+   files and renamed into place (:meth:`.store.CardStore.put_many`).
+   The renames are conditional on every card still having the
+   ``card_version`` it was read at; otherwise
+   :class:`.store.CardConflictError` is raised and nothing is written;
+4. the events are appended as a single ledger group commit.
+
+Several operations on the same card therefore cost one write, while
+``card_version`` still advances once per operation as it would with
+the individual plugins.
+
+The guarantee is all-or-nothing only up to the renames: an invalid
+batch or a version conflict writes nothing, and every card file is
+replaced atomically. The batch as a whole is not crash-atomic,
+though. A crash midway through the renames leaves some cards
+written and others not, and since the ledger is appended after the
+cards, a crash before the group commit leaves cards without their
+events (a replay of the ledger, see :mod:`.replay`, then yields their
+previous state). Re-running the batch would apply its operations a
+second time, so after a crash compare the cards with the batch and
+re-plan only what is missing.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..id.base import IDPlugin
+from ...models.id_card import IDCard
+from ...models.ledger_event import LedgerEvent
+from .ledger import LedgerPlugin
+from .lineage import LineageCycleError, check_merge
+from .replay import apply_event
+from .store import CardStore
+from .validate import FastValidator
+
+
+OPERATIONS = ("rekey", "deprecate", "consolidate")
+
+
+class BatchError(ValueError):
+    """Raised when a batch fails validation; nothing has been written."""
+
+    def __init__(self, problems: List[str]) -> None:
+        super().__init__("invalid batch:\n" + "\n".join(f"  {p}" for p in problems))
+        self.problems = problems
+
+
+@dataclass
+class Operation:
+    """One lifecycle operation in a batch.
+
+    ``ulid`` is the card operated on (the target for ``consolidate``).
+    ``new_key`` applies to ``rekey``, ``reason`` to ``deprecate`` and
+    ``sources`` to ``consolidate``.
+    """
+
+    op: str
+    ulid: str
+    new_key: Optional[str] = None
+    reason: Optional[str] = None
+    sources: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Operation":
+        return cls(
+            op=str(data["op"]),
+            ulid=str(data["ulid"]),
+            new_key=data.get("new_key"),
+            reason=data.get("reason"),
+            sources=[str(s) for s in data.get("sources", [])],
+        )
+
+
+class BatchPlugin(IDPlugin):
+    """Apply many lifecycle operations as one validated, coalesced transaction."""
+
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        ledger_path: Path | None = None,
+        store: CardStore | None = None,
+    ) -> None:
+        base = Path("AUTO_VERSIONING_MOD")
+        self.cards_dir = cards_dir or base / "ids/cards"
+        self.store = store or CardStore.for_dir(self.cards_dir)
+        self.ledger = LedgerPlugin(ledger_path)
+
+    def run(self, operations: Sequence[Operation], validate: bool = True) -> List[IDCard]:
+        """Apply ``operations`` in order and return the changed cards.
+
+        Raises:
+            BatchError: if any operation is invalid; no card or ledger
+                event is written in that case.
+            CardConflictError: if a card was changed concurrently; again
+                nothing is written, and the batch may be re-run.
+        """
+        cards, events, read_at = self._plan(operations, validate)
+        self.store.put_many(cards, expected=read_at)
+        with self.ledger.session(batch_size=max(1, len(events)), max_delay=float("inf")):
+            for event in events:
+                self.ledger.run(event)
+        return cards
+
+    def plan(
+        self, operations: Sequence[Operation], validate: bool = True
+    ) -> Tuple[List[IDCard], List[LedgerEvent]]:
+        """Validate ``operations``; return the cards to write and events to log.
+
+        Nothing is written. Raises :class:`BatchError` like :meth:`run`.
+        """
+        cards, events, _ = self._plan(operations, validate)
+        return cards, events
+
+    def _plan(
+        self, operations: Sequence[Operation], validate: bool
+    ) -> Tuple[List[IDCard], List[LedgerEvent], Dict[str, int]]:
+        state = _PlanState(self.store)
+        for n, op in enumerate(operations, 1):
+            where = f"#{n} {op.op} {op.ulid}"
+            if op.op not in OPERATIONS:
+                state.problems.append(f"{where}: unknown operation")
+                continue
+            card = state.load(op.ulid)
+            if card is None:
+                state.problems.append(f"{where}: ID Card does not exist")
+                continue
+            if op.op == "rekey":
+                event = self._rekey(state, op, card, where)
+            elif op.op == "deprecate":
+                event = self._event("DEPRECATE", card, card.doc_key, {"reason": op.reason or ""})
+            else:
+                event = self._consolidate(state, op, card, where)
+            if event is None:
+                continue
+            apply_event(state.working, event)
+            state.touched.append(op.ulid)
+            state.events.append(event)
+
+        changed = [state.working[u] for u in dict.fromkeys(state.touched)]
+        problems = state.problems
+        if validate and not problems:
+            validator = FastValidator("id_card")
+            for card in changed:
+                problems.extend(f"{card.ulid}: {e}" for e in validator.errors(card.to_dict()))
+        if problems:
+            raise BatchError(problems)
+        return changed, state.events, {card.ulid: state.read_at[card.ulid] for card in changed}
+
+    def _rekey(
+        self, state: "_PlanState", op: Operation, card: IDCard, where: str
+    ) -> Optional[LedgerEvent]:
+        if not op.new_key:
+            state.problems.append(f"{where}: new_key is required")
+            return None
+        if not state.indexed:
+            self.store.refresh()
+            state.indexed = True
+        owner = state.taken.get(op.new_key) or self._owner(op.new_key)
+        if owner is not None and owner != op.ulid:
+            state.problems.append(f"{where}: doc_key {op.new_key!r} is used by {owner}")
+            return None
+        state.taken[op.new_key] = op.ulid
+        return self._event("REKEY", card, op.new_key,
+                           {"old_key": card.doc_key, "new_key": op.new_key})
+
+    def _consolidate(
+        self, state: "_PlanState", op: Operation, card: IDCard, where: str
+    ) -> Optional[LedgerEvent]:
+        try:
+            # Like ConsolidatePlugin, a target listed among its sources is ignored.
+            check_merge(state.merged_into, op.ulid, [s for s in op.sources if s != op.ulid])
+        except LineageCycleError as exc:
+            state.problems.append(f"{where}: {exc}")
+            return None
+        # The target is listed first, so it is written before its sources.
+        state.touched.append(op.ulid)
+        for src in op.sources:
+            if src != op.ulid and state.load(src) is not None:
+                state.touched.append(src)
+        return self._event("CONSOLIDATE", card, card.doc_key, {"sources": list(op.sources)})
+
+    def _owner(self, key: str) -> Optional[str]:
+        card = self.store.find_by_doc_key(key) or self.store.find_by_alias(key)
+        return card.ulid if card is not None else None
+
+    @staticmethod
+    def _event(event_type: str, card: IDCard, doc_key: str, data: Dict[str, Any]) -> LedgerEvent:
+        return LedgerEvent(
+            event_type=event_type,
+            timestamp=datetime.utcnow().isoformat() + "Z",
+            ulid=card.ulid,
+            doc_key=doc_key,
+            data=data,
+        )
+
+
+class _PlanState:
+    """Working set of a batch being planned."""
+
+    def __init__(self, store: CardStore) -> None:
+        self.store = store
+        self.working: Dict[str, IDCard] = {}
+        self.read_at: Dict[str, int] = {}
+        self.touched: List[str] = []
+        self.events: List[LedgerEvent] = []
+        self.problems: List[str] = []
+        # doc_key -> ULID for keys assigned earlier in the batch.
+        self.taken: Dict[str, str] = {}
+        # Whether the store's indexes were brought up to date for this batch.
+        self.indexed = False
+
+    def load(self, ulid: str) -> Optional[IDCard]:
+        if ulid not in self.working:
+            if not self.store.exists(ulid):
+                return None
+            self.working[ulid] = self.store.get(ulid)
+            self.read_at[ulid] = self.working[ulid].card_version
+        return self.working[ulid]
+
+    def merged_into(self, ulid: str) -> Optional[str]:
+        card = self.load(ulid)
+        return card.merged_into if card is not None else None
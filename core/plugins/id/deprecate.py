@@ -6,50 +6,45 @@ Plugin implementing the DEPRECATE operation. It marks an ID Card
 as deprecated, records a deprecation date and reason, and logs an
 event to the ledger. This skeleton updates the YAML file for the
 card and appends the event.
+
+Deprecation commutes with other lifecycle changes, so a
+compare-and-swap conflict on ``card_version`` (see
+:meth:`.store.CardStore.update`) is retried on the fresh card.
 """
 from __future__ import annotations
 
-from typing import Any
+from dataclasses import replace
 from datetime import datetime
-import yaml
 from pathlib import Path
 
 from ..id.base import IDPlugin
-from ..models.id_card import IDCard
-from ..models.ledger_event import LedgerEvent
+from ...models.ledger_event import LedgerEvent
 from .ledger import LedgerPlugin
+from .store import CardStore
 
 
 class DeprecatePlugin(IDPlugin):
     """Deprecate an existing document ID."""
 
-    def __init__(self, cards_dir: Path | None = None, ledger_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        ledger_path: Path | None = None,
+        store: CardStore | None = None,
+        retries: int = 8,
+    ) -> None:
         base = Path("AUTO_VERSIONING_MOD")
         self.cards_dir = cards_dir or base / "ids/cards"
+        self.store = store or CardStore.for_dir(self.cards_dir)
         self.ledger = LedgerPlugin(ledger_path)
+        self.retries = retries
 
     def run(self, ulid: str, reason: str) -> None:
-        card_path = self.cards_dir / f"{ulid}.yaml"
-        if not card_path.exists():
-            raise FileNotFoundError(f"ID Card {ulid} does not exist")
-        data = yaml.safe_load(card_path.read_text())
-        card = IDCard.from_dict(data)
-        updated_card = IDCard(
-            doc_key=card.doc_key,
-            ulid=card.ulid,
-            semver=card.semver,
-            status="deprecated",
-            effective_date=card.effective_date,
-            owner=card.owner,
-            contract_type=card.contract_type,
-            card_version=card.card_version + 1,
-            aliases=card.aliases,
-            supersedes_version=card.supersedes_version,
-            merged_into=card.merged_into,
-            absorbs=card.absorbs,
-            mfid=card.mfid,
+        card, _ = self.store.update(
+            ulid,
+            lambda card: replace(card, status="deprecated", card_version=card.card_version + 1),
+            retries=self.retries,
         )
-        yaml.safe_dump(updated_card.to_dict(), card_path.open("w", encoding="utf-8"))
         event = LedgerEvent(
             event_type="DEPRECATE",
             timestamp=datetime.utcnow().isoformat() + "Z",
@@ -5,28 +5,388 @@ ledger.py
 Plugin responsible for appending events to the ledger. The ledger
 is stored as a JSON Lines file at ``.ledger/ids.jsonl`` and should
 never be rewritten. Each invocation appends exactly one event.
-This skeleton writes to an in-memory string when run locally; it
-should be extended to write to disk in production.
+
+For bulk operations, :meth:`LedgerPlugin.session` opens a
+:class:`LedgerWriter` that keeps the file open and writes buffered
+events in groups, flushed by count or age, with a configurable fsync
+policy. While a session is open, :meth:`LedgerPlugin.run` routes
+through it, so lifecycle plugins batch their events without changes.
+
+Several processes (CI jobs, worktrees) may append to the same ledger.
+With ``lock=True`` every group is written with a single ``write`` while
+holding an exclusive advisory lock (``fcntl.flock``; a lock file where
+``fcntl`` is unavailable), so lines never interleave. Under the lock
+the writer also reads the time the last committed event is ordered
+at; an event whose ``timestamp`` is earlier keeps it and is written
+with ``committed_at`` set to that time (see :func:`order_events`).
+The file is thus ordered by :func:`order_time` regardless of which
+writer commits first, and time-range queries use that order.
+
+With ``chain=True`` (which implies locking) every event records
+``prev_hash``, the SHA-256 of the previous line as written, so
+truncation, reordering and edits break the chain. The first event of a
+ledger links to :data:`GENESIS`. See :mod:`.ledger_verify`.
+
+Every appended event is validated against
+``schemas/ledger_event.schema.json`` first (see :mod:`.validate`), so
+an invalid event raises before anything is written.
+
+Passing ``segments`` (a :class:`.ledger_segments.SegmentedLedger`)
+stores events in rotating, indexed segments instead of the single
+file; see :mod:`.ledger_segments`.
 """
 from __future__ import annotations
 
+import hashlib
 import json
-from pathlib import Path
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime
-from typing import Any, Dict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
 
 from ..id.base import IDPlugin
-from ..models.ledger_event import LedgerEvent
+from ...models.ledger_event import LedgerEvent
+
+if TYPE_CHECKING:
+    from .ledger_segments import SegmentedLedger
+    from .validate import LedgerEventValidator
+
+
+FSYNC_POLICIES = ("none", "batch", "every")
+GENESIS = "0" * 64
+
+
+def encode_event(event: LedgerEvent) -> bytes:
+    """Serialise ``event`` to one JSONL line."""
+    return (json.dumps(event.to_dict()) + "\n").encode("utf-8")
+
+
+def line_hash(line: bytes) -> str:
+    """Chain hash of a ledger line (without its trailing newline)."""
+    return hashlib.sha256(line.rstrip(b"\n")).hexdigest()
+
+
+def chain_events(events: List[LedgerEvent], prev: str) -> List[bytes]:
+    """Set ``prev_hash`` on ``events`` starting from ``prev``; return the encoded lines."""
+    lines = []
+    for event in events:
+        event.prev_hash = prev
+        line = encode_event(event)
+        prev = line_hash(line)
+        lines.append(line)
+    return lines
+
+
+def _parse_ts(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def last_line(ledger_path: Path, window: int = 65536) -> Optional[bytes]:
+    """Return the last complete, non-empty line of the ledger."""
+    try:
+        size = ledger_path.stat().st_size
+    except FileNotFoundError:
+        return None
+    with ledger_path.open("rb") as fh:
+        while True:
+            start = max(0, size - window)
+            fh.seek(start)
+            lines = fh.read(size - start).split(b"\n")
+            # The first piece may be cut by the window, the last lacks its newline.
+            complete = [ln for ln in lines[1 if start else 0:-1] if ln.strip()]
+            if complete or start == 0:
+                break
+            window *= 2
+    return complete[-1] if complete else None
+
+
+def order_time(data: Dict[str, Any]) -> str:
+    """Time a decoded event is ordered at: ``committed_at`` if set, else ``timestamp``."""
+    return str(data.get("committed_at") or data["timestamp"])
+
+
+def _timestamp_of(line: Optional[bytes]) -> Optional[str]:
+    try:
+        return order_time(json.loads(line)) if line else None
+    except (ValueError, KeyError):
+        return None
+
+
+def last_timestamp(ledger_path: Path, window: int = 65536) -> Optional[str]:
+    """Return the time the last complete event in the ledger is ordered at."""
+    return _timestamp_of(last_line(ledger_path, window))
+
+
+def line_ranges(path: Path, parts: int) -> List[Tuple[int, Optional[int]]]:
+    """Split ``path`` into up to ``parts`` ``[start, end)`` byte ranges on line boundaries."""
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as fh:
+        for i in range(1, max(1, parts)):
+            fh.seek(size * i // parts)
+            fh.readline()
+            if bounds[-1] < fh.tell() < size:
+                bounds.append(fh.tell())
+    ends: List[Optional[int]] = [*bounds[1:], None]
+    return list(zip(bounds, ends))
+
+
+def order_events(events: Sequence[LedgerEvent], latest: Optional[str]) -> List[LedgerEvent]:
+    """Return copies of ``events`` that are never ordered before ``latest``.
+
+    An event whose timestamp precedes the last one committed (or queued
+    before it) keeps its timestamp and gets ``committed_at`` set to that
+    time instead. The caller's events are left unchanged.
+    """
+    latest_dt = _parse_ts(latest) if latest else None
+    ordered = []
+    for event in events:
+        ts = _parse_ts(event.timestamp)
+        if latest is not None and latest_dt is not None and ts < latest_dt:
+            ordered.append(replace(event, committed_at=latest))
+        else:
+            ordered.append(replace(event, committed_at=None))
+            latest, latest_dt = event.timestamp, ts
+    return ordered
+
+
+@contextmanager
+def exclusive_lock(fh: BinaryIO, path: Path, enabled: bool = True) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``fh`` (guarding ``path``)."""
+    if not enabled:
+        yield
+    elif fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:  # pragma: no cover - non-POSIX platforms
+        lock_path = path.with_name(path.name + ".lock")
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                time.sleep(0.001)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.unlink(lock_path)
+
+
+def _chained(chain: bool, segments: Optional["SegmentedLedger"]) -> bool:
+    """Resolve ``chain`` against a segmented ledger, which chains (or not) on its own."""
+    if segments is None:
+        return chain
+    if chain and not segments.chain:
+        raise ValueError("chain=True needs a SegmentedLedger created with chain=True")
+    return segments.chain
+
+
+def _event_validator() -> "LedgerEventValidator":
+    # Imported lazily: validate.py pulls in the card model and jsonschema.
+    from .validate import ledger_event_validator
+
+    return ledger_event_validator()
+
+
+class LedgerWriter:
+    """Buffered, group-committing append session on a ledger file.
+
+    Events are queued on :meth:`append` and written when the buffer
+    holds ``batch_size`` events or its oldest event is older than
+    ``max_delay`` seconds (checked on append), and on :meth:`flush` /
+    :meth:`close`. ``fsync`` selects durability: ``"none"`` leaves
+    syncing to the OS, ``"batch"`` syncs after each group and
+    ``"every"`` writes and syncs every event individually. With
+    ``segments`` each group is appended to the segmented ledger, which
+    always locks. ``chain`` hash-chains the events (and implies ``lock``);
+    a segmented ledger chains if it was created with ``chain=True``, and
+    asking for ``chain`` on one that was not raises ``ValueError``.
+    Each event is checked against ``ledger_event.schema.json`` on
+    :meth:`append`, raising ``jsonschema.exceptions.ValidationError``;
+    ``validate=False`` skips the check for events already known valid.
+    """
+
+    def __init__(
+        self,
+        ledger_path: Path,
+        batch_size: int = 256,
+        max_delay: float = 1.0,
+        fsync: str = "batch",
+        lock: bool = False,
+        segments: Optional["SegmentedLedger"] = None,
+        chain: bool = False,
+        validate: bool = True,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self._validator = _event_validator() if validate else None
+        self.ledger_path = ledger_path
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.chain = _chained(chain, segments)
+        self.lock = lock or self.chain
+        self.segments = segments
+        self._open = False
+        self._buffer: List[LedgerEvent] = []
+        self._oldest = 0.0
+        self._fh: Optional[BinaryIO] = None
+        self._opened = 0.0
+        self.events = 0
+        self.flushes = 0
+        self.bytes = 0
+
+    def __enter__(self) -> "LedgerWriter":
+        self.open()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return not self._open
+
+    def open(self) -> None:
+        if not self._open:
+            if self.segments is None:
+                self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = self.ledger_path.open("ab")
+            self._open = True
+            self._opened = time.monotonic()
+
+    def append(self, event: LedgerEvent) -> None:
+        """Queue ``event``; write the group if a flush threshold is reached."""
+        if self._validator is not None:
+            self._validator.validate(event.to_dict())
+        self.open()
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        self._buffer.append(event)
+        if (
+            self.fsync == "every"
+            or len(self._buffer) >= self.batch_size
+            or time.monotonic() - self._oldest >= self.max_delay
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered events as one group."""
+        if not self._buffer or not self._open:
+            return
+        if self.segments is not None:
+            self.segments.append_many(self._buffer, fsync=self.fsync != "none")
+            self._committed(b"".join(encode_event(e) for e in self._buffer))
+            return
+        assert self._fh is not None
+        with exclusive_lock(self._fh, self.ledger_path, enabled=self.lock):
+            events = self._buffer
+            if self.lock:
+                last = last_line(self.ledger_path)
+                events = order_events(events, _timestamp_of(last))
+            if self.chain:
+                data = b"".join(chain_events(events, line_hash(last) if last else GENESIS))
+            else:
+                data = b"".join(encode_event(e) for e in events)
+            self._fh.write(data)
+            self._fh.flush()
+            if self.fsync != "none":
+                os.fsync(self._fh.fileno())
+        self._committed(data)
+
+    def _committed(self, data: bytes) -> None:
+        self.events += len(self._buffer)
+        self.bytes += len(data)
+        self.flushes += 1
+        self._buffer.clear()
+
+    def close(self) -> None:
+        if self._open:
+            self.flush()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._open = False
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return counters and throughput (events/sec since the session opened)."""
+        elapsed = time.monotonic() - self._opened if self._opened else 0.0
+        return {
+            "events": self.events,
+            "pending": len(self._buffer),
+            "flushes": self.flushes,
+            "bytes": self.bytes,
+            "elapsed_s": elapsed,
+            "events_per_s": self.events / elapsed if elapsed > 0 else 0.0,
+        }
 
 
 class LedgerPlugin(IDPlugin):
     """Append events to the ledger file."""
 
-    def __init__(self, ledger_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        ledger_path: Path | None = None,
+        lock: bool = False,
+        segments: Optional["SegmentedLedger"] = None,
+        chain: bool = False,
+        validate: bool = True,
+    ) -> None:
         self.ledger_path = ledger_path or Path("AUTO_VERSIONING_MOD/.ledger/ids.jsonl")
+        self.chain = _chained(chain, segments)
+        self.lock = lock or self.chain
+        self.segments = segments
+        self.validate = validate
+        self._writer: Optional[LedgerWriter] = None
 
     def run(self, event: LedgerEvent) -> None:
         """Append a ledger event to the JSONL file."""
+        if self._writer is not None and not self._writer.closed:
+            self._writer.append(event)
+            return
+        if self.validate:
+            _event_validator().validate(event.to_dict())
+        if self.segments is not None:
+            self.segments.append(event)
+            return
+        if self.lock:
+            with LedgerWriter(
+                self.ledger_path, batch_size=1, fsync="none", lock=True, chain=self.chain
+            ) as w:
+                w.append(event)
+            return
         self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
-        with self.ledger_path.open("a", encoding="utf-8") as fh:
-            fh.write(json.dumps(event.to_dict()) + "\n")
+        with self.ledger_path.open("ab") as fh:
+            fh.write(encode_event(event))
+
+    def session(self, **options: Any) -> LedgerWriter:
+        """Open a :class:`LedgerWriter` that :meth:`run` uses until it is closed.
+
+        Keyword arguments are passed to :class:`LedgerWriter`; ``lock``
+        defaults to the plugin's own setting::
+
+            with plugin.ledger.session(batch_size=500, fsync="batch") as writer:
+                for ulid in ulids:
+                    plugin.run(ulid, reason="obsolete")
+            print(writer.metrics()["events_per_s"])
+        """
+        options.setdefault("lock", self.lock)
+        options.setdefault("chain", self.chain)
+        options.setdefault("validate", self.validate)
+        options.setdefault("segments", self.segments)
+        self._writer = LedgerWriter(self.ledger_path, **options)
+        self._writer.open()
+        return self._writer
@@ -0,0 +1,144 @@
+"""
+ledger_query.py
+===============
+
+Streaming read access to the ledger. :class:`LedgerReader` yields
+:class:`LedgerEvent` objects lazily, filtered by event type, ULID,
+doc_key and time range, without ever holding more than one line in
+memory.
+
+The reader picks the cheapest access path available:
+
+* a segmented ledger directory (see :mod:`.ledger_segments`) is read
+  through its sidecar indexes, so only relevant segments and offsets
+  are touched;
+* a single JSONL file is scanned line by line in binary mode. Lines
+  that cannot match are rejected by a substring test on the raw bytes
+  before any JSON decoding, and when the file is known to be ordered by
+  time (it was written with ``lock=True``) ``since`` is located by
+  bisecting byte offsets and the scan stops at ``until``.
+
+Time ranges apply to the time the ledger orders an event at, its
+``committed_at`` if the writer set one (see :func:`.ledger.order_events`).
+
+:meth:`LedgerReader.lines` yields the matching raw lines, which lets
+``id_cli.py ledger query`` stream NDJSON without re-encoding.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from ...models.ledger_event import LedgerEvent
+from .ledger import _parse_ts, order_time
+from .ledger_segments import SegmentedLedger
+
+
+class LedgerReader:
+    """Lazy, filtered iteration over a ledger file or segment directory."""
+
+    def __init__(self, source: Path | None = None, ordered: bool = False) -> None:
+        self.source = source or Path("AUTO_VERSIONING_MOD/.ledger/ids.jsonl")
+        self.ordered = ordered
+
+    def query(
+        self,
+        event_type: str | None = None,
+        ulid: str | None = None,
+        doc_key: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> Iterator[LedgerEvent]:
+        """Yield events matching every given filter, in ledger order.
+
+        ``since`` and ``until`` are inclusive ISO 8601 timestamps.
+        """
+        for _, event in self._matches(event_type, ulid, doc_key, since, until):
+            yield event
+
+    def lines(
+        self,
+        event_type: str | None = None,
+        ulid: str | None = None,
+        doc_key: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> Iterator[bytes]:
+        """Like :meth:`query`, but yield the matching raw JSONL lines."""
+        for line, _ in self._matches(event_type, ulid, doc_key, since, until):
+            yield line if line.endswith(b"\n") else line + b"\n"
+
+    def _matches(
+        self,
+        event_type: Optional[str],
+        ulid: Optional[str],
+        doc_key: Optional[str],
+        since: Optional[str],
+        until: Optional[str],
+    ) -> Iterator[Tuple[bytes, LedgerEvent]]:
+        needles: List[bytes] = [
+            json.dumps(value).encode("utf-8")
+            for value in (event_type, ulid, doc_key)
+            if value is not None
+        ]
+        since_dt = _parse_ts(since) if since else None
+        until_dt = _parse_ts(until) if until else None
+        # Segments are always written in time order, so ``until`` ends the scan.
+        stop_early = self.ordered or self.source.is_dir()
+        for line in self._candidates(ulid, since, until):
+            if not all(needle in line for needle in needles):
+                continue
+            event = LedgerEvent.from_dict(json.loads(line))
+            if since_dt or until_dt:
+                ts = _parse_ts(event.ordered_at)
+                if until_dt and ts > until_dt:
+                    if stop_early:
+                        return
+                    continue
+                if since_dt and ts < since_dt:
+                    continue
+            if (
+                (event_type is None or event.event_type == event_type)
+                and (ulid is None or event.ulid == ulid)
+                and (doc_key is None or event.doc_key == doc_key)
+            ):
+                yield line, event
+
+    def _candidates(
+        self, ulid: Optional[str], since: Optional[str], until: Optional[str]
+    ) -> Iterator[bytes]:
+        if self.source.is_dir():
+            yield from SegmentedLedger(self.source).scan(ulid, since, until)
+            return
+        if not self.source.exists():
+            return
+        with self.source.open("rb") as fh:
+            if self.ordered and since:
+                _seek_since(fh, since)
+            for line in fh:
+                if line.strip():
+                    yield line
+
+
+def _seek_since(fh: BinaryIO, since: str, window: int = 4096) -> None:
+    """Position ``fh`` at or before the first line with a timestamp >= ``since``.
+
+    Bisects byte offsets of a time-ordered file; each probe reads the
+    first complete line after the probe offset.
+    """
+    target = _parse_ts(since)
+    fh.seek(0, 2)
+    lo, hi = 0, fh.tell()
+    while hi - lo > window:
+        mid = (lo + hi) // 2
+        fh.seek(mid)
+        fh.readline()
+        line = fh.readline()
+        if not line.endswith(b"\n") or _parse_ts(order_time(json.loads(line))) >= target:
+            hi = mid
+        else:
+            lo = mid
+    fh.seek(lo)
+    if lo:
+        fh.readline()
@@ -0,0 +1,481 @@
+"""
+ledger_segments.py
+==================
+
+Segmented ledger storage. Instead of one ever-growing JSONL file the
+ledger is a directory of segments (``segment-00000001.jsonl``, ...).
+Only the newest segment is appended to; it is sealed once it exceeds
+``max_bytes`` or spans more than ``max_span`` seconds of event time,
+and a new segment is started.
+
+Sealing writes a sidecar (``segment-00000001.idx.json``) holding the
+segment's time range, a sparse timestamp index (the byte offset of
+every ``interval``-th event) and the byte offsets of the events of
+each ULID. "Events for ULID X" then reads only the offsets listed for
+X, and "events since T" skips whole segments by time range and
+bisects into the first relevant one. The active segment has no
+sidecar and is scanned, which stays cheap because it is bounded.
+
+Appends go through :meth:`SegmentedLedger.append_many`, which takes an
+exclusive lock on the directory so several processes can share it,
+and keeps events ordered by time across segments (see
+:func:`.ledger.order_events`). Time ranges, the sparse index and its
+bisection use that order (:func:`.ledger.order_time`). With
+``chain=True`` events are hash-chained across segment boundaries (see
+:mod:`.ledger`); each sidecar records the segment's first
+``prev_hash`` and the hash of its last line so segments can be
+verified independently.
+
+Sealed segments can be compressed (``gzip`` or ``lzma``, automatically
+on seal with ``compress=...`` or later via :meth:`SegmentedLedger.compress`).
+The lines are cut into blocks of about ``block_size`` bytes and each
+block is compressed on its own, as one gzip member or xz stream, so
+the file is still a valid ``.gz``/``.xz``. The sidecar lists each
+block's uncompressed start and compressed extent. Offsets in the index
+stay in uncompressed coordinates, and :meth:`SegmentedLedger.open`
+returns a reader that seeks by decompressing only the block that holds
+the offset. Queries and replay read compressed and plain segments the
+same way.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import lzma
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ...models.ledger_event import LedgerEvent
+from .ledger import (
+    GENESIS,
+    _parse_ts,
+    _timestamp_of,
+    chain_events,
+    encode_event,
+    exclusive_lock,
+    last_line,
+    line_hash,
+    order_events,
+    order_time,
+)
+
+
+SEGMENT_GLOB = "segment-*.jsonl*"
+
+CODECS: Dict[str, Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "gzip": (".gz", lambda data: gzip.compress(data, mtime=0), gzip.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+
+def segment_id(segment: Path | str) -> str:
+    """Return the codec-independent name of a segment (``segment-00000001``)."""
+    name = segment.name if isinstance(segment, Path) else segment
+    return name.split(".", 1)[0]
+
+
+@dataclass
+class SegmentIndex:
+    """Sidecar index of a sealed segment."""
+
+    segment: str
+    count: int
+    first_ts: Optional[str]
+    last_ts: Optional[str]
+    sparse: List[Tuple[str, int]] = field(default_factory=list)
+    ulids: Dict[str, List[int]] = field(default_factory=dict)
+    codec: Optional[str] = None
+    blocks: List[Tuple[int, int, int]] = field(default_factory=list)
+    first_prev: Optional[str] = None
+    last_hash: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SegmentIndex":
+        return cls(
+            segment=data["segment"],
+            count=data["count"],
+            first_ts=data.get("first_ts"),
+            last_ts=data.get("last_ts"),
+            sparse=[(ts, off) for ts, off in data.get("sparse", [])],
+            ulids={u: list(offs) for u, offs in data.get("ulids", {}).items()},
+            codec=data.get("codec"),
+            blocks=[(raw, off, size) for raw, off, size in data.get("blocks", [])],
+            first_prev=data.get("first_prev"),
+            last_hash=data.get("last_hash"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "segment": self.segment,
+            "count": self.count,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "sparse": [list(p) for p in self.sparse],
+            "ulids": self.ulids,
+            "codec": self.codec,
+            "blocks": [list(b) for b in self.blocks],
+            "first_prev": self.first_prev,
+            "last_hash": self.last_hash,
+        }
+
+
+def index_segment(path: Path, interval: int = 128) -> SegmentIndex:
+    """Scan a segment file and build its sidecar index."""
+    idx = SegmentIndex(segment=path.name, count=0, first_ts=None, last_ts=None)
+    offset = 0
+    with path.open("rb") as fh:
+        for line in fh:
+            if line.strip():
+                event = json.loads(line)
+                ts = order_time(event)
+                if idx.count % interval == 0:
+                    idx.sparse.append((ts, offset))
+                idx.ulids.setdefault(event["ulid"], []).append(offset)
+                if idx.count == 0:
+                    idx.first_prev = event.get("prev_hash")
+                idx.last_hash = line_hash(line)
+                idx.first_ts = idx.first_ts or ts
+                idx.last_ts = ts
+                idx.count += 1
+            offset += len(line)
+    return idx
+
+
+class BlockReader:
+    """Line reader over a block-compressed segment, addressed by uncompressed offset.
+
+    Supports the subset of the binary file API the ledger readers use:
+    :meth:`seek`, :meth:`readline` and line iteration.
+    """
+
+    def __init__(self, path: Path, codec: str, blocks: Sequence[Tuple[int, int, int]]) -> None:
+        self._fh = path.open("rb")
+        self._decompress = CODECS[codec][2]
+        self._blocks = list(blocks)
+        self._starts = [b[0] for b in self._blocks]
+        self._block = -1
+        self._buf = io.BytesIO()
+
+    def __enter__(self) -> "BlockReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def seek(self, offset: int) -> None:
+        block = max(bisect_right(self._starts, offset) - 1, 0)
+        if block < len(self._blocks):
+            self._load(block)
+            self._buf.seek(offset - self._starts[block])
+
+    def readline(self) -> bytes:
+        line = self._buf.readline()
+        while not line and self._block + 1 < len(self._blocks):
+            self._load(self._block + 1)
+            line = self._buf.readline()
+        return line
+
+    def _load(self, block: int) -> None:
+        if block != self._block:
+            _, offset, size = self._blocks[block]
+            self._fh.seek(offset)
+            self._buf = io.BytesIO(self._decompress(self._fh.read(size)))
+            self._block = block
+        self._buf.seek(0)
+
+
+class SegmentedLedger:
+    """Directory of size/time-bounded ledger segments with sparse indexes."""
+
+    def __init__(
+        self,
+        ledger_dir: Path | None = None,
+        max_bytes: int = 64 * 2**20,
+        max_span: float | None = None,
+        interval: int = 128,
+        compress: str | None = None,
+        block_size: int = 256 * 2**10,
+        chain: bool = False,
+    ) -> None:
+        if compress is not None and compress not in CODECS:
+            raise ValueError(f"compress must be one of {', '.join(CODECS)}")
+        self.ledger_dir = ledger_dir or Path("AUTO_VERSIONING_MOD/.ledger/ids")
+        self.max_bytes = max_bytes
+        self.max_span = max_span
+        self.interval = interval
+        self.compress_codec = compress
+        self.block_size = block_size
+        self.chain = chain
+        self._indexes: Dict[str, Tuple[Tuple[int, int], SegmentIndex]] = {}
+
+    # -- layout ------------------------------------------------------
+
+    def segment_paths(self) -> List[Path]:
+        """Return all segment files, oldest first.
+
+        While a segment is being compressed both forms exist briefly;
+        the one named by its sidecar wins.
+        """
+        if not self.ledger_dir.exists():
+            return []
+        by_id: Dict[str, List[Path]] = {}
+        for path in self.ledger_dir.glob(SEGMENT_GLOB):
+            if not path.name.endswith(".tmp"):
+                by_id.setdefault(segment_id(path), []).append(path)
+        out = []
+        for sid in sorted(by_id):
+            paths = by_id[sid]
+            if len(paths) > 1:
+                idx = self.index_for(paths[0])
+                paths = [p for p in paths if idx is not None and p.name == idx.segment] or paths
+            out.append(min(paths))
+        return out
+
+    @staticmethod
+    def sidecar_for(segment: Path) -> Path:
+        return segment.with_name(segment_id(segment) + ".idx.json")
+
+    def is_sealed(self, segment: Path) -> bool:
+        return self.sidecar_for(segment).exists()
+
+    def index_for(self, segment: Path) -> Optional[SegmentIndex]:
+        """Return the (cached) sidecar index of a sealed segment."""
+        sidecar = self.sidecar_for(segment)
+        try:
+            st = sidecar.stat()
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._indexes.get(segment_id(segment))
+        if cached and cached[0] == stamp:
+            return cached[1]
+        idx = SegmentIndex.from_dict(json.loads(sidecar.read_text(encoding="utf-8")))
+        self._indexes[segment_id(segment)] = (stamp, idx)
+        return idx
+
+    def open(self, segment: Path) -> BinaryIO | BlockReader:
+        """Open ``segment`` for reading by uncompressed byte offset."""
+        idx = self.index_for(segment)
+        if idx is not None and idx.codec and segment.name == idx.segment:
+            return BlockReader(segment, idx.codec, idx.blocks)
+        return segment.open("rb")
+
+    def _active(self) -> Path:
+        paths = self.segment_paths()
+        if paths and not self.is_sealed(paths[-1]):
+            return paths[-1]
+        seq = int(segment_id(paths[-1]).split("-")[1]) + 1 if paths else 1
+        return self.ledger_dir / f"segment-{seq:08d}.jsonl"
+
+    # -- writing -----------------------------------------------------
+
+    def append(self, event: LedgerEvent) -> None:
+        self.append_many([event])
+
+    def append_many(self, events: Sequence[LedgerEvent], fsync: bool = False) -> None:
+        """Append ``events`` as one group, rotating segments as needed."""
+        if not events:
+            return
+        self.ledger_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.ledger_dir / "LOCK"
+        with lock_path.open("ab") as lock_fh, exclusive_lock(lock_fh, lock_path):
+            active = self._active()
+            last = last_line(active)
+            if last is not None:
+                latest, prev = _timestamp_of(last), line_hash(last)
+            else:
+                latest, prev = self._sealed_tail()
+            events = order_events(events, latest)
+            if self.chain:
+                lines = chain_events(events, prev)
+            else:
+                lines = [encode_event(e) for e in events]
+            pending: List[bytes] = []
+            size = active.stat().st_size if active.exists() else 0
+            first_ts = self._first_ts(active) if size else None
+            for event, line in zip(events, lines):
+                if size and self._should_rotate(size + len(line), first_ts, event.ordered_at):
+                    self._write(active, pending, fsync)
+                    self.seal(active)
+                    active, pending, size, first_ts = self._active(), [], 0, None
+                pending.append(line)
+                size += len(line)
+                first_ts = first_ts or event.ordered_at
+            self._write(active, pending, fsync)
+
+    def seal(self, segment: Path | None = None) -> Optional[Path]:
+        """Seal ``segment`` (default: the active one) by writing its index.
+
+        Compresses it afterwards if the ledger was created with ``compress``.
+        """
+        segment = segment or self._active()
+        if not segment.exists() or self.is_sealed(segment):
+            return None
+        idx = index_segment(segment, self.interval)
+        sidecar = self._write_index(idx, segment)
+        if self.compress_codec:
+            self.compress(segment, self.compress_codec)
+        return sidecar
+
+    def compress(self, segment: Path, codec: str = "gzip") -> Path:
+        """Rewrite sealed ``segment`` as independently compressed blocks.
+
+        The compressed file is renamed into place and the sidecar updated
+        before the plain file is removed, so readers always see one
+        complete copy.
+        """
+        idx = self.index_for(segment)
+        if idx is None:
+            raise ValueError(f"{segment.name} is not sealed")
+        if idx.codec:
+            return segment
+        suffix, compress, _ = CODECS[codec]
+        target = segment.with_name(segment.name + suffix)
+        tmp = target.with_name(target.name + ".tmp")
+        blocks: List[Tuple[int, int, int]] = []
+        raw = comp = 0
+        with segment.open("rb") as src, tmp.open("wb") as dst:
+            while True:
+                chunk = src.read(self.block_size)
+                if not chunk:
+                    break
+                chunk += src.readline()  # blocks end on a line boundary
+                data = compress(chunk)
+                dst.write(data)
+                blocks.append((raw, comp, len(data)))
+                raw += len(chunk)
+                comp += len(data)
+        os.replace(tmp, target)
+        self._write_index(
+            SegmentIndex(**{**idx.__dict__, "segment": target.name, "codec": codec,
+                            "blocks": blocks}),
+            segment,
+        )
+        segment.unlink()
+        return target
+
+    def compress_sealed(self, codec: str = "gzip") -> List[Path]:
+        """Compress every sealed, still-plain segment; return the new files."""
+        out = []
+        for seg in self.segment_paths():
+            idx = self.index_for(seg)
+            if idx is not None and not idx.codec:
+                out.append(self.compress(seg, codec))
+        return out
+
+    def _write_index(self, idx: SegmentIndex, segment: Path) -> Path:
+        sidecar = self.sidecar_for(segment)
+        tmp = sidecar.with_name(sidecar.name + ".tmp")
+        tmp.write_text(json.dumps(idx.to_dict(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, sidecar)
+        return sidecar
+
+    def _should_rotate(self, new_size: int, first_ts: Optional[str], ts: str) -> bool:
+        if new_size > self.max_bytes:
+            return True
+        if self.max_span is not None and first_ts is not None:
+            return (_parse_ts(ts) - _parse_ts(first_ts)).total_seconds() > self.max_span
+        return False
+
+    @staticmethod
+    def _write(segment: Path, lines: List[bytes], fsync: bool) -> None:
+        if not lines:
+            return
+        with segment.open("ab") as fh:
+            fh.write(b"".join(lines))
+            fh.flush()
+            if fsync:
+                os.fsync(fh.fileno())
+
+    @staticmethod
+    def _first_ts(segment: Path) -> Optional[str]:
+        with segment.open("rb") as fh:
+            line = fh.readline()
+        return order_time(json.loads(line)) if line.strip() else None
+
+    def _sealed_tail(self) -> Tuple[Optional[str], str]:
+        """Return the last timestamp and chain hash of the sealed segments."""
+        for segment in reversed(self.segment_paths()):
+            idx = self.index_for(segment)
+            if idx and idx.last_ts:
+                return idx.last_ts, idx.last_hash or GENESIS
+        return None, GENESIS
+
+    # -- reading -----------------------------------------------------
+
+    def events(
+        self,
+        ulid: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> Iterator[LedgerEvent]:
+        """Yield events matching ``ulid`` and the ``[since, until]`` time range."""
+        since_dt = _parse_ts(since) if since else None
+        until_dt = _parse_ts(until) if until else None
+        for line in self.scan(ulid, since, until):
+            event = LedgerEvent.from_dict(json.loads(line))
+            ts = _parse_ts(event.ordered_at)
+            if until_dt and ts > until_dt:
+                return
+            if since_dt and ts < since_dt:
+                continue
+            if ulid is None or event.ulid == ulid:
+                yield event
+
+    def scan(
+        self,
+        ulid: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> Iterator[bytes]:
+        """Yield raw candidate lines for ``ulid`` / ``[since, until]`` in ledger order.
+
+        Sealed segments are pruned by time range and read through their
+        index; only the active segment is scanned in full. Lines are a
+        superset of the matches: callers still filter on the decoded
+        event (see :meth:`events`).
+        """
+        since_dt = _parse_ts(since) if since else None
+        until_dt = _parse_ts(until) if until else None
+        for segment in self.segment_paths():
+            idx = self.index_for(segment)
+            if idx is not None:
+                if idx.count == 0:
+                    continue
+                if since_dt and idx.last_ts and _parse_ts(idx.last_ts) < since_dt:
+                    continue
+                if until_dt and idx.first_ts and _parse_ts(idx.first_ts) > until_dt:
+                    return
+            yield from self._lines(segment, idx, ulid, since_dt)
+
+    def _lines(
+        self, segment: Path, idx: Optional[SegmentIndex], ulid: Optional[str], since: Any
+    ) -> Iterator[bytes]:
+        with self.open(segment) as fh:
+            if idx is not None and ulid is not None:
+                for offset in idx.ulids.get(ulid, ()):
+                    fh.seek(offset)
+                    yield fh.readline()
+                return
+            if idx is not None and since is not None and idx.sparse:
+                stamps = [_parse_ts(ts) for ts, _ in idx.sparse]
+                # Start before the first sample at ``since``: earlier lines may share it.
+                pos = bisect_left(stamps, since) - 1
+                fh.seek(idx.sparse[max(pos, 0)][1])
+            for line in fh:
+                if line.strip():
+                    yield line
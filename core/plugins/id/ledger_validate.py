@@ -0,0 +1,122 @@
+"""
+ledger_validate.py
+==================
+
+Bulk schema validation of a whole ledger. The ledger (a JSONL file or
+a segment directory) is split into work units, one per segment or
+line-aligned byte ranges of a single file. The units are streamed
+through :class:`.validate.LedgerEventValidator` in a process pool.
+Each worker compiles the validator once, and most lines pass its fast
+path without reaching ``jsonschema``.
+
+Problems are reported with the file (segment) and 1-based line number
+so they can be located with ``sed -n <line>p``. Workers count lines
+locally; line numbers of later byte ranges are fixed up in the parent
+from the line counts of the ranges before them.
+"""
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .ledger import line_ranges
+from .ledger_segments import SegmentedLedger
+from .validate import ledger_event_validator
+
+
+@dataclass
+class LedgerProblem:
+    """A ledger line that is not valid JSON or violates the schema."""
+
+    file: str
+    line: int
+    errors: List[str]
+
+    def __str__(self) -> str:
+        return f"{self.file}:{self.line}: {'; '.join(self.errors)}"
+
+
+@dataclass
+class LedgerValidation:
+    """Outcome of :func:`validate_ledger`."""
+
+    events: int = 0
+    problems: List[LedgerProblem] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def _validate_range(
+    ledger: str, segment: Optional[str], start: int, end: Optional[int], limit: int
+) -> Tuple[int, int, List[LedgerProblem]]:
+    """Validate ``[start, end)`` of one file; return (lines, events, problems)."""
+    validator = ledger_event_validator()
+    name = segment or Path(ledger).name
+    segments = SegmentedLedger(Path(ledger)) if segment is not None else None
+    path = Path(ledger) / segment if segment is not None else Path(ledger)
+    problems: List[LedgerProblem] = []
+    lines = events = 0
+    pos = start
+    with segments.open(path) if segments is not None else path.open("rb") as fh:
+        fh.seek(start)
+        for raw in fh:
+            if end is not None and pos >= end:
+                break
+            pos += len(raw)
+            lines += 1
+            if not raw.strip():
+                continue
+            events += 1
+            try:
+                errors = validator.errors(json.loads(raw))
+            except ValueError as exc:
+                errors = [f"invalid JSON: {exc}"]
+            if errors and len(problems) < limit:
+                problems.append(LedgerProblem(name, lines, errors))
+    return lines, events, problems
+
+
+def validate_ledger(
+    ledger: Path,
+    workers: int | None = None,
+    limit: int = 1000,
+    chunk_bytes: int = 1 << 20,
+) -> LedgerValidation:
+    """Validate every event in ``ledger``.
+
+    A single file is split into at most one range per worker, each at
+    least ``chunk_bytes`` long. Reports at most ``limit`` problems per
+    work unit.
+    """
+    # Work units are (segment name or None, start offset, end offset or None).
+    units: List[Tuple[Optional[str], int, Optional[int]]]
+    if ledger.is_dir():
+        units = [(p.name, 0, None) for p in SegmentedLedger(ledger).segment_paths()]
+    elif ledger.exists():
+        parts = min(workers or os.cpu_count() or 1, ledger.stat().st_size // chunk_bytes or 1)
+        units = [(None, start, end) for start, end in line_ranges(ledger, parts)]
+    else:
+        units = []
+    if len(units) > 1 and (workers or os.cpu_count() or 1) > 1:
+        names, starts, ends = zip(*units)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_validate_range, [str(ledger)] * len(units),
+                                    names, starts, ends, [limit] * len(units)))
+    else:
+        results = [_validate_range(str(ledger), *unit, limit) for unit in units]
+    out = LedgerValidation()
+    offset = 0
+    for (segment, _, _), (lines, events, problems) in zip(units, results):
+        for problem in problems:
+            if segment is None:
+                problem.line += offset
+            out.problems.append(problem)
+        offset = 0 if segment is not None else offset + lines
+        out.events += events
+    return out
@@ -0,0 +1,222 @@
+"""
+ledger_verify.py
+================
+
+Integrity checks for hash-chained ledgers (written with
+``chain=True``, see :mod:`.ledger`). Every event's ``prev_hash`` must
+equal the SHA-256 of the line before it, and the first event must
+link to :data:`.ledger.GENESIS`. Truncation in the middle, reordering
+and edits all break the chain.
+
+:class:`LedgerVerifier` keeps checkpoints next to the ledger
+(``ids.jsonl.checkpoints`` or ``<segment dir>/checkpoints.jsonl``).
+Each checkpoint records the position and hash of the last verified
+line. An incremental run first confirms that this line is still
+intact, then checks only the events after it and appends a new
+checkpoint. That keeps CI checks proportional to what was appended
+since the last run. A full audit (``full=True``) re-checks everything.
+It splits the ledger into ranges, one per segment or, for a single
+file, byte ranges cut at line boundaries, and verifies them in a
+process pool. Each range reports the ``prev_hash`` it starts from and
+the hash of its last line, and the parent then checks that
+neighbouring ranges link up.
+"""
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ledger import GENESIS, line_hash, line_ranges
+from .ledger_segments import SegmentedLedger, segment_id
+
+
+_PREV_KEY = b'"prev_hash": "'
+
+
+@dataclass
+class VerifyResult:
+    """Outcome of a verification run."""
+
+    ok: bool
+    events: int
+    errors: List[str] = field(default_factory=list)
+    checkpoint: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class _Range:
+    """Verification result for one contiguous range of lines."""
+
+    first_prev: Optional[str] = None
+    last_hash: Optional[str] = None
+    last_offset: int = 0
+    count: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _prev_hash(line: bytes) -> Optional[str]:
+    # Fast path: ``prev_hash`` is serialised last, so it ends the line.
+    body = line.rstrip(b"\n")
+    pos = body.rfind(_PREV_KEY)
+    if pos >= 0 and body.endswith(b'"}') and len(body) - pos - len(_PREV_KEY) == 66:
+        return body[pos + len(_PREV_KEY):-2].decode("ascii")
+    try:
+        value = json.loads(body).get("prev_hash")
+    except ValueError:
+        return None
+    return str(value) if value is not None else None
+
+
+def _verify_range(
+    ledger: str, segment: Optional[str], start: int, end: Optional[int]
+) -> _Range:
+    """Check the chain inside ``[start, end)`` of one file (process-pool worker)."""
+    result = _Range()
+    where = segment or Path(ledger).name
+    ledger_dir = SegmentedLedger(Path(ledger)) if segment is not None else None
+    path = Path(ledger) / segment if segment is not None else Path(ledger)
+    pos = start
+    with ledger_dir.open(path) if ledger_dir is not None else path.open("rb") as fh:
+        fh.seek(start)
+        for line in fh:
+            if end is not None and pos >= end:
+                break
+            offset, pos = pos, pos + len(line)
+            if not line.strip():
+                continue
+            if not line.endswith(b"\n"):
+                result.errors.append(f"{where}@{offset}: incomplete trailing line")
+                break
+            prev = _prev_hash(line)
+            if prev is None:
+                result.errors.append(f"{where}@{offset}: missing prev_hash")
+            elif result.count == 0:
+                result.first_prev = prev
+            elif prev != result.last_hash:
+                result.errors.append(f"{where}@{offset}: chain broken")
+            result.last_hash, result.last_offset = line_hash(line), offset
+            result.count += 1
+    return result
+
+
+class LedgerVerifier:
+    """Verify a hash-chained ledger file or segment directory."""
+
+    def __init__(self, ledger: Path | None = None, workers: int | None = None) -> None:
+        self.ledger = ledger or Path("AUTO_VERSIONING_MOD/.ledger/ids.jsonl")
+        self.workers = workers
+
+    @property
+    def checkpoint_path(self) -> Path:
+        if self.ledger.is_dir():
+            return self.ledger / "checkpoints.jsonl"
+        return self.ledger.with_name(self.ledger.name + ".checkpoints")
+
+    def checkpoints(self) -> List[Dict[str, Any]]:
+        """Return recorded checkpoints, oldest first."""
+        if not self.checkpoint_path.exists():
+            return []
+        with self.checkpoint_path.open(encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+    def verify(self, full: bool = False, record: bool = True) -> VerifyResult:
+        """Verify the chain; with ``record``, append a checkpoint on success.
+
+        Incremental unless ``full`` is set or no checkpoint exists yet.
+        """
+        checkpoints = [] if full else self.checkpoints()
+        if checkpoints:
+            result = self._verify_from(checkpoints[-1])
+        else:
+            result = self._verify_all()
+        if result.ok and record and result.checkpoint is not None:
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.checkpoint_path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(result.checkpoint) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+        return result
+
+    # -- internals -----------------------------------------------------
+
+    def _files(self) -> List[Optional[str]]:
+        """Segment names in order, or ``[None]`` for a single-file ledger."""
+        if self.ledger.is_dir():
+            return [p.name for p in SegmentedLedger(self.ledger).segment_paths()]
+        return [None] if self.ledger.exists() else []
+
+    def _ranges(self) -> List[Tuple[Optional[str], int, Optional[int]]]:
+        if self.ledger.is_dir():
+            return [(name, 0, None) for name in self._files()]
+        if not self.ledger.exists():
+            return []
+        size = self.ledger.stat().st_size
+        parts = min(self.workers or os.cpu_count() or 1, size // (1 << 20) or 1)
+        return [(None, start, end) for start, end in line_ranges(self.ledger, parts)]
+
+    def _verify_all(self) -> VerifyResult:
+        ranges = self._ranges()
+        if len(ranges) > 1 and (self.workers or os.cpu_count() or 1) > 1:
+            names, starts, ends = zip(*ranges)
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(
+                    _verify_range, [str(self.ledger)] * len(ranges), names, starts, ends
+                ))
+        else:
+            results = [_verify_range(str(self.ledger), *r) for r in ranges]
+        return self._link(ranges, results, GENESIS, 0)
+
+    def _verify_from(self, checkpoint: Dict[str, Any]) -> VerifyResult:
+        segment, offset = checkpoint.get("segment"), checkpoint["offset"]
+        files = self._files()
+        ids = [segment_id(name) if name else None for name in files]
+        if segment not in ids:
+            return VerifyResult(False, 0, [f"checkpoint segment {segment} is missing"])
+        anchor = _verify_range(str(self.ledger), files[ids.index(segment)], offset, offset + 1)
+        if anchor.last_hash != checkpoint["hash"]:
+            return VerifyResult(False, 0, [f"checkpointed line at {offset} was modified"])
+        ranges: List[Tuple[Optional[str], int, Optional[int]]] = []
+        for name, sid in zip(files, ids):
+            if sid == segment:
+                ranges.append((name, offset, None))
+            elif sid is not None and segment is not None and sid > segment:
+                ranges.append((name, 0, None))
+        results = [_verify_range(str(self.ledger), *r) for r in ranges]
+        # The first range starts at the anchor line, which is already counted.
+        results[0].count -= 1
+        return self._link(ranges, results, anchor.first_prev or GENESIS, checkpoint["events"])
+
+    def _link(
+        self,
+        ranges: List[Tuple[Optional[str], int, Optional[int]]],
+        results: List[_Range],
+        prev: str,
+        events: int,
+    ) -> VerifyResult:
+        errors: List[str] = []
+        last: Optional[Tuple[Optional[str], _Range]] = None
+        for (name, start, _), result in zip(ranges, results):
+            errors.extend(result.errors)
+            if result.last_hash is None:
+                continue
+            if result.first_prev != prev:
+                errors.append(f"{name or self.ledger.name}@{start}: chain broken")
+            prev = result.last_hash
+            events += result.count
+            last = (name, result)
+        checkpoint = None
+        if last is not None:
+            name, result = last
+            checkpoint = {
+                "segment": segment_id(name) if name else None,
+                "offset": result.last_offset,
+                "hash": result.last_hash,
+                "events": events,
+                "verified_at": datetime.utcnow().isoformat() + "Z",
+            }
+        return VerifyResult(not errors, events, errors, checkpoint)
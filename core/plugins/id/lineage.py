@@ -0,0 +1,207 @@
+"""
+lineage.py
+==========
+
+Merge-graph index over the ID Cards. :class:`~.consolidate.ConsolidatePlugin`
+records a merge twice: ``merged_into`` on each source and ``absorbs`` on
+the target. Resolving a reference to the document that survives means
+following ``merged_into`` through possibly several consolidations.
+:class:`LineageIndex` does that once for all cards:
+
+* merge edges come from ``merged_into`` and, for cards whose own
+  pointer is missing, from the targets' ``absorbs`` lists;
+* every ULID's final target is computed with path compression (as in
+  union-find) and stored, so :meth:`LineageIndex.resolve` is one dict
+  lookup;
+* ``supersedes_version`` adds a "superseded by" edge when it names a
+  known ULID, doc_key or alias (plain version strings are ignored).
+  It contributes to :meth:`LineageIndex.ancestors` but not to
+  resolution, since a superseded document still exists.
+
+``id.registry.build`` writes the index next to the registry
+(``ids/registry.lineage.json``) so link checkers can load it without
+touching cards. Cycles found while building are reported in
+:attr:`LineageIndex.cycles`; :func:`check_merge` stops consolidations
+that would create one in the first place.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+from ...models.id_card import IDCard
+
+
+class LineageCycleError(ValueError):
+    """Raised when a consolidation would make a card merge into itself."""
+
+
+def lineage_path_for(registry_path: Path) -> Path:
+    """Return the lineage index path that accompanies ``registry_path``."""
+    return registry_path.with_name(registry_path.stem + ".lineage.json")
+
+
+def merge_chain(merged_into: Callable[[str], Optional[str]], ulid: str) -> List[str]:
+    """Follow ``merged_into`` from ``ulid``; return the ULIDs visited, ``ulid`` first.
+
+    Stops at a card without a target or, should the data already
+    contain a cycle, when a ULID repeats.
+    """
+    chain = [ulid]
+    seen = {ulid}
+    nxt = merged_into(ulid)
+    while nxt is not None and nxt not in seen:
+        chain.append(nxt)
+        seen.add(nxt)
+        nxt = merged_into(nxt)
+    return chain
+
+
+def check_merge(
+    merged_into: Callable[[str], Optional[str]], target: str, sources: Iterable[str]
+) -> None:
+    """Raise :class:`LineageCycleError` if merging ``sources`` into ``target`` closes a cycle.
+
+    That is the case when a source is ``target`` itself or already
+    lies on the chain ``target`` resolves through.
+    """
+    chain = merge_chain(merged_into, target)
+    looping = [s for s in sources if s in chain]
+    if looping:
+        raise LineageCycleError(
+            f"merging {', '.join(looping)} into {target} would create a cycle "
+            f"({' -> '.join(chain)})"
+        )
+
+
+class LineageIndex:
+    """Resolved merge graph with O(1) final-target lookups."""
+
+    def __init__(
+        self,
+        parents: Mapping[str, str],
+        superseded_by: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        #: ULID -> the card it was merged into.
+        self.parents: Dict[str, str] = dict(parents)
+        #: ULID -> the card that supersedes it.
+        self.superseded_by: Dict[str, str] = dict(superseded_by or {})
+        #: Each merge cycle found in the data, as a list of ULIDs.
+        self.cycles: List[List[str]] = []
+        self._final: Dict[str, str] = {}
+        self._children: Optional[Dict[str, List[str]]] = None
+        for ulid in sorted(self.parents):
+            self._compress(ulid)
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[IDCard]) -> "LineageIndex":
+        return cls.from_entries({c.ulid: c.to_dict() for c in cards})
+
+    @classmethod
+    def from_entries(cls, entries: Mapping[str, Mapping[str, Any]]) -> "LineageIndex":
+        """Build from card dictionaries (or registry entries) keyed by ULID."""
+        parents: Dict[str, str] = {}
+        keys: Dict[str, str] = {}
+        for ulid in sorted(entries):
+            entry = entries[ulid]
+            if entry.get("merged_into"):
+                parents[ulid] = entry["merged_into"]
+            for key in [entry.get("doc_key"), *(entry.get("aliases") or [])]:
+                if key:
+                    keys.setdefault(key, ulid)
+        for ulid in sorted(entries):
+            for src in entries[ulid].get("absorbs") or []:
+                if src != ulid:
+                    parents.setdefault(src, ulid)
+        superseded_by: Dict[str, str] = {}
+        for ulid in sorted(entries):
+            old = entries[ulid].get("supersedes_version")
+            old_ulid = old if old in entries else keys.get(old) if old else None
+            if old_ulid and old_ulid != ulid:
+                superseded_by.setdefault(old_ulid, ulid)
+        return cls(parents, superseded_by)
+
+    @classmethod
+    def load(cls, path: Path) -> "LineageIndex":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        index = cls.__new__(cls)
+        index.parents = data["parents"]
+        index.superseded_by = data["superseded_by"]
+        index.cycles = data["cycles"]
+        index._final = data["final"]
+        index._children = None
+        return index
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "parents": self.parents,
+            "superseded_by": self.superseded_by,
+            "final": self._final,
+            "cycles": self.cycles,
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, sort_keys=True, separators=(",", ":")),
+                       encoding="utf-8")
+        os.replace(tmp, path)
+
+    # -- queries -----------------------------------------------------
+
+    def resolve(self, ulid: str) -> str:
+        """Return the ULID that ``ulid`` was finally merged into (itself if none)."""
+        return self._final.get(ulid, ulid)
+
+    def resolve_many(self, ulids: Sequence[str]) -> Dict[str, str]:
+        final = self._final
+        return {u: final.get(u, u) for u in ulids}
+
+    def chain(self, ulid: str) -> List[str]:
+        """The merge path from ``ulid`` to its final target, both included."""
+        return merge_chain(self.parents.get, ulid)
+
+    def ancestors(self, ulid: str) -> List[str]:
+        """Every ULID merged into, or superseded by, ``ulid`` directly or transitively."""
+        children = self._reverse()
+        seen: Set[str] = {ulid}
+        queue = deque([ulid])
+        while queue:
+            for child in children.get(queue.popleft(), ()):
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        seen.discard(ulid)
+        return sorted(seen)
+
+    def check_merge(self, target: str, sources: Iterable[str]) -> None:
+        """:func:`check_merge` against the indexed graph."""
+        check_merge(self.parents.get, target, sources)
+
+    # -- internals ---------------------------------------------------
+
+    def _compress(self, ulid: str) -> str:
+        path: List[str] = []
+        on_path: Set[str] = set()
+        cur = ulid
+        while cur in self.parents and cur not in self._final:
+            if cur in on_path:
+                self.cycles.append(path[path.index(cur):])
+                break
+            path.append(cur)
+            on_path.add(cur)
+            cur = self.parents[cur]
+        root = self._final.get(cur, cur)
+        for node in path:
+            self._final[node] = root
+        return root
+
+    def _reverse(self) -> Dict[str, List[str]]:
+        if self._children is None:
+            children: Dict[str, List[str]] = {}
+            for edges in (self.parents, self.superseded_by):
+                for child, parent in edges.items():
+                    children.setdefault(parent, []).append(child)
+            self._children = children
+        return self._children
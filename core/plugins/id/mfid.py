@@ -7,55 +7,205 @@ resulting hash can be used to prove the exact content version
 represented by a document. When run, this plugin calculates the
 blake3 hash of a file's normalized contents and updates the ID
 Card and ledger accordingly. This skeleton just computes the hash.
+
+Files are never read whole. :func:`hash_file` streams fixed-size
+chunks into one reused buffer. Files above ``threaded_threshold``
+(when no normalisation is needed) are hashed straight from an mmap
+with blake3's multithreaded mode. With ``normalize_newlines`` CRLF and
+lone CR become LF while streaming, carrying a trailing ``\r`` across
+chunk boundaries, so the file on disk is never rewritten. Memory use
+stays at about one chunk regardless of file size.
+
+:meth:`MFIDPlugin.refresh` sweeps a whole docs tree. Documents name
+their card through the ``ulid`` in their YAML front matter. A
+persistent :class:`HashCache` remembers each file's
+``(device, inode, size, mtime_ns)`` together with its digest and ULID,
+so unchanged files are skipped with a single ``stat``. Changed files
+are hashed on a thread pool (blake3 releases the GIL). Cards and
+MFID_UPDATE events are written only where the digest differs from the
+card's recorded MFID. The cache also marks files whose card was found
+(or made) in sync, together with the stamp of the card as stored then
+(:meth:`.store.CardStore.stamp`). An unchanged file whose card still
+has that stamp does not have its card read, so a sweep with no changes
+parses no YAML and costs two ``stat`` calls per document. Any write to
+the card, such as a rekey, a manual edit or a restored snapshot,
+changes the stamp and gets the card checked again.
 """
 from __future__ import annotations
 
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from typing import Any
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
 import blake3
+import yaml
 from ..id.base import IDPlugin
-from ..models.ledger_event import LedgerEvent
+from ...models.id_card import IDCard
+from ...models.ledger_event import LedgerEvent
 from .ledger import LedgerPlugin
-from ..models.id_card import IDCard
-import yaml
+from .store import CardStore
 from datetime import datetime
 
 
+CHUNK_SIZE = 1 << 20
+THREADED_THRESHOLD = 16 << 20
+
+
+def hash_file(
+    path: Path,
+    normalize_newlines: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    threaded_threshold: int = THREADED_THRESHOLD,
+) -> str:
+    """Return the blake3 hex digest of ``path`` without loading it into memory."""
+    size = path.stat().st_size
+    threaded = size >= threaded_threshold
+    h = blake3.blake3(max_threads=blake3.blake3.AUTO if threaded else 1)
+    if threaded and not normalize_newlines and size:
+        h.update_mmap(path)
+        return str(h.hexdigest())
+    if threaded:
+        # Larger chunks give the worker threads enough input per update.
+        chunk_size = max(chunk_size, 8 * CHUNK_SIZE)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    carry: Optional[bytes] = None
+    with open(path, "rb") as fh:
+        while True:
+            n = fh.readinto(buf)
+            if not n:
+                break
+            if not normalize_newlines:
+                h.update(view[:n])
+                continue
+            data = bytes(view[:n])
+            if carry:
+                data = carry + data
+            carry = None
+            if data.endswith(b"\r"):
+                # Might be the first half of a CRLF split across chunks.
+                data, carry = data[:-1], b"\r"
+            h.update(data.replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+    if carry:
+        h.update(b"\n")
+    return str(h.hexdigest())
+
+
+def front_matter_ulid(path: Path) -> Optional[str]:
+    """Return the ``ulid`` from a document's YAML front matter, if any."""
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        if fh.readline().rstrip("\r\n") != "---":
+            return None
+        lines: List[str] = []
+        for line in fh:
+            if line.rstrip("\r\n") in ("---", "..."):
+                break
+            lines.append(line)
+        else:
+            return None
+    try:
+        data = yaml.safe_load("".join(lines))
+    except yaml.YAMLError:
+        return None
+    ulid = data.get("ulid") if isinstance(data, dict) else None
+    return str(ulid) if ulid else None
+
+
+_StatKey = Tuple[int, int, int, int]
+_CardStamp = Tuple[int, int]
+
+
+def _with_mfid(digest: str) -> Callable[[IDCard], IDCard]:
+    """Card change recording ``digest`` as the MFID (for :meth:`CardStore.update`)."""
+    return lambda card: replace(card, card_version=card.card_version + 1, mfid=digest)
+
+
+class HashCache:
+    """Persistent map of file path to ``(stat key, digest, ulid, synced)``.
+
+    ``synced`` is the stamp the card of ``ulid`` had when it was found
+    (or made) to carry ``digest`` as its MFID, or ``None``; it is
+    cleared whenever the file is re-hashed. Digests depend on
+    ``normalize_newlines``; a cache written with the other setting is
+    discarded on load.
+    """
+
+    def __init__(self, path: Path, normalize_newlines: bool = False) -> None:
+        self.path = path
+        self.normalize_newlines = normalize_newlines
+        self._entries: Dict[str, Tuple[_StatKey, str, Optional[str], Optional[_CardStamp]]] = {}
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("normalize_newlines") == normalize_newlines:
+                for name, (dev, ino, size, mtime, digest, ulid, *rest) in data["files"].items():
+                    # Older caches stored no stamp, or a bare flag: check those cards again.
+                    synced = tuple(rest[0]) if rest and isinstance(rest[0], list) else None
+                    self._entries[name] = ((dev, ino, size, mtime), digest, ulid, synced)
+
+    @staticmethod
+    def key(st: os.stat_result) -> _StatKey:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def get(self, name: str, key: _StatKey) -> Optional[Tuple[str, Optional[str]]]:
+        """Return ``(digest, ulid)`` if ``name`` is cached with the same stat key."""
+        entry = self._entries.get(name)
+        return (entry[1], entry[2]) if entry and entry[0] == key else None
+
+    def set(self, name: str, key: _StatKey, digest: str, ulid: Optional[str]) -> None:
+        self._entries[name] = (key, digest, ulid, None)
+
+    def synced(self, name: str, stamp: _CardStamp) -> bool:
+        """True if ``name`` was marked in sync with its card while it had ``stamp``."""
+        entry = self._entries.get(name)
+        return entry is not None and entry[3] == stamp
+
+    def mark_synced(self, name: str, stamp: Optional[_CardStamp]) -> None:
+        key, digest, ulid, _ = self._entries[name]
+        self._entries[name] = (key, digest, ulid, stamp)
+
+    def prune(self, keep: Set[str]) -> None:
+        for name in set(self._entries) - keep:
+            del self._entries[name]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        files = {name: [*key, digest, ulid, list(synced) if synced else None]
+                 for name, (key, digest, ulid, synced) in self._entries.items()}
+        data = {"normalize_newlines": self.normalize_newlines, "files": files}
+        tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
 class MFIDPlugin(IDPlugin):
     """Calculate and record a blake3 hash for a document."""
 
-    def __init__(self, cards_dir: Path | None = None, ledger_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        ledger_path: Path | None = None,
+        store: CardStore | None = None,
+        retries: int = 8,
+    ) -> None:
         base = Path("AUTO_VERSIONING_MOD")
         self.cards_dir = cards_dir or base / "ids/cards"
+        self.store = store or CardStore.for_dir(self.cards_dir)
         self.ledger = LedgerPlugin(ledger_path)
+        # Setting the MFID commutes with other lifecycle changes, so conflicts retry.
+        self.retries = retries
 
-    def run(self, ulid: str, file_path: Path) -> str:
-        """Compute the blake3 hash of a file and update its ID Card."""
-        h = blake3.blake3()
-        # Normalize: read bytes directly; call caller to normalise line endings if desired
-        with open(file_path, "rb") as fh:
-            h.update(fh.read())
-        digest = h.hexdigest()
-        card_path = self.cards_dir / f"{ulid}.yaml"
-        if card_path.exists():
-            data = yaml.safe_load(card_path.read_text())
-            card = IDCard.from_dict(data)
-            updated_card = IDCard(
-                doc_key=card.doc_key,
-                ulid=card.ulid,
-                semver=card.semver,
-                status=card.status,
-                effective_date=card.effective_date,
-                owner=card.owner,
-                contract_type=card.contract_type,
-                card_version=card.card_version + 1,
-                aliases=card.aliases,
-                supersedes_version=card.supersedes_version,
-                merged_into=card.merged_into,
-                absorbs=card.absorbs,
-                mfid=digest,
-            )
-            yaml.safe_dump(updated_card.to_dict(), card_path.open("w", encoding="utf-8"))
+    def run(self, ulid: str, file_path: Path, normalize_newlines: bool = False) -> str:
+        """Compute the blake3 hash of a file and update its ID Card.
+
+        With ``normalize_newlines`` the hash is taken over the content
+        with CRLF/CR line endings converted to LF.
+        """
+        digest = hash_file(Path(file_path), normalize_newlines=normalize_newlines)
+        if self.store.exists(ulid):
+            card, _ = self.store.update(ulid, _with_mfid(digest), retries=self.retries)
             event = LedgerEvent(
                 event_type="MFID_UPDATE",
                 timestamp=datetime.utcnow().isoformat() + "Z",
@@ -65,3 +215,72 @@ class MFIDPlugin(IDPlugin):
             )
             self.ledger.run(event)
         return digest
+
+    def refresh(
+        self,
+        docs_dir: Path,
+        pattern: str = "**/*.md",
+        cache_path: Path | None = None,
+        workers: int | None = None,
+        normalize_newlines: bool = False,
+    ) -> Dict[str, int]:
+        """Bring the MFIDs of every document under ``docs_dir`` up to date.
+
+        Returns counts: ``scanned`` files, ``hashed`` (cache misses),
+        ``checked`` cards read, ``updated`` cards, and ``unlinked``
+        documents without a ULID or whose card does not exist.
+        """
+        cache = HashCache(
+            cache_path or self.cards_dir.parent / "mfid.cache.json", normalize_newlines
+        )
+        stats = {"scanned": 0, "hashed": 0, "checked": 0, "updated": 0, "unlinked": 0}
+        results: Dict[str, Tuple[str, Optional[str]]] = {}
+        pending: List[Tuple[str, Path, _StatKey]] = []
+        for path in sorted(docs_dir.glob(pattern)):
+            if not path.is_file():
+                continue
+            name = path.relative_to(docs_dir).as_posix()
+            key = HashCache.key(path.stat())
+            cached = cache.get(name, key)
+            if cached is None:
+                pending.append((name, path, key))
+            else:
+                results[name] = cached
+        stats["scanned"] = len(results) + len(pending)
+
+        def work(item: Tuple[str, Path, _StatKey]) -> Tuple[str, Optional[str]]:
+            path = item[1]
+            return hash_file(path, normalize_newlines=normalize_newlines), front_matter_ulid(path)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for (name, _, key), (digest, ulid) in zip(pending, pool.map(work, pending)):
+                cache.set(name, key, digest, ulid)
+                results[name] = (digest, ulid)
+        stats["hashed"] = len(pending)
+        cache.prune(set(results))
+
+        with self.ledger.session(fsync="batch"):
+            for name in sorted(results):
+                digest, ulid = results[name]
+                stamp = self.store.stamp(ulid) if ulid else None
+                if not ulid or stamp is None:
+                    stats["unlinked"] += 1
+                    continue
+                if cache.synced(name, stamp):
+                    continue
+                stats["checked"] += 1
+                if self.store.get(ulid).mfid == digest:
+                    cache.mark_synced(name, stamp)
+                    continue
+                card, _ = self.store.update(ulid, _with_mfid(digest), retries=self.retries)
+                cache.mark_synced(name, self.store.stamp(ulid))
+                self.ledger.run(LedgerEvent(
+                    event_type="MFID_UPDATE",
+                    timestamp=datetime.utcnow().isoformat() + "Z",
+                    ulid=ulid,
+                    doc_key=card.doc_key,
+                    data={"mfid": digest, "path": name},
+                ))
+                stats["updated"] += 1
+        cache.save()
+        return stats
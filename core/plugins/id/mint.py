@@ -2,53 +2,252 @@
 mint.py
 =======
 
-Plugin responsible for minting new IDs. It generates a ULID using
-the python-ulid library, constructs a deterministic document key
-(doc_key) where needed, and creates a new ID Card on disk. It
-also writes an entry to the ledger via the ledger plugin.
-
-This implementation provides only a skeleton of the desired
-behaviour. Real logic will need to ensure uniqueness of keys and
-persist files to the correct directories.
+Plugin responsible for minting new IDs. It generates a ULID,
+constructs a deterministic document key (doc_key) where needed, and
+creates a new ID Card on disk. It also writes an entry to the ledger
+via the ledger plugin.
+
+:meth:`MintPlugin.run` builds a single card and leaves persistence to
+the caller. :meth:`MintPlugin.mint_many` is the bulk path used when
+onboarding a corpus:
+
+* ULIDs come from :class:`MonotonicULID`, so IDs minted within the
+  same millisecond still sort in minting order;
+* doc_keys are checked against the keys and aliases already in use
+  and against the rest of the batch, with O(1) probes per key: into the
+  memory-mapped registry index, if one exists, and into the
+  :class:`~.store.CardStore` doc_key/alias indexes for cards written
+  since that index was built. Those are read into the store once
+  (including cards kept only in the card pack) and kept current by its
+  writes; they are read again only after another process minted. Any
+  collision rejects the whole batch before anything is written;
+* the check and the card writes run under an exclusive lock on
+  ``cards/.mint.lock``, so concurrent minters cannot both claim a key;
+* cards are written in one pass and their CREATE events (carrying the
+  card, see :mod:`.replay`) as a single ledger group.
 """
 from __future__ import annotations
 
 import datetime
-from typing import Any, Dict
-
-import ulid
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
 
 from ..id.base import IDPlugin
-from ..models.id_card import IDCard
+from ...models.id_card import IDCard
+from ...models.ledger_event import LedgerEvent
+from ...models.registry import ulid_from_bytes
+from .ledger import LedgerPlugin, exclusive_lock
+from .pack import INDEX_NAME
+from .registry_index import RegistryIndex
+from .store import CardStore, card_ulid, iter_card_paths
+from .validate import ValidatePlugin
+
+
+LOCK_NAME = ".mint.lock"
+# Card fields minting assigns itself; a spec may not set them.
+RESERVED_FIELDS = frozenset({"ulid", "status", "card_version"})
+
+
+class DocKeyCollisionError(ValueError):
+    """Raised when doc_keys requested for minting are already taken."""
+
+    def __init__(self, collisions: List[str]) -> None:
+        super().__init__(f"doc_key(s) already in use: {', '.join(collisions)}")
+        self.collisions = collisions
+
+
+class MonotonicULID:
+    """Thread-safe ULID generator that is strictly increasing within a process.
+
+    The first ULID of each millisecond gets fresh random bits; later
+    ones in the same millisecond increment the previous random part, as
+    in the ULID spec's monotonic mode.
+    """
+
+    _RANDOM_MAX = (1 << 80) - 1
+
+    def __init__(self, clock: Callable[[], int] = time.time_ns) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_rand = 0
+
+    def __call__(self) -> str:
+        with self._lock:
+            ms = self._clock() // 1_000_000
+            if ms <= self._last_ms:
+                ms, rand = self._last_ms, self._last_rand + 1
+                if rand > self._RANDOM_MAX:
+                    ms, rand = ms + 1, int.from_bytes(os.urandom(10), "big") >> 1
+            else:
+                # Leave headroom so a burst within one millisecond cannot overflow.
+                rand = int.from_bytes(os.urandom(10), "big") >> 1
+            self._last_ms, self._last_rand = ms, rand
+        return ulid_from_bytes(((ms << 80) | rand).to_bytes(16, "big"))
+
+
+new_ulid = MonotonicULID()
 
 
 class MintPlugin(IDPlugin):
     """Create new ID cards with unique ULIDs and doc_keys."""
 
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        ledger_path: Path | None = None,
+        store: CardStore | None = None,
+        index_path: Path | None = None,
+    ) -> None:
+        base = Path("AUTO_VERSIONING_MOD")
+        self.cards_dir = cards_dir or base / "ids/cards"
+        self.index_path = index_path or base / "ids/registry.idx"
+        self._store = store
+        self._ledger_path = ledger_path
+        # Contents of the lock file when this plugin last caught up with the
+        # cards directory; None until it first did.
+        self._last_minted: Optional[bytes] = None
+
+    @property
+    def store(self) -> CardStore:
+        if self._store is None:
+            self._store = CardStore.for_dir(self.cards_dir)
+        return self._store
+
     def run(self, doc_key: str, semver: str, owner: str, contract_type: str, **kwargs: Any) -> IDCard:
         """Generate a new ID card.
 
         Args:
             doc_key: Proposed human-readable identifier. Collisions should be handled
-                by caller prior to invocation.
+                by caller prior to invocation; :meth:`mint_many` checks them.
             semver: Initial semantic version for the document.
             owner: Owner of the document.
             contract_type: Contract type.
 
         Returns:
             A new :class:`IDCard` instance.
+
+        Raises:
+            ValueError: if ``kwargs`` sets a field minting assigns itself
+                (``ulid``, ``status`` or ``card_version``).
+        """
+        return self._card(doc_key, semver, owner, contract_type, datetime.date.today(), **kwargs)
+
+    def mint_many(self, specs: Sequence[Dict[str, Any]], validate: bool = True) -> List[IDCard]:
+        """Mint, persist and log a card for every spec.
+
+        Each spec holds the :meth:`run` arguments (``doc_key``, ``semver``,
+        ``owner``, ``contract_type``) and optionally further card fields
+        such as ``aliases``.
+
+        Raises:
+            DocKeyCollisionError: if any doc_key or alias is already used,
+                by an existing card or within ``specs``; nothing is written.
+            ValueError: if a spec sets ``ulid``, ``status`` or ``card_version``.
+            jsonschema.exceptions.ValidationError: if ``validate`` is set and
+                a card does not match the ID Card schema.
         """
-        new_ulid = ulid.new().str
-        effective_date = datetime.date.today().isoformat()
-        card = IDCard(
+        today = datetime.date.today()
+        cards = [self._card(today=today, **spec) for spec in specs]
+        if validate:
+            validator = ValidatePlugin()
+            for card in cards:
+                validator.run(card)
+        lock_path = self.cards_dir / LOCK_NAME
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_path.open("a+b") as lock_fh, exclusive_lock(lock_fh, lock_path):
+            lock_fh.seek(0)
+            last_minted = lock_fh.read()
+            self._check_unique(cards, caught_up=last_minted == self._last_minted)
+            self.store.put_many(cards)
+            if cards:
+                # Tell other minters there are new cards to catch up with.
+                last_minted = cards[-1].ulid.encode("ascii")
+                lock_fh.truncate(0)
+                lock_fh.write(last_minted)
+                lock_fh.flush()
+            self._last_minted = last_minted
+        ledger = LedgerPlugin(self._ledger_path)
+        with ledger.session(batch_size=max(1, len(cards)), max_delay=float("inf")):
+            for card in cards:
+                ledger.run(LedgerEvent(
+                    event_type="CREATE",
+                    timestamp=datetime.datetime.utcnow().isoformat() + "Z",
+                    ulid=card.ulid,
+                    doc_key=card.doc_key,
+                    data=card.to_dict(),
+                ))
+        return cards
+
+    def _card(
+        self,
+        doc_key: str,
+        semver: str,
+        owner: str,
+        contract_type: str,
+        today: datetime.date,
+        **kwargs: Any,
+    ) -> IDCard:
+        reserved = sorted(RESERVED_FIELDS.intersection(kwargs))
+        if reserved:
+            raise ValueError(f"{', '.join(reserved)} cannot be set when minting {doc_key!r}")
+        return IDCard(
             doc_key=doc_key,
-            ulid=new_ulid,
+            ulid=new_ulid(),
             semver=semver,
             status="active",
-            effective_date=effective_date,
+            effective_date=kwargs.pop("effective_date", today.isoformat()),
             owner=owner,
             contract_type=contract_type,
             card_version=1,
+            aliases=list(kwargs.pop("aliases", [])),
+            **kwargs,
+        )
+
+    def _check_unique(self, cards: Sequence[IDCard], caught_up: bool) -> None:
+        index = RegistryIndex(self.index_path) if self.index_path.exists() else None
+        try:
+            if not caught_up:
+                self._catch_up(index)
+            seen: Set[str] = set()
+            collisions: List[str] = []
+            for card in cards:
+                for key in [card.doc_key, *card.aliases]:
+                    if key in seen or self._taken(key, index):
+                        collisions.append(key)
+                    seen.add(key)
+        finally:
+            if index is not None:
+                index.close()
+        if collisions:
+            raise DocKeyCollisionError(collisions)
+
+    def _taken(self, key: str, index: Optional[RegistryIndex]) -> bool:
+        if index is not None and index.lookup_ulid(key) is not None:
+            return True
+        return (
+            self.store.find_by_doc_key(key) is not None
+            or self.store.find_by_alias(key) is not None
         )
-        # TODO: persist ID card to ids/cards and append CREATE event to ledger.
-        return card
+
+    def _catch_up(self, index: Optional[RegistryIndex]) -> None:
+        """Read the cards the registry index does not cover into the store.
+
+        Without an index that is every card. Cards that live only in the
+        card pack count as recent when the pack index is newer than the
+        registry index.
+        """
+        stamp = self.index_path.stat().st_mtime_ns if index is not None else -1
+        loose: Set[str] = set()
+        for path in iter_card_paths(self.cards_dir):
+            loose.add(card_ulid(path))
+            if path.stat().st_mtime_ns >= stamp:
+                self.store.get(card_ulid(path))
+        pack = self.store.packed()
+        if pack is not None and (pack.dir / INDEX_NAME).stat().st_mtime_ns >= stamp:
+            for ulid in pack.entries:
+                if ulid not in loose and pack.standalone(ulid):
+                    self.store.get(ulid)
@@ -0,0 +1,323 @@
+"""
+pack.py
+=======
+
+Packed card archive for cold starts. Reading the ID state in a fresh
+CI container otherwise means opening and YAML-parsing every card file.
+A pack, similar in spirit to a git packfile, holds all cards as compact
+JSON records in one file, ``cards/.pack/cards-<digest>.pack``, and
+``cards/.pack/index.json`` maps each ULID to its record's offset and
+length. Both live in a hidden directory under ``cards``, which the
+layout helpers in :mod:`.store` do not list.
+
+:class:`~.store.CardStore` consults the pack only for ULIDs without a
+loose YAML file. Loose cards always override packed ones, so editing,
+adding or rekeying a card needs no repack. The index also records the
+stamp (size, mtime) of the loose file each record was packed from. A
+record that still has a stamp but no loose file belongs to a deleted
+card: readers ignore it (see :meth:`CardPack.standalone`) and
+:func:`write_pack` drops it.
+
+* :func:`write_pack` is incremental. Records whose loose file is
+  unchanged are copied from the previous pack without re-parsing, and
+  only new or changed cards are read. A card whose loose file was
+  deleted since it was packed is dropped. With ``prune=True`` the
+  loose files of packed cards are removed afterwards (their index
+  entries are marked as pruned), so later reads go to the pack;
+  records without a loose file are kept;
+* the pack is written under a content-derived name and the index is
+  swapped in last, so a reader never sees an index pointing into the
+  wrong pack.
+
+:func:`create_snapshot` packs the cards and writes the whole ID state
+(the pack, the registry files next to the cards, and the ledger) into
+one ``.tar.gz`` that CI can cache; :func:`restore_snapshot` unpacks
+it. Loose cards are not included, so the archived index has its stamps
+cleared: in a restored tree every record counts as pruned, is served
+from the pack until its card is written again, and survives repacking
+and re-snapshotting.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import tarfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from ...models.id_card import IDCard
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .store import CardStore
+
+
+PACK_DIR = ".pack"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+
+_Stamp = Tuple[int, int]
+# (ULID, packed record, stamp of the loose file it came from or None)
+_Record = Tuple[str, bytes, Optional[_Stamp]]
+
+
+def pack_dir_for(cards_dir: Path) -> Path:
+    return cards_dir / PACK_DIR
+
+
+@dataclass(frozen=True)
+class PackEntry:
+    """Where a card's record sits in the pack, and what it was packed from."""
+
+    offset: int
+    length: int
+    sha256: str
+    # Stamp of the loose file at pack time; ``None`` once that file was pruned.
+    stamp: Optional[_Stamp]
+
+
+class CardPack:
+    """Read-only view of a pack and its index."""
+
+    def __init__(self, cards_dir: Path) -> None:
+        self.dir = pack_dir_for(cards_dir)
+        index = json.loads((self.dir / INDEX_NAME).read_text(encoding="utf-8"))
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported pack index version {index.get('version')}")
+        self.pack_path = self.dir / index["pack"]
+        self.entries: Dict[str, PackEntry] = {
+            ulid: PackEntry(offset, length, sha, tuple(stamp) if stamp else None)
+            for ulid, (offset, length, sha, stamp) in index["entries"].items()
+        }
+        # Opened now so a concurrent repack cannot pull the file away.
+        self._fh: BinaryIO = self.pack_path.open("rb")
+
+    @classmethod
+    def open(cls, cards_dir: Path) -> Optional["CardPack"]:
+        """Return the pack of ``cards_dir``, or ``None`` if it has none."""
+        try:
+            return cls(cards_dir)
+        except FileNotFoundError:
+            return None
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def __contains__(self, ulid: str) -> bool:
+        return ulid in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def standalone(self, ulid: str) -> bool:
+        """True if ``ulid``'s record stands in for a loose file that was pruned.
+
+        Records packed from a loose file that still exists are shadowed
+        by it; if that file is gone, the card was deleted.
+        """
+        entry = self.entries.get(ulid)
+        return entry is not None and entry.stamp is None
+
+    def raw(self, ulid: str) -> bytes:
+        """Return the record for ``ulid`` (compact JSON, with trailing newline)."""
+        entry = self.entries[ulid]
+        self._fh.seek(entry.offset)
+        return self._fh.read(entry.length)
+
+    def get(self, ulid: str) -> IDCard:
+        return IDCard.from_dict(json.loads(self.raw(ulid)))
+
+    def cards(self) -> Iterator[IDCard]:
+        """Yield every packed card, reading the pack sequentially."""
+        self._fh.seek(0)
+        for line in self._fh:
+            if line.strip():
+                yield IDCard.from_dict(json.loads(line))
+
+
+def _record(card: IDCard) -> bytes:
+    data = json.dumps(card.to_dict(), sort_keys=True, separators=(",", ":"))
+    return data.encode("utf-8") + b"\n"
+
+
+def write_pack(store: "CardStore", prune: bool = False) -> Dict[str, int]:
+    """(Re)generate the pack of ``store``'s cards directory.
+
+    Returns counts of ``packed`` cards, ``reused`` records copied from
+    the previous pack, ``parsed`` loose cards, ``dropped`` records whose
+    card was deleted, and ``pruned`` loose files removed.
+    """
+    from .store import card_ulid, iter_card_paths
+
+    loose = {card_ulid(p): p for p in iter_card_paths(store.cards_dir)}
+    stats = {"packed": 0, "reused": 0, "parsed": 0, "dropped": 0, "pruned": 0}
+    records = _collect(store, loose, stats)
+    _write(pack_dir_for(store.cards_dir), records, prune)
+    if prune:
+        stats["pruned"] = _prune(records, loose)
+    stats["packed"] = len(records)
+    return stats
+
+
+def _collect(store: "CardStore", loose: Dict[str, Path], stats: Dict[str, int]) -> List[_Record]:
+    """Gather the records of the new pack, reusing unchanged ones from the old."""
+    old = CardPack.open(store.cards_dir)
+    old_entries = old.entries if old is not None else {}
+    records: List[_Record] = []
+    try:
+        for ulid in sorted(set(loose) | set(old_entries)):
+            path = loose.get(ulid)
+            entry = old_entries.get(ulid)
+            if path is None:
+                assert old is not None and entry is not None
+                if entry.stamp is not None:
+                    stats["dropped"] += 1  # the loose card was deleted
+                    continue
+                records.append((ulid, old.raw(ulid), None))
+                stats["reused"] += 1
+                continue
+            st = path.stat()
+            stamp = (st.st_size, st.st_mtime_ns)
+            if old is not None and entry is not None and entry.stamp == stamp:
+                records.append((ulid, old.raw(ulid), stamp))
+                stats["reused"] += 1
+            else:
+                records.append((ulid, _record(store.get(ulid)), stamp))
+                stats["parsed"] += 1
+    finally:
+        if old is not None:
+            old.close()
+    return records
+
+
+def _write(pack_dir: Path, records: List[_Record], prune: bool) -> None:
+    """Write the pack under a content-derived name, then swap in its index."""
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    entries: Dict[str, List[Any]] = {}
+    tmp = pack_dir / f"pack.{os.getpid()}.tmp"
+    with tmp.open("wb") as fh:
+        offset = 0
+        for ulid, raw, stamp in records:
+            fh.write(raw)
+            digest.update(raw)
+            kept = None if prune or stamp is None else list(stamp)
+            entries[ulid] = [offset, len(raw), hashlib.sha256(raw).hexdigest(), kept]
+            offset += len(raw)
+        fh.flush()
+        os.fsync(fh.fileno())
+    name = f"cards-{digest.hexdigest()[:16]}.pack"
+    os.replace(tmp, pack_dir / name)
+    index_tmp = pack_dir / f"{INDEX_NAME}.tmp"
+    index_tmp.write_text(
+        json.dumps({"version": INDEX_VERSION, "pack": name, "entries": entries},
+                   separators=(",", ":")),
+        encoding="utf-8",
+    )
+    os.replace(index_tmp, pack_dir / INDEX_NAME)
+    for stale in pack_dir.glob("cards-*.pack"):
+        if stale.name != name:
+            stale.unlink()
+
+
+def _prune(records: List[_Record], loose: Dict[str, Path]) -> int:
+    """Remove the loose files of packed cards unless edited meanwhile; return how many."""
+    pruned = 0
+    for ulid, _, packed_stamp in records:
+        if packed_stamp is None:
+            continue
+        st = loose[ulid].stat()
+        if (st.st_size, st.st_mtime_ns) == packed_stamp:
+            loose[ulid].unlink()
+            pruned += 1
+    return pruned
+
+
+# -- snapshots -------------------------------------------------------
+
+
+def _snapshot_members(root: Path, cards_dir: Path) -> Iterator[Path]:
+    """Files that make up the ID state under ``root``, minus loose cards."""
+    from .store import iter_card_paths
+
+    loose = set(iter_card_paths(cards_dir))
+    for top in (cards_dir.parent, root / ".ledger"):
+        if not top.exists():
+            continue
+        for dirpath, _, filenames in os.walk(top):
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                if path in loose or filename.endswith(".tmp") or filename.endswith(".lock"):
+                    continue
+                yield path
+
+
+def _detached_index(index_path: Path) -> bytes:
+    """The pack index with every loose-file stamp cleared, as if all were pruned."""
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    for entry in index["entries"].values():
+        entry[3] = None
+    return json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+
+def create_snapshot(
+    out: Path, root: Path | None = None, cards_dir: Path | None = None
+) -> Dict[str, int]:
+    """Pack the cards and archive the whole ID state under ``root`` to ``out``.
+
+    Returns the :func:`write_pack` counts plus the number of ``files``
+    archived.
+    """
+    from .store import CardStore
+
+    root = root or Path("AUTO_VERSIONING_MOD")
+    cards_dir = cards_dir or root / "ids/cards"
+    stats = write_pack(CardStore.for_dir(cards_dir))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    index_path = pack_dir_for(cards_dir) / INDEX_NAME
+    files = 0
+    with tarfile.open(tmp, "w:gz") as tar:
+        for path in _snapshot_members(root, cards_dir):
+            arcname = path.relative_to(root).as_posix()
+            if path == index_path:
+                data = _detached_index(path)
+                info = tar.gettarinfo(path, arcname=arcname)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            else:
+                tar.add(path, arcname=arcname, recursive=False)
+            files += 1
+    os.replace(tmp, out)
+    stats["files"] = files
+    return stats
+
+
+def restore_snapshot(archive: Path, root: Path | None = None) -> int:
+    """Extract a :func:`create_snapshot` archive under ``root``; return the file count.
+
+    Raises:
+        ValueError: if the archive holds anything but regular files and
+            directories below ``root``.
+    """
+    root = root or Path("AUTO_VERSIONING_MOD")
+    with tarfile.open(archive, "r:gz") as tar:
+        members = tar.getmembers()
+        for member in members:
+            name = PurePosixPath(member.name)
+            if name.is_absolute() or ".." in name.parts or not (member.isfile() or member.isdir()):
+                raise ValueError(f"refusing to extract {member.name!r}")
+        root.mkdir(parents=True, exist_ok=True)
+        for member in members:
+            if member.isfile():
+                target = root / member.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                src = tar.extractfile(member)
+                assert src is not None
+                with src, target.open("wb") as dst:
+                    dst.write(src.read())
+                os.utime(target, (member.mtime, member.mtime))
+    return sum(1 for m in members if m.isfile())
+
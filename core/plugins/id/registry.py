@@ -3,43 +3,344 @@ registry.py
 ===========
 
 Plugin responsible for building the ID registry from the stored
-ID Cards. It parses all YAML files under ``ids/cards`` and
+ID Cards. It parses the YAML files under ``ids/cards`` and
 constructs a bidirectional lookup mapping. The resulting
-registry is written to ``ids/registry.yaml``. This skeleton only
-assembles the registry in memory and writes a placeholder YAML
-file.
+registry is written to ``ids/registry.yaml``.
+
+Builds are incremental by default. A JSON manifest next to the
+registry records the size, mtime and content hash of every card seen by
+the previous build, together with the registry entries themselves; only
+added, changed or removed cards are parsed and patched into those
+entries, so an incremental build never re-parses ``registry.yaml``, and
+the registry file is left untouched when no entry changed. A card whose
+stat changed but whose content hash did not (touched, checked out,
+copied) only has its stamp refreshed; the hash is taken in the main
+process, so such cards never reach the parser or the process pool.
+Cards that exist only in the card pack (see :mod:`.pack`) are tracked
+by the digest of their packed record and read from the pack. The
+registry and the manifest are replaced atomically; a manifest that
+cannot be read falls back to a full build.
+
+With ``workers > 1`` the cards that need parsing are sharded across a
+process pool. Workers return compact ``(name, digest, ulid, doc_key,
+aliases, fields)`` tuples which the main process merges in ULID order, so the
+result does not depend on scheduling. Duplicate doc_keys and aliases
+claimed by more than one ULID are reported in
+:attr:`RegistryBuildPlugin.conflicts`.
+
+Whenever the registry is written, a memory-mappable binary index
+(``ids/registry.idx``, see :mod:`.registry_index`) is written next to
+it for fast lookups from hooks and the CLI, together with the sorted
+key list used by :class:`~.search.SearchIndex` and the merge graph
+used by :class:`~.lineage.LineageIndex`. Registry entries also
+carry the card's status, owner and contract_type, which back the
+inverted indexes queried by :meth:`~core.models.registry.Registry.query`,
+plus the merge fields (``merged_into``, ``absorbs``, ``supersedes_version``);
+:func:`load_registry` restores them from ``registry.yaml`` alone. ``compact=True`` returns a
+:class:`~core.models.registry.CompactRegistry` for very large ID sets.
 """
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
 import yaml
 
 from ..id.base import IDPlugin
-from ..models.id_card import IDCard
-from ..models.registry import Registry
+from ...models.registry import INDEXED_FIELDS, CompactRegistry, Registry
+from .lineage import LineageIndex, lineage_path_for
+from .pack import PACK_DIR, CardPack
+from .registry_index import index_path_for, write_index
+from .search import SearchIndex, search_path_for
+from .store import CardStore, card_ulid, iter_card_paths
+
+
+MANIFEST_VERSION = 4
+_LINEAGE_FIELDS = ("merged_into", "absorbs", "supersedes_version")
+
+_Scanned = Tuple[str, str, str, str, List[str], Dict[str, Any]]
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class RegistryConflictError(ValueError):
+    """Raised in strict mode when a doc_key or alias maps to several ULIDs."""
+
+
+def _indexed(data: Dict[str, Any]) -> Dict[str, str]:
+    return {f: data[f] for f in INDEXED_FIELDS if data.get(f) is not None}
+
+
+def _entry_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Indexed fields plus the merge fields the lineage index is built from."""
+    fields: Dict[str, Any] = _indexed(data)
+    fields.update((f, data[f]) for f in _LINEAGE_FIELDS if data.get(f))
+    return fields
+
+
+def _scan_shard(cards_dir: str, names: Sequence[str]) -> List[_Scanned]:
+    """Hash and parse a shard of card files (runs in a worker process)."""
+    out: List[_Scanned] = []
+    for name in names:
+        raw = (Path(cards_dir) / name).read_bytes()
+        data = yaml.load(raw, Loader=_Loader)
+        out.append((name, hashlib.sha256(raw).hexdigest(), data["ulid"], data["doc_key"],
+                    list(data.get("aliases") or []), _entry_fields(data)))
+    return out
+
+
+def load_registry(registry_path: Path, compact: bool = False) -> Union[Registry, CompactRegistry]:
+    """Load a registry, including its field indexes, from ``registry.yaml``."""
+    entries = yaml.load(registry_path.read_text(encoding="utf-8"), Loader=_Loader) or {}
+    reg = CompactRegistry() if compact else Registry()
+    for ulid in sorted(entries):
+        entry = entries[ulid]
+        reg.add_entry(ulid, entry["doc_key"], aliases=entry.get("aliases"), **_indexed(entry))
+    return reg
 
 
 class RegistryBuildPlugin(IDPlugin):
     """Build the registry from ID Card YAML files."""
 
-    def __init__(self, cards_dir: Path | None = None, registry_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        registry_path: Path | None = None,
+        store: CardStore | None = None,
+        manifest_path: Path | None = None,
+        workers: int = 1,
+        strict: bool = False,
+        compact: bool = False,
+    ) -> None:
         base = Path("AUTO_VERSIONING_MOD")
         self.cards_dir = cards_dir or base / "ids/cards"
         self.registry_path = registry_path or base / "ids/registry.yaml"
+        self.manifest_path = manifest_path or self.registry_path.with_name(
+            self.registry_path.stem + ".manifest.json"
+        )
+        self.index_path = index_path_for(self.registry_path)
+        self.search_path = search_path_for(self.registry_path)
+        self.lineage_path = lineage_path_for(self.registry_path)
+        self.store = store or CardStore.for_dir(self.cards_dir)
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.strict = strict
+        self.compact = compact
+        #: Counts from the last run: ``parsed``, ``removed`` and ``written`` (0 or 1).
+        self.stats: Dict[str, int] = {}
+        #: ``(key, ulids)`` pairs for keys claimed by more than one ULID.
+        self.conflicts: List[Tuple[str, List[str]]] = []
+
+    def run(self, full: bool = False) -> Union[Registry, CompactRegistry]:
+        """Generate a registry from existing ID cards and persist it.
 
-    def run(self) -> Registry:
-        """Generate a registry from existing ID cards and persist it."""
-        reg = Registry()
+        Args:
+            full: Ignore the manifest and re-parse every card.
+        """
         if not self.cards_dir.exists():
-            return reg
-        for path in self.cards_dir.glob("*.yaml"):
-            data = yaml.safe_load(path.read_text())
-            card = IDCard.from_dict(data)
-            reg.add_entry(card.ulid, card.doc_key, aliases=card.aliases)
-        # Write registry to YAML
-        self.registry_path.parent.mkdir(parents=True, exist_ok=True)
-        yaml.safe_dump({k: {"ulid": k, "doc_key": v, "aliases": reg.aliases.get(k, [])}
-                        for k, v in reg.by_ulid.items()},
-                       self.registry_path.open("w", encoding="utf-8"))
+            self.stats = {"parsed": 0, "removed": 0, "written": 0}
+            return CompactRegistry() if self.compact else Registry()
+        manifest, entries = ({}, {}) if full else self._load_previous()
+        new_manifest: Dict[str, List[Any]] = {}
+        pending, loose = self._changed_loose(manifest, new_manifest)
+        pack = self.store.packed()
+        scanned = self._scan([name for name, _, _ in pending])
+        if pack is not None:
+            packed = self._changed_packed(pack, loose, manifest, new_manifest)
+            pending += packed
+            scanned += [self._scan_packed(pack, name) for name, _, _ in packed]
+        parsed = self._merge(pending, scanned, manifest, new_manifest, entries)
+        removed = self._remove_deleted(manifest, new_manifest, entries)
+        reg = self._to_registry(entries)
+        written = self._write(reg, entries, bool(parsed or removed))
+        if written or new_manifest != manifest:
+            self._write_manifest(new_manifest, entries)
+        self.stats = {"parsed": parsed, "removed": removed, "written": written}
+        return reg
+
+    def _changed_loose(
+        self, manifest: Dict[str, List[Any]], new_manifest: Dict[str, List[Any]]
+    ) -> Tuple[List[Tuple[str, int, int]], Set[str]]:
+        """Return the loose cards whose content changed, and the ULIDs of all loose cards.
+
+        Unchanged cards are carried over into ``new_manifest``, with a
+        fresh stamp if only their stat changed.
+        """
+        pending: List[Tuple[str, int, int]] = []
+        loose: Set[str] = set()
+        for path in sorted(iter_card_paths(self.cards_dir)):
+            name = path.relative_to(self.cards_dir).as_posix()
+            loose.add(card_ulid(path))
+            st = path.stat()
+            prev = manifest.get(name)
+            if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                new_manifest[name] = prev
+                continue
+            if prev and prev[0] == st.st_size:
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+                if digest == prev[2]:
+                    new_manifest[name] = [st.st_size, st.st_mtime_ns, digest, prev[3]]
+                    continue
+            pending.append((name, st.st_size, st.st_mtime_ns))
+        return pending, loose
+
+    @staticmethod
+    def _changed_packed(
+        pack: CardPack,
+        loose: Set[str],
+        manifest: Dict[str, List[Any]],
+        new_manifest: Dict[str, List[Any]],
+    ) -> List[Tuple[str, int, int]]:
+        """Return packed-only cards whose record changed; carry the rest over.
+
+        Packed records carry a digest already, so nothing is hashed here.
+        """
+        packed: List[Tuple[str, int, int]] = []
+        for ulid in sorted(set(pack.entries) - loose):
+            if not pack.standalone(ulid):
+                continue  # the loose card was deleted
+            entry = pack.entries[ulid]
+            name = f"{PACK_DIR}/{ulid}"
+            prev = manifest.get(name)
+            if prev and prev[2] == entry.sha256:
+                new_manifest[name] = prev
+            else:
+                packed.append((name, entry.length, entry.offset))
+        return packed
+
+    @staticmethod
+    def _merge(
+        pending: List[Tuple[str, int, int]],
+        scanned: List[Optional[_Scanned]],
+        manifest: Dict[str, List[Any]],
+        new_manifest: Dict[str, List[Any]],
+        entries: Dict[str, Dict[str, Any]],
+    ) -> int:
+        """Patch scanned cards into ``entries``; return how many changed."""
+        parsed = 0
+        for (name, size, mtime), item in zip(pending, scanned):
+            if item is None:
+                continue
+            prev = manifest.get(name)
+            _, digest, ulid, doc_key, aliases, fields = item
+            new_manifest[name] = [size, mtime, digest, ulid]
+            if prev and prev[2] == digest:
+                continue
+            if prev and prev[3] != ulid:
+                entries.pop(prev[3], None)
+            entries[ulid] = {"ulid": ulid, "doc_key": doc_key, "aliases": aliases, **fields}
+            parsed += 1
+        return parsed
+
+    @staticmethod
+    def _remove_deleted(
+        manifest: Dict[str, List[Any]],
+        new_manifest: Dict[str, List[Any]],
+        entries: Dict[str, Dict[str, Any]],
+    ) -> int:
+        """Drop entries of cards that disappeared; return how many."""
+        removed = 0
+        live = {entry[3] for entry in new_manifest.values()}
+        for name in set(manifest) - set(new_manifest):
+            # A card that only moved (e.g. between layouts) is still live.
+            if manifest[name][3] not in live:
+                entries.pop(manifest[name][3], None)
+                removed += 1
+        return removed
+
+    def _write(
+        self,
+        reg: Union[Registry, CompactRegistry],
+        entries: Dict[str, Dict[str, Any]],
+        changed: bool,
+    ) -> int:
+        """Write the registry and its side indexes as needed; return 1 if written."""
+        written = 0
+        if changed or not self.registry_path.exists():
+            self.registry_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.registry_path.with_name(self.registry_path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as fh:
+                yaml.dump(entries, fh, Dumper=_Dumper)
+            os.replace(tmp, self.registry_path)
+            written = 1
+        if written or not self.index_path.exists():
+            write_index(reg, self.index_path)
+        if written or not self.search_path.exists():
+            SearchIndex.from_registry(reg).save(self.search_path)
+        if written or not self.lineage_path.exists():
+            LineageIndex.from_entries(entries).save(self.lineage_path)
+        return written
+
+    def _write_manifest(
+        self, manifest: Dict[str, List[Any]], entries: Dict[str, Dict[str, Any]]
+    ) -> None:
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": manifest, "entries": entries},
+                       sort_keys=True, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.manifest_path)
+
+    @staticmethod
+    def _scan_packed(pack: CardPack, name: str) -> _Scanned:
+        ulid = name[len(PACK_DIR) + 1:]
+        card = pack.get(ulid)
+        return (name, pack.entries[ulid].sha256, card.ulid, card.doc_key, list(card.aliases),
+                _entry_fields(card.to_dict()))
+
+    def _scan(self, names: List[str]) -> List[Optional[_Scanned]]:
+        """Hash and parse ``names``, in order, serially or on a process pool."""
+        if self.workers <= 1 or len(names) < 2 * self.workers:
+            # Same parser as the workers, so serial and parallel runs compare fairly.
+            out: List[Optional[_Scanned]] = list(_scan_shard(str(self.cards_dir), names))
+            return out
+        n_shards = self.workers * 4
+        shards = [names[i::n_shards] for i in range(n_shards)]
+        by_name: Dict[str, _Scanned] = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(_scan_shard, str(self.cards_dir), shard)
+                       for shard in shards if shard]
+            for fut in futures:
+                for item in fut.result():
+                    by_name[item[0]] = item
+        return [by_name.get(name) for name in names]
+
+    def _load_previous(self) -> Tuple[Dict[str, List[Any]], Dict[str, Dict[str, Any]]]:
+        """Return the previous manifest and registry entries, or empties.
+
+        Empties, and so a full build, also when the manifest cannot be read.
+        """
+        if not (self.manifest_path.exists() and self.registry_path.exists()):
+            return {}, {}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version") != MANIFEST_VERSION:
+                return {}, {}
+            files, entries = manifest["files"], manifest["entries"]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {}, {}
+        if not (isinstance(files, dict) and isinstance(entries, dict)):
+            return {}, {}
+        return files, entries
+
+    def _to_registry(
+        self, entries: Dict[str, Dict[str, Any]]
+    ) -> Union[Registry, CompactRegistry]:
+        """Merge entries in ULID order, recording doc_key/alias collisions."""
+        reg = CompactRegistry() if self.compact else Registry()
+        owners: Dict[str, List[str]] = {}
+        for ulid in sorted(entries):
+            entry = entries[ulid]
+            for key in {entry["doc_key"], *(entry.get("aliases") or [])}:
+                owners.setdefault(key, []).append(ulid)
+            reg.add_entry(ulid, entry["doc_key"], aliases=entry.get("aliases"),
+                          **_indexed(entry))
+        self.conflicts = sorted((k, u) for k, u in owners.items() if len(u) > 1)
+        if self.conflicts and self.strict:
+            detail = "; ".join(f"{k}: {', '.join(u)}" for k, u in self.conflicts)
+            raise RegistryConflictError(f"registry key collisions: {detail}")
         return reg
@@ -0,0 +1,178 @@
+"""
+registry_index.py
+=================
+
+Compact binary form of the ID registry for tools that only need to
+resolve doc_keys and aliases to ULIDs (and back). The file is written
+next to ``ids/registry.yaml`` by ``id.registry.build`` and opened with
+``mmap``, so a lookup touches a handful of pages instead of parsing
+YAML or cards.
+
+Layout (all integers little-endian)::
+
+    header   magic "IDXR", version, n_ulids, key_slots, ulid_slots,
+             offsets of the key table, ulid slots, ulid records, strings
+    keys     key_slots  x (str_off u32, str_len u32, ulid_idx u32)
+    ulids    ulid_slots x (ulid_idx u32)
+    records  n_ulids    x (ulid_off u32, ulid_len u32, key_off u32, key_len u32)
+    strings  UTF-8 ULIDs, doc_keys and aliases
+
+Both hash tables use open addressing with linear probing on
+``zlib.crc32``; empty slots hold ``0xFFFFFFFF``.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from ...models.registry import CompactRegistry, Registry
+
+
+MAGIC = b"IDXR"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIIIIII")
+_KEY_SLOT = struct.Struct("<III")
+_ULID_SLOT = struct.Struct("<I")
+_RECORD = struct.Struct("<IIII")
+_EMPTY = 0xFFFFFFFF
+
+
+def _slots_for(n: int) -> int:
+    size = 8
+    while size < n * 2:
+        size <<= 1
+    return size
+
+
+def index_path_for(registry_path: Path) -> Path:
+    """Return the binary index path that accompanies ``registry_path``."""
+    return registry_path.with_suffix(".idx")
+
+
+def write_index(registry: Union[Registry, CompactRegistry], path: Path) -> None:
+    """Serialise ``registry`` to the binary index format at ``path``.
+
+    The file is written to a temporary name and renamed into place, so
+    readers that already mapped the previous index are unaffected.
+    """
+    ulids = sorted(registry.by_ulid)
+    ulid_idx = {u: i for i, u in enumerate(ulids)}
+    strings = bytearray()
+    offsets: Dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        off = offsets.get(s)
+        if off is None:
+            off = offsets[s] = len(strings)
+            strings.extend(s.encode("utf-8"))
+        return off
+
+    records = bytearray()
+    for u in ulids:
+        key = registry.by_ulid[u]
+        records += _RECORD.pack(intern(u), len(u.encode("utf-8")),
+                                intern(key), len(key.encode("utf-8")))
+
+    key_slots = _slots_for(len(registry.by_key))
+    key_table: List[Optional[Tuple[int, int, int]]] = [None] * key_slots
+    for key in sorted(registry.by_key):
+        raw = key.encode("utf-8")
+        slot = zlib.crc32(raw) & (key_slots - 1)
+        while key_table[slot] is not None:
+            slot = (slot + 1) & (key_slots - 1)
+        key_table[slot] = (intern(key), len(raw), ulid_idx[registry.by_key[key]])
+
+    ulid_slots = _slots_for(len(ulids))
+    ulid_table = [_EMPTY] * ulid_slots
+    for i, u in enumerate(ulids):
+        slot = zlib.crc32(u.encode("utf-8")) & (ulid_slots - 1)
+        while ulid_table[slot] != _EMPTY:
+            slot = (slot + 1) & (ulid_slots - 1)
+        ulid_table[slot] = i
+
+    keys_off = _HEADER.size
+    ulids_off = keys_off + key_slots * _KEY_SLOT.size
+    records_off = ulids_off + ulid_slots * _ULID_SLOT.size
+    strings_off = records_off + len(records)
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(ulids), key_slots, ulid_slots,
+                                 keys_off, ulids_off, records_off, strings_off))
+    for entry in key_table:
+        out += _KEY_SLOT.pack(*(entry or (_EMPTY, 0, _EMPTY)))
+    out += struct.pack(f"<{ulid_slots}I", *ulid_table)
+    out += records
+    out += strings
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(bytes(out))
+    os.replace(tmp, path)
+
+
+class RegistryIndex:
+    """Read-only, memory-mapped registry with the :class:`Registry` lookup API."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._n_ulids, self._key_slots, self._ulid_slots,
+         self._keys_off, self._ulids_off, self._records_off,
+         self._strings_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} registry index")
+
+    def __enter__(self) -> "RegistryIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self._n_ulids)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def lookup_ulid(self, doc_key: str) -> Optional[str]:
+        """Return the ULID for a given document key or alias."""
+        raw = doc_key.encode("utf-8")
+        mask = self._key_slots - 1
+        slot = zlib.crc32(raw) & mask
+        while True:
+            off, length, idx = _KEY_SLOT.unpack_from(
+                self._mm, self._keys_off + slot * _KEY_SLOT.size
+            )
+            if off == _EMPTY:
+                return None
+            if length == len(raw) and self._string(off, length) == raw:
+                return self._record(idx)[0]
+            slot = (slot + 1) & mask
+
+    def lookup_key(self, ulid: str) -> Optional[str]:
+        """Return the primary document key for a given ULID."""
+        raw = ulid.encode("utf-8")
+        mask = self._ulid_slots - 1
+        slot = zlib.crc32(raw) & mask
+        while True:
+            (idx,) = _ULID_SLOT.unpack_from(self._mm, self._ulids_off + slot * _ULID_SLOT.size)
+            if idx == _EMPTY:
+                return None
+            rec_ulid, key = self._record(idx)
+            if rec_ulid == ulid:
+                return key
+            slot = (slot + 1) & mask
+
+    def _string(self, off: int, length: int) -> bytes:
+        start = self._strings_off + off
+        return self._mm[start:start + length]
+
+    def _record(self, idx: int) -> Tuple[str, str]:
+        u_off, u_len, k_off, k_len = _RECORD.unpack_from(
+            self._mm, self._records_off + idx * _RECORD.size
+        )
+        return (self._string(u_off, u_len).decode("utf-8"),
+                self._string(k_off, k_len).decode("utf-8"))
@@ -5,55 +5,58 @@ rekey.py
 Plugin implementing the REKEY operation. It updates the human
 identifier (doc_key) for a document by modifying its ID Card and
 adding the previous doc_key to the aliases list. A REKEY event is
-also appended to the ledger. This skeleton updates the in-memory
-representation; persistence should be handled in future work.
+also appended to the ledger.
+
+The card is written with a compare-and-swap on ``card_version`` (see
+:meth:`.store.CardStore.update`). Conflicting writes that left the
+doc_key alone (a concurrent deprecation, say) are retried on the fresh
+card. A concurrent rekey is not: which key wins would depend on
+timing, so :class:`.store.CardConflictError` is raised instead.
 """
 from __future__ import annotations
 
-from typing import Any
+from dataclasses import replace
 from datetime import datetime
-import yaml
 from pathlib import Path
 
 from ..id.base import IDPlugin
-from ..models.id_card import IDCard
-from ..models.ledger_event import LedgerEvent
+from ...models.id_card import IDCard
+from ...models.ledger_event import LedgerEvent
 from .ledger import LedgerPlugin
+from .store import CardConflictError, CardStore
 
 
 class RekeyPlugin(IDPlugin):
     """Update the doc_key for an existing ID Card and log the change."""
 
-    def __init__(self, cards_dir: Path | None = None, ledger_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        cards_dir: Path | None = None,
+        ledger_path: Path | None = None,
+        store: CardStore | None = None,
+        retries: int = 8,
+    ) -> None:
         base = Path("AUTO_VERSIONING_MOD")
         self.cards_dir = cards_dir or base / "ids/cards"
+        self.store = store or CardStore.for_dir(self.cards_dir)
         self.ledger = LedgerPlugin(ledger_path)
+        self.retries = retries
 
     def run(self, ulid: str, new_key: str) -> None:
         """Perform a REKEY operation on the ID specified by ULID."""
-        card_path = self.cards_dir / f"{ulid}.yaml"
-        if not card_path.exists():
-            raise FileNotFoundError(f"ID Card {ulid} does not exist")
-        data = yaml.safe_load(card_path.read_text())
-        card = IDCard.from_dict(data)
-        # update card
-        aliases = card.aliases + [card.doc_key]
-        updated_card = IDCard(
-            doc_key=new_key,
-            ulid=card.ulid,
-            semver=card.semver,
-            status=card.status,
-            effective_date=card.effective_date,
-            owner=card.owner,
-            contract_type=card.contract_type,
-            card_version=card.card_version + 1,
-            aliases=aliases,
-            supersedes_version=card.supersedes_version,
-            merged_into=card.merged_into,
-            absorbs=card.absorbs,
-            mfid=card.mfid,
-        )
-        yaml.safe_dump(updated_card.to_dict(), card_path.open("w", encoding="utf-8"))
+        first = self.store.get(ulid)
+
+        def rekey(card: IDCard) -> IDCard:
+            if card.doc_key != first.doc_key:
+                raise CardConflictError(ulid, first.card_version, card.card_version)
+            return replace(
+                card,
+                doc_key=new_key,
+                card_version=card.card_version + 1,
+                aliases=card.aliases + [card.doc_key],
+            )
+
+        card, _ = self.store.update(ulid, rekey, retries=self.retries)
         # append ledger event
         event = LedgerEvent(
             event_type="REKEY",
@@ -0,0 +1,258 @@
+"""
+replay.py
+=========
+
+Event-sourced reconstruction of ID Card state from the ledger. The
+lifecycle plugins mutate cards in place and record what they did;
+:class:`ReplayEngine` folds those events back into :class:`IDCard`
+objects:
+
+* ``CREATE`` carries the new card's fields in ``data`` (as produced by
+  :meth:`IDCard.to_dict`);
+* ``REKEY``, ``DEPRECATE``, ``CONSOLIDATE`` and ``MFID_UPDATE`` apply
+  the same changes as the corresponding plugins, including the
+  ``card_version`` bump.
+
+Replaying a long ledger from the start is slow, so the engine writes
+compact JSON snapshots of the full state every ``snapshot_every``
+events. Each snapshot records the ledger position it covers (a byte
+offset, plus the segment id for segmented ledgers) and the
+timestamp of its last event in ``snapshots.json``. A rebuild loads the
+newest snapshot and replays only the tail. :meth:`ReplayEngine.card_at`
+answers "what did card X look like at time T" from the newest snapshot
+taken at or before T plus the events up to T that mention X; it relies
+on the ledger being ordered by time, which locked writers and
+segmented ledgers guarantee.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ...models.id_card import IDCard
+from ...models.ledger_event import LedgerEvent
+from .ledger import _parse_ts
+from .ledger_segments import SegmentedLedger, segment_id
+
+
+Cursor = Tuple[Optional[str], int]
+"""Ledger position: ``(segment id or None for a plain file, uncompressed byte offset)``."""
+
+
+def _create(cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+    fields = dict(event.data)
+    fields.setdefault("card_version", 1)
+    fields.update(ulid=event.ulid, doc_key=fields.get("doc_key") or event.doc_key)
+    cards[event.ulid] = IDCard.from_dict(fields)
+
+
+def _rekey(cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+    card = cards[event.ulid]
+    old_key = event.data.get("old_key", card.doc_key)
+    cards[event.ulid] = replace(
+        card,
+        doc_key=event.data.get("new_key", event.doc_key),
+        card_version=card.card_version + 1,
+        aliases=card.aliases + [old_key],
+    )
+
+
+def _deprecate(cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+    card = cards[event.ulid]
+    cards[event.ulid] = replace(card, status="deprecated", card_version=card.card_version + 1)
+
+
+def _consolidate(cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+    target = event.ulid
+    sources = [s for s in event.data.get("sources", []) if s != target]
+    card = cards[target]
+    cards[target] = replace(
+        card, card_version=card.card_version + 1, absorbs=list(card.absorbs) + sources
+    )
+    for src in sources:
+        if src in cards:
+            src_card = cards[src]
+            cards[src] = replace(
+                src_card, card_version=src_card.card_version + 1, merged_into=target
+            )
+
+
+def _mfid_update(cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+    card = cards[event.ulid]
+    cards[event.ulid] = replace(
+        card, card_version=card.card_version + 1, mfid=event.data.get("mfid")
+    )
+
+
+REDUCERS: Dict[str, Callable[[Dict[str, IDCard], LedgerEvent], None]] = {
+    "CREATE": _create,
+    "REKEY": _rekey,
+    "DEPRECATE": _deprecate,
+    "CONSOLIDATE": _consolidate,
+    "MFID_UPDATE": _mfid_update,
+}
+
+
+def apply_event(cards: Dict[str, IDCard], event: LedgerEvent) -> bool:
+    """Fold ``event`` into ``cards``; return ``False`` if it could not be applied.
+
+    Events of unknown type, and events for cards that were never
+    created, are ignored.
+    """
+    reducer = REDUCERS.get(event.event_type)
+    if reducer is None or (event.event_type != "CREATE" and event.ulid not in cards):
+        return False
+    reducer(cards, event)
+    return True
+
+
+class ReplayEngine:
+    """Rebuild card state from a ledger file or segment directory."""
+
+    def __init__(
+        self,
+        ledger: Path | None = None,
+        snapshot_dir: Path | None = None,
+        snapshot_every: int = 10_000,
+    ) -> None:
+        base = Path("AUTO_VERSIONING_MOD/.ledger")
+        self.ledger = ledger or base / "ids.jsonl"
+        self.snapshot_dir = snapshot_dir or base / "snapshots"
+        self.snapshot_every = snapshot_every
+        self.stats = {"replayed": 0, "skipped": 0, "snapshots": 0}
+
+    # -- snapshots ---------------------------------------------------
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.snapshot_dir / "snapshots.json"
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Return snapshot metadata, oldest first."""
+        if not self.manifest_path.exists():
+            return []
+        entries: List[Dict[str, Any]] = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        return entries
+
+    def _latest_snapshot(self, at: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        at_dt = _parse_ts(at) if at else None
+        for entry in self.snapshots()[::-1]:
+            if at_dt is None or (entry["timestamp"] and _parse_ts(entry["timestamp"]) <= at_dt):
+                return entry
+        return None
+
+    def _load_snapshot(self, entry: Dict[str, Any]) -> Dict[str, IDCard]:
+        data = json.loads((self.snapshot_dir / entry["file"]).read_text(encoding="utf-8"))
+        return {c["ulid"]: IDCard.from_dict(c) for c in data["cards"]}
+
+    def write_snapshot(
+        self, cards: Dict[str, IDCard], cursor: Cursor, events: int, timestamp: Optional[str]
+    ) -> Path:
+        """Persist ``cards`` as the state after ``events`` events, at ``cursor``."""
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_dir / f"snapshot-{events:012d}.json"
+        payload = {"cards": [c.to_dict() for c in cards.values()]}
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+        entries = [e for e in self.snapshots() if e["file"] != path.name]
+        entries.append({
+            "file": path.name,
+            "events": events,
+            "timestamp": timestamp,
+            "segment": cursor[0],
+            "offset": cursor[1],
+        })
+        entries.sort(key=lambda e: e["events"])
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp.write_text(json.dumps(entries, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+        self.stats["snapshots"] += 1
+        return path
+
+    # -- replay ------------------------------------------------------
+
+    def rebuild(self, snapshot: bool = True, full: bool = False) -> Dict[str, IDCard]:
+        """Return the current state of every card.
+
+        Starts from the newest snapshot unless ``full`` is set. With
+        ``snapshot``, writes a new snapshot every ``snapshot_every``
+        events and one at the end if any events were replayed.
+        """
+        entry = None if full else self._latest_snapshot()
+        cards = self._load_snapshot(entry) if entry else {}
+        cursor: Cursor = (entry["segment"], entry["offset"]) if entry else (None, 0)
+        events = entry["events"] if entry else 0
+        timestamp = entry["timestamp"] if entry else None
+        since_snapshot = 0
+        for event, cursor in self._events(cursor):
+            self._apply(cards, event)
+            events += 1
+            since_snapshot += 1
+            timestamp = event.ordered_at
+            if snapshot and since_snapshot >= self.snapshot_every:
+                self.write_snapshot(cards, cursor, events, timestamp)
+                since_snapshot = 0
+        if snapshot and since_snapshot:
+            self.write_snapshot(cards, cursor, events, timestamp)
+        return cards
+
+    def card_at(self, ulid: str, at: str) -> Optional[IDCard]:
+        """Return card ``ulid`` as it was after all events up to ``at``.
+
+        Only events mentioning ``ulid`` after the newest snapshot taken
+        at or before ``at`` are decoded. Returns ``None`` if the card did
+        not exist yet.
+        """
+        at_dt = _parse_ts(at)
+        entry = self._latest_snapshot(at)
+        cards = self._load_snapshot(entry) if entry else {}
+        cursor: Cursor = (entry["segment"], entry["offset"]) if entry else (None, 0)
+        # The card's own events plus CONSOLIDATEs naming it as a source.
+        needle = json.dumps(ulid).encode("utf-8")
+        for event, _ in self._events(cursor, needle):
+            if _parse_ts(event.ordered_at) > at_dt:
+                break
+            if event.event_type == "CONSOLIDATE" and event.ulid != ulid:
+                # Only the source side matters; the target may be unknown here.
+                if ulid in cards and ulid in event.data.get("sources", []):
+                    card = cards[ulid]
+                    cards[ulid] = replace(
+                        card, card_version=card.card_version + 1, merged_into=event.ulid
+                    )
+                continue
+            self._apply(cards, event)
+        return cards.get(ulid)
+
+    def _apply(self, cards: Dict[str, IDCard], event: LedgerEvent) -> None:
+        if apply_event(cards, event):
+            self.stats["replayed"] += 1
+        else:
+            self.stats["skipped"] += 1
+
+    def _events(
+        self, cursor: Cursor, needle: Optional[bytes] = None
+    ) -> Iterator[Tuple[LedgerEvent, Cursor]]:
+        """Yield events after ``cursor`` with the cursor just past each one."""
+        segment, offset = cursor
+        segments = SegmentedLedger(self.ledger) if self.ledger.is_dir() else None
+        if segments is not None:
+            files = [p for p in segments.segment_paths()
+                     if segment is None or segment_id(p) >= segment]
+        else:
+            files = [self.ledger] if self.ledger.exists() else []
+        for path in files:
+            name = segment_id(path) if segments is not None else None
+            pos = offset if name == segment else 0
+            with segments.open(path) if segments is not None else path.open("rb") as fh:
+                fh.seek(pos)
+                for line in fh:
+                    pos += len(line)
+                    if not line.endswith(b"\n"):
+                        return  # incomplete trailing write
+                    if not line.strip() or (needle is not None and needle not in line):
+                        continue
+                    yield LedgerEvent.from_dict(json.loads(line)), (name, pos)
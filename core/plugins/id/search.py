@@ -0,0 +1,123 @@
+"""
+search.py
+=========
+
+Prefix and fuzzy search over doc_keys and aliases. The registry only
+answers exact lookups; tooling that offers autocomplete or "did you
+mean" suggestions uses a :class:`SearchIndex` instead of scanning all
+keys.
+
+The index is a case-folded, sorted array of ``(key, ulid)`` pairs.
+Prefix queries bisect into it. Fuzzy queries gather candidates that
+share character trigrams with the query and rank them by edit
+distance. ``id.registry.build`` persists the sorted pairs next to the
+registry (``ids/registry.search.tsv``) so the index loads without
+touching cards; the trigram table is built lazily on first use.
+"""
+from __future__ import annotations
+
+import os
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ...models.registry import CompactRegistry, Registry
+
+
+def search_path_for(registry_path: Path) -> Path:
+    """Return the search index path that accompanies ``registry_path``."""
+    return registry_path.with_name(registry_path.stem + ".search.tsv")
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein distance between ``a`` and ``b``.
+
+    With ``limit``, stops early and returns ``limit + 1`` once the
+    distance is known to exceed it.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class SearchIndex:
+    """Sorted key array with prefix and trigram-based fuzzy search."""
+
+    def __init__(self, pairs: Sequence[Tuple[str, str]]) -> None:
+        rows = sorted((key.casefold(), key, ulid) for key, ulid in pairs)
+        self._folded = [r[0] for r in rows]
+        self._rows = [(r[1], r[2]) for r in rows]
+        self._grams: Optional[Dict[str, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_registry(cls, registry: Union[Registry, CompactRegistry]) -> "SearchIndex":
+        by_key: Mapping[str, str] = registry.by_key
+        return cls(list(by_key.items()))
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchIndex":
+        pairs: List[Tuple[str, str]] = []
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                key, _, ulid = line.rstrip("\n").rpartition("\t")
+                pairs.append((key, ulid))
+        return cls(pairs)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text("".join(f"{k}\t{u}\n" for k, u in self._rows), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def prefix(self, prefix: str, limit: int = 20) -> List[Tuple[str, str]]:
+        """Return up to ``limit`` ``(key, ulid)`` pairs whose key starts with ``prefix``."""
+        folded = prefix.casefold()
+        out: List[Tuple[str, str]] = []
+        for i in range(bisect_left(self._folded, folded), len(self._folded)):
+            if not self._folded[i].startswith(folded) or len(out) >= limit:
+                break
+            out.append(self._rows[i])
+        return out
+
+    def fuzzy(self, query: str, limit: int = 10, max_distance: int = 3) -> List[Tuple[str, str]]:
+        """Return the closest keys to ``query`` by edit distance (case-insensitive)."""
+        folded = query.casefold()
+        grams = self._trigram_table()
+        shared: Counter[int] = Counter()
+        for gram in _trigrams(folded):
+            shared.update(grams.get(gram, ()))
+        scored: List[Tuple[int, str, int]] = []
+        for i, _ in shared.most_common(limit * 20):
+            dist = edit_distance(folded, self._folded[i], max_distance)
+            if dist <= max_distance:
+                scored.append((dist, self._folded[i], i))
+        scored.sort()
+        return [self._rows[i] for _, _, i in scored[:limit]]
+
+    def _trigram_table(self) -> Dict[str, List[int]]:
+        if self._grams is None:
+            table: Dict[str, List[int]] = {}
+            for i, key in enumerate(self._folded):
+                for gram in _trigrams(key):
+                    table.setdefault(gram, []).append(i)
+            self._grams = table
+        return self._grams
@@ -0,0 +1,289 @@
+"""
+sqlite_store.py
+===============
+
+Optional SQLite backend for ID Cards, the registry and ledger read
+offsets. The YAML files under ``ids/cards`` remain the source of
+truth kept in Git; the database is a local, indexed mirror that
+answers lookups and filtered queries without touching the cards
+directory.
+
+:class:`SQLiteCardStore` exposes the same ``get``/``put``/``exists``/
+``cards`` interface as :class:`~.store.CardStore`, so it can be passed
+to the lifecycle plugins as their ``store``. Synchronisation runs in
+both directions: :meth:`SQLiteCardStore.sync_from_yaml` imports cards
+whose file stamp changed, and :meth:`SQLiteCardStore.sync_to_yaml`
+writes back rows that were modified in the database only.
+
+Compare-and-swap writes (``expected_version``, :meth:`update`) check
+``card_version`` inside an immediate transaction, which SQLite
+serialises across connections.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from ...models.id_card import IDCard
+from ...models.registry import INDEXED_FIELDS, Registry
+from .store import CardConflictError, CardStore, card_ulid, compare_and_swap, iter_card_paths
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    ulid TEXT PRIMARY KEY,
+    doc_key TEXT NOT NULL,
+    semver TEXT,
+    status TEXT,
+    effective_date TEXT,
+    owner TEXT,
+    contract_type TEXT,
+    card_version INTEGER NOT NULL,
+    supersedes_version TEXT,
+    merged_into TEXT,
+    aliases TEXT NOT NULL DEFAULT '[]',
+    absorbs TEXT NOT NULL DEFAULT '[]',
+    mfid TEXT,
+    mtime_ns INTEGER,
+    size INTEGER,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT NOT NULL,
+    ulid TEXT NOT NULL REFERENCES cards(ulid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (ulid, position)
+);
+CREATE TABLE IF NOT EXISTS ledger_offsets (
+    ledger_path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cards_doc_key ON cards(doc_key);
+CREATE INDEX IF NOT EXISTS idx_cards_status_owner ON cards(status, owner);
+CREATE INDEX IF NOT EXISTS idx_cards_owner ON cards(owner);
+CREATE INDEX IF NOT EXISTS idx_cards_contract_type ON cards(contract_type);
+CREATE INDEX IF NOT EXISTS idx_aliases_alias ON aliases(alias);
+"""
+
+_CARD_COLUMNS = (
+    "ulid", "doc_key", "semver", "status", "effective_date", "owner", "contract_type",
+    "card_version", "aliases", "supersedes_version", "merged_into", "absorbs", "mfid",
+)
+_LIST_COLUMNS = ("aliases", "absorbs")
+
+
+class SQLiteCardStore:
+    """Indexed SQLite mirror of the ID Card YAML files."""
+
+    def __init__(self, db_path: Path, cards_dir: Path | None = None) -> None:
+        self.db_path = db_path
+        self.yaml = CardStore(cards_dir)
+        self.cards_dir = self.yaml.cards_dir
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # -- card access -------------------------------------------------
+
+    def exists(self, ulid: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM cards WHERE ulid = ?", (ulid,)).fetchone()
+        return row is not None
+
+    def get(self, ulid: str) -> IDCard:
+        """Return the card for ``ulid``.
+
+        Raises:
+            FileNotFoundError: if the database holds no such card.
+        """
+        row = self.conn.execute("SELECT * FROM cards WHERE ulid = ?", (ulid,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"ID Card {ulid} does not exist")
+        return self._card(row)
+
+    def put(
+        self, card: IDCard, write_yaml: bool = True, expected_version: int | None = None
+    ) -> None:
+        """Store ``card``; also write its YAML file unless ``write_yaml`` is False.
+
+        Rows written without YAML are flagged dirty and picked up by
+        :meth:`sync_to_yaml`.
+
+        Raises:
+            CardConflictError: if ``expected_version`` is given and the
+                stored ``card_version`` differs.
+        """
+        expected = {card.ulid: expected_version} if expected_version is not None else None
+        self.put_many([card], write_yaml, expected)
+
+    def put_many(
+        self,
+        cards: Sequence[IDCard],
+        write_yaml: bool = True,
+        expected: Mapping[str, int] | None = None,
+    ) -> None:
+        """Store several cards in one transaction, optionally compare-and-swap."""
+        with self.conn:
+            if expected:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for ulid, want in expected.items():
+                    row = self.conn.execute(
+                        "SELECT card_version FROM cards WHERE ulid = ?", (ulid,)
+                    ).fetchone()
+                    actual = row[0] if row else None
+                    if actual != want:
+                        raise CardConflictError(ulid, want, actual)
+            for card in cards:
+                self._upsert(card, stamp=None, dirty=not write_yaml)
+                if write_yaml:
+                    self._write_yaml(card)
+
+    def update(
+        self, ulid: str, change: Callable[[IDCard], IDCard], retries: int = 0
+    ) -> Tuple[IDCard, IDCard]:
+        """Compare-and-swap update, as :meth:`.store.CardStore.update`."""
+        return compare_and_swap(self, ulid, change, retries)
+
+    def cards(self) -> Iterator[IDCard]:
+        for row in self.conn.execute("SELECT * FROM cards ORDER BY ulid"):
+            yield self._card(row)
+
+    def refresh(self) -> None:
+        """Nothing to do: the database is the index (see :meth:`sync_from_yaml`)."""
+
+    def find_by_doc_key(self, doc_key: str) -> Optional[IDCard]:
+        row = self.conn.execute("SELECT * FROM cards WHERE doc_key = ?", (doc_key,)).fetchone()
+        return self._card(row) if row else None
+
+    def find_by_alias(self, alias: str) -> Optional[IDCard]:
+        row = self.conn.execute(
+            "SELECT c.* FROM aliases a JOIN cards c ON c.ulid = a.ulid WHERE a.alias = ?",
+            (alias,),
+        ).fetchone()
+        return self._card(row) if row else None
+
+    def query(
+        self,
+        status: str | None = None,
+        owner: str | None = None,
+        contract_type: str | None = None,
+    ) -> List[IDCard]:
+        """Return cards matching every given filter, ordered by ULID."""
+        clauses: List[str] = []
+        params: List[str] = []
+        for column, value in (("status", status), ("owner", owner),
+                              ("contract_type", contract_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT * FROM cards"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return [self._card(row) for row in self.conn.execute(sql + " ORDER BY ulid", params)]
+
+    def registry(self) -> Registry:
+        """Build a :class:`Registry` from the database alone."""
+        reg = Registry()
+        aliases: Dict[str, List[str]] = {}
+        for row in self.conn.execute("SELECT ulid, alias FROM aliases ORDER BY ulid, position"):
+            aliases.setdefault(row["ulid"], []).append(row["alias"])
+        for row in self.conn.execute(
+            "SELECT ulid, doc_key, status, owner, contract_type FROM cards ORDER BY ulid"
+        ):
+            fields = {f: row[f] for f in INDEXED_FIELDS if row[f] is not None}
+            reg.add_entry(row["ulid"], row["doc_key"], aliases=aliases.get(row["ulid"]), **fields)
+        return reg
+
+    # -- ledger offsets ----------------------------------------------
+
+    def get_ledger_offset(self, ledger_path: Path) -> int:
+        """Return the byte offset up to which ``ledger_path`` was consumed."""
+        row = self.conn.execute(
+            "SELECT offset FROM ledger_offsets WHERE ledger_path = ?", (str(ledger_path),)
+        ).fetchone()
+        return int(row["offset"]) if row else 0
+
+    def set_ledger_offset(self, ledger_path: Path, offset: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO ledger_offsets(ledger_path, offset) VALUES (?, ?) "
+                "ON CONFLICT(ledger_path) DO UPDATE SET offset = excluded.offset",
+                (str(ledger_path), offset),
+            )
+
+    # -- synchronisation ---------------------------------------------
+
+    def sync_from_yaml(self) -> Dict[str, int]:
+        """Import new or changed YAML cards and drop rows whose file is gone.
+
+        Rows with pending database-only changes are left untouched; run
+        :meth:`sync_to_yaml` first to publish them.
+
+        Returns:
+            Counts of ``imported`` and ``removed`` cards.
+        """
+        known = {
+            row["ulid"]: (row["mtime_ns"], row["size"], row["dirty"])
+            for row in self.conn.execute("SELECT ulid, mtime_ns, size, dirty FROM cards")
+        }
+        imported = 0
+        seen: set[str] = set()
+        with self.conn:
+            for path in iter_card_paths(self.cards_dir):
+                st = path.stat()
+                stamp = (st.st_mtime_ns, st.st_size)
+                ulid = card_ulid(path)
+                seen.add(ulid)
+                prev = known.get(ulid)
+                if prev and (prev[2] or prev[:2] == stamp):
+                    continue
+                self._upsert(self.yaml.get(ulid), stamp=stamp, dirty=False)
+                imported += 1
+            gone = [u for u, (_, _, dirty) in known.items() if u not in seen and not dirty]
+            self.conn.executemany("DELETE FROM cards WHERE ulid = ?", [(u,) for u in gone])
+        return {"imported": imported, "removed": len(gone)}
+
+    def sync_to_yaml(self) -> int:
+        """Write every dirty row back to its YAML file. Returns the count."""
+        rows = self.conn.execute("SELECT * FROM cards WHERE dirty = 1").fetchall()
+        with self.conn:
+            for row in rows:
+                self._write_yaml(self._card(row))
+        return len(rows)
+
+    # -- helpers -----------------------------------------------------
+
+    def _write_yaml(self, card: IDCard) -> None:
+        self.yaml.put(card)
+        st = self.yaml.path_for(card.ulid).stat()
+        self.conn.execute(
+            "UPDATE cards SET mtime_ns = ?, size = ?, dirty = 0 WHERE ulid = ?",
+            (st.st_mtime_ns, st.st_size, card.ulid),
+        )
+
+    def _upsert(self, card: IDCard, stamp: Any, dirty: bool) -> None:
+        data = card.to_dict()
+        values = [json.dumps(data[c]) if c in _LIST_COLUMNS else data[c] for c in _CARD_COLUMNS]
+        mtime_ns, size = stamp or (None, None)
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO cards({', '.join(_CARD_COLUMNS)}, mtime_ns, size, dirty) "
+            f"VALUES ({', '.join('?' * len(_CARD_COLUMNS))}, ?, ?, ?)",
+            (*values, mtime_ns, size, int(dirty)),
+        )
+        self.conn.execute("DELETE FROM aliases WHERE ulid = ?", (card.ulid,))
+        self.conn.executemany(
+            "INSERT INTO aliases(alias, ulid, position) VALUES (?, ?, ?)",
+            [(alias, card.ulid, pos) for pos, alias in enumerate(card.aliases)],
+        )
+
+    @staticmethod
+    def _card(row: sqlite3.Row) -> IDCard:
+        data = {c: json.loads(row[c]) if c in _LIST_COLUMNS else row[c] for c in _CARD_COLUMNS}
+        return IDCard.from_dict(data)
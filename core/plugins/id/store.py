@@ -0,0 +1,494 @@
+"""
+store.py
+========
+
+Shared, indexed access to the ID Cards stored under ``ids/cards``.
+Lifecycle plugins read and write cards through a :class:`CardStore`
+instead of parsing YAML themselves. Parsed cards are cached in
+memory and revalidated against the file's mtime and size, so a card
+is only re-parsed after it changed on disk.
+
+The store also maintains indexes by doc_key, alias, status and
+owner. They are updated whenever a card is written or read, so they
+cover every card the store has seen, and a lookup only re-checks the
+cards it returns (one ``stat`` each). Cards written by other processes
+since are picked up when read; :meth:`CardStore.refresh` indexes the
+whole directory, at the cost of one ``stat`` per card. The cache and
+indexes are guarded by a lock, so the store
+:meth:`CardStore.for_dir` hands out can be shared between threads.
+
+Cards are stored either flat (``cards/<ULID>.yaml``) or, for very
+large ID sets, sharded into ``cards/<shard>/<ULID>.yaml`` where the
+shard is the last :data:`SHARD_WIDTH` characters of the ULID. Those
+come from the random (or, for monotonic ULIDs, incrementing) part, so
+cards spread evenly over 1,024 directories; the leading characters
+encode the timestamp and would put everything minted this decade into
+one directory. The layout is recorded in ``cards/.layout``. Every path
+is built by :func:`card_path` and every listing goes through
+:func:`iter_card_paths`. Reads find a card in either layout, so a
+directory stays usable while :meth:`CardStore.migrate` moves it.
+Cards without a loose file are read from the directory's pack, if it
+has one (see :mod:`.pack`); writes always produce loose files, which
+override packed records.
+
+Writes are atomic: the new YAML goes to a temporary file that is
+renamed over the card. Passing ``expected_version`` to :meth:`put` (or
+``expected`` to :meth:`put_many`) turns the write into a
+compare-and-swap on ``card_version``. The rename happens only if the
+card on disk still has the version the caller read, otherwise
+:class:`CardConflictError` is raised. The check and the rename run
+under an advisory lock on the card file itself, so writers to
+different cards never wait for each other. :meth:`CardStore.update`
+wraps the read-modify-CAS cycle and retries it for operations that
+commute.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import yaml
+
+from ...models.id_card import IDCard
+from .ledger import exclusive_lock
+from .pack import INDEX_NAME, CardPack, pack_dir_for
+
+
+_Stamp = Tuple[int, int]
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+LAYOUTS = ("flat", "sharded")
+SHARD_WIDTH = 2
+_LAYOUT_FILE = ".layout"
+_SUFFIX = ".yaml"
+
+
+def card_path(cards_dir: Path, ulid: str, layout: str = "flat") -> Path:
+    """Return where card ``ulid`` lives under ``cards_dir`` in ``layout``."""
+    if layout == "sharded":
+        return cards_dir / ulid[-SHARD_WIDTH:] / f"{ulid}{_SUFFIX}"
+    return cards_dir / f"{ulid}{_SUFFIX}"
+
+
+def read_layout(cards_dir: Path) -> str:
+    """Return the layout recorded for ``cards_dir`` (``"flat"`` if none)."""
+    try:
+        layout = (cards_dir / _LAYOUT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return "flat"
+    return layout if layout in LAYOUTS else "flat"
+
+
+def iter_card_paths(cards_dir: Path) -> Iterator[Path]:
+    """Yield the path of every card under ``cards_dir``, in either layout."""
+    try:
+        entries = list(os.scandir(cards_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.endswith(_SUFFIX) and entry.is_file():
+            yield Path(entry.path)
+        elif len(entry.name) == SHARD_WIDTH and entry.is_dir():
+            for sub in os.scandir(entry.path):
+                if sub.name.endswith(_SUFFIX):
+                    yield Path(sub.path)
+
+
+def card_ulid(path: Path) -> str:
+    """ULID of the card stored at ``path``."""
+    return path.name[: -len(_SUFFIX)]
+
+
+class CardConflictError(RuntimeError):
+    """Raised when a card changed on disk since the caller read it."""
+
+    def __init__(self, ulid: str, expected: int, actual: Optional[int]) -> None:
+        found = "missing" if actual is None else f"at card_version {actual}"
+        super().__init__(f"ID Card {ulid} is {found}, expected card_version {expected}")
+        self.ulid = ulid
+        self.expected = expected
+        self.actual = actual
+
+
+def compare_and_swap(
+    store: Any, ulid: str, change: Callable[[IDCard], IDCard], retries: int
+) -> Tuple[IDCard, IDCard]:
+    """Read-modify-CAS loop shared by the card stores (see :meth:`CardStore.update`)."""
+    while True:
+        card = store.get(ulid)
+        updated = change(card)
+        try:
+            store.put(updated, expected_version=card.card_version)
+            return card, updated
+        except CardConflictError:
+            if retries <= 0:
+                raise
+            retries -= 1
+
+
+class CardStore:
+    """Cached, indexed view over a directory of ID Card YAML files."""
+
+    _shared: Dict[Path, "CardStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cards_dir: Path | None = None, layout: str | None = None) -> None:
+        self.cards_dir = cards_dir or Path("AUTO_VERSIONING_MOD/ids/cards")
+        #: Layout new writes use; defaults to the one recorded in the directory.
+        self.layout = layout or read_layout(self.cards_dir)
+        self._pack: Optional[CardPack] = None
+        self._pack_stamp: Optional[_Stamp] = None
+        self._cards: Dict[str, Tuple[_Stamp, IDCard]] = {}
+        self._by_key: Dict[str, str] = {}
+        self._by_alias: Dict[str, str] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_owner: Dict[str, Set[str]] = {}
+        # Guards the cache, the indexes and the open pack; stores are shared
+        # between threads through for_dir().
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_dir(cls, cards_dir: Path) -> "CardStore":
+        """Return the process-wide store for ``cards_dir``.
+
+        Plugins constructed for the same directory share one cache.
+        """
+        key = Path(os.path.abspath(cards_dir))
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(cards_dir)
+        return store
+
+    def path_for(self, ulid: str) -> Path:
+        """Return the YAML path of the card with the given ULID.
+
+        This is where the card is written; an existing card may still
+        sit at its place in the other layout (see :meth:`locate`).
+        """
+        return card_path(self.cards_dir, ulid, self.layout)
+
+    def locate(self, ulid: str) -> Optional[Path]:
+        """Return the path card ``ulid`` is stored at, in either layout, or ``None``."""
+        for path in self._candidates(ulid):
+            if path.exists():
+                return path
+        return None
+
+    def _candidates(self, ulid: str) -> List[Path]:
+        others = [card_path(self.cards_dir, ulid, layout)
+                  for layout in LAYOUTS if layout != self.layout]
+        return [self.path_for(ulid), *others]
+
+    def exists(self, ulid: str) -> bool:
+        if self.locate(ulid) is not None:
+            return True
+        pack = self.packed()
+        return pack is not None and pack.standalone(ulid)
+
+    def packed(self) -> Optional[CardPack]:
+        """Return the directory's current pack, reopened after a repack."""
+        try:
+            st = (pack_dir_for(self.cards_dir) / INDEX_NAME).stat()
+        except FileNotFoundError:
+            st = None
+        stamp = (st.st_mtime_ns, st.st_size) if st is not None else None
+        with self._lock:
+            if stamp != self._pack_stamp or (stamp is not None and self._pack is None):
+                if self._pack is not None:
+                    self._pack.close()
+                self._pack = CardPack.open(self.cards_dir) if stamp is not None else None
+                self._pack_stamp = stamp
+            return self._pack
+
+    def stamp(self, ulid: str) -> Optional[_Stamp]:
+        """Return a stamp of card ``ulid``'s stored form, or ``None`` if it does not exist.
+
+        Every write of the card changes the stamp, so one ``stat`` tells
+        whether a card checked earlier may have changed since.
+        """
+        for path in self._candidates(ulid):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            return (st.st_mtime_ns, st.st_size)
+        pack = self.packed()
+        if pack is not None and pack.standalone(ulid):
+            return self._packed_stamp(ulid, pack)
+        return None
+
+    def get(self, ulid: str) -> IDCard:
+        """Return the card for ``ulid``, re-parsing it only if it changed.
+
+        Raises:
+            FileNotFoundError: if no card exists for the ULID.
+        """
+        for path in self._candidates(ulid):
+            try:
+                st = path.stat()
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            pack = self.packed()
+            if pack is not None and pack.standalone(ulid):
+                return self._load_packed(ulid, pack)
+            self._forget(ulid)
+            raise FileNotFoundError(f"ID Card {ulid} does not exist")
+        return self._load(ulid, path, (st.st_mtime_ns, st.st_size))
+
+    def put(self, card: IDCard, expected_version: int | None = None) -> None:
+        """Atomically write ``card`` and update the cache and indexes.
+
+        Raises:
+            CardConflictError: if ``expected_version`` is given and the
+                card on disk has another ``card_version`` (or is missing).
+        """
+        expected = {card.ulid: expected_version} if expected_version is not None else None
+        self.put_many([card], expected)
+
+    def put_many(
+        self, cards: Sequence[IDCard], expected: Mapping[str, int] | None = None
+    ) -> None:
+        """Write several cards, using the C YAML emitter when available.
+
+        All cards are first written to temporary files next to their
+        targets and then renamed into place, so a failure while
+        serialising or writing leaves every existing card untouched.
+        With ``expected`` (ULID to ``card_version``), the listed cards
+        are locked in ULID order and all versions checked before any
+        rename; one stale card rejects the whole set.
+
+        Raises:
+            CardConflictError: if a card in ``expected`` changed on disk.
+        """
+        staged: List[Tuple[Path, Path, IDCard]] = []
+        try:
+            for card in cards:
+                path = self.path_for(card.ulid)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                staged.append((tmp, path, card))
+                tmp.write_text(yaml.dump(card.to_dict(), Dumper=_Dumper), encoding="utf-8")
+            with ExitStack() as locks:
+                for ulid, want in sorted((expected or {}).items()):
+                    version = locks.enter_context(self._locked(ulid))
+                    if version != want:
+                        self._forget(ulid)
+                        self._current(ulid)  # re-index the card as it is now
+                        raise CardConflictError(ulid, want, version)
+                for tmp, path, card in staged:
+                    os.replace(tmp, path)
+                    for other in self._candidates(card.ulid)[1:]:
+                        other.unlink(missing_ok=True)  # copy left in the previous layout
+        except BaseException:
+            for tmp, _, _ in staged:
+                tmp.unlink(missing_ok=True)
+            raise
+        for _, path, card in staged:
+            st = path.stat()
+            self._remember(card, (st.st_mtime_ns, st.st_size))
+
+    def update(
+        self, ulid: str, change: Callable[[IDCard], IDCard], retries: int = 0
+    ) -> Tuple[IDCard, IDCard]:
+        """Apply ``change`` to the current card with compare-and-swap.
+
+        ``change`` receives the card as read and returns the new card.
+        On a conflict the card is re-read and ``change`` applied again,
+        up to ``retries`` times; pass ``retries > 0`` only for changes
+        whose result does not depend on which concurrent writer wins.
+
+        Returns:
+            ``(old, new)``: the card the change was applied to, and the
+            card that was written.
+
+        Raises:
+            CardConflictError: if the card kept changing after ``retries``.
+            FileNotFoundError: if no card exists for the ULID.
+        """
+        return compare_and_swap(self, ulid, change, retries)
+
+    def refresh(self) -> None:
+        """Synchronise the cache with the cards directory."""
+        seen: Set[str] = set()
+        for path in iter_card_paths(self.cards_dir):
+            st = path.stat()
+            ulid = self._load(card_ulid(path), path, (st.st_mtime_ns, st.st_size)).ulid
+            seen.add(ulid)
+        pack = self.packed()
+        if pack is not None:
+            for ulid in pack.entries:
+                if ulid not in seen and pack.standalone(ulid):
+                    seen.add(self._load_packed(ulid, pack).ulid)
+        with self._lock:
+            gone = set(self._cards) - seen
+        for ulid in gone:
+            self._forget(ulid)
+
+    def migrate(self, layout: str) -> int:
+        """Move every card into ``layout`` and record it; return how many moved.
+
+        The layout is recorded first, so writers started meanwhile
+        already use the new one. Safe to re-run after an interruption.
+        """
+        if layout not in LAYOUTS:
+            raise ValueError(f"layout must be one of {', '.join(LAYOUTS)}")
+        self.cards_dir.mkdir(parents=True, exist_ok=True)
+        marker = self.cards_dir / _LAYOUT_FILE
+        tmp = marker.with_name(marker.name + ".tmp")
+        tmp.write_text(layout + "\n", encoding="utf-8")
+        os.replace(tmp, marker)
+        self.layout = layout
+        moved = 0
+        for path in list(iter_card_paths(self.cards_dir)):
+            target = self.path_for(card_ulid(path))
+            if path == target:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                path.unlink()  # already rewritten in the new layout
+            else:
+                os.replace(path, target)
+            moved += 1
+        if layout == "flat":
+            for entry in os.scandir(self.cards_dir):
+                if len(entry.name) == SHARD_WIDTH and entry.is_dir():
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass  # holds something other than cards
+        return moved
+
+    def cards(self) -> Iterator[IDCard]:
+        """Yield every card in the directory."""
+        self.refresh()
+        with self._lock:
+            cards = [card for _, card in self._cards.values()]
+        yield from cards
+
+    # Lookups answer from the indexes and re-read only the cards they
+    # return; get() re-indexes a card that changed, so a stale hit drops out.
+
+    def find_by_doc_key(self, doc_key: str) -> Optional[IDCard]:
+        """Return the indexed card whose current doc_key is ``doc_key``."""
+        with self._lock:
+            ulid = self._by_key.get(doc_key)
+        card = self._current(ulid)
+        return card if card is not None and card.doc_key == doc_key else None
+
+    def find_by_alias(self, alias: str) -> Optional[IDCard]:
+        """Return the indexed card that lists ``alias`` among its aliases."""
+        with self._lock:
+            ulid = self._by_alias.get(alias)
+        card = self._current(ulid)
+        return card if card is not None and alias in card.aliases else None
+
+    def find_by_status(self, status: str) -> List[IDCard]:
+        with self._lock:
+            ulids = sorted(self._by_status.get(status, ()))
+        cards = [self._current(u) for u in ulids]
+        return [c for c in cards if c is not None and c.status == status]
+
+    def find_by_owner(self, owner: str) -> List[IDCard]:
+        with self._lock:
+            ulids = sorted(self._by_owner.get(owner, ()))
+        cards = [self._current(u) for u in ulids]
+        return [c for c in cards if c is not None and c.owner == owner]
+
+    def _current(self, ulid: Optional[str]) -> Optional[IDCard]:
+        if ulid is None:
+            return None
+        try:
+            return self.get(ulid)
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _locked(self, ulid: str) -> Iterator[Optional[int]]:
+        """Lock card ``ulid`` and yield its on-disk ``card_version`` (``None`` if missing).
+
+        The lock is taken on the card file itself. Since writers replace
+        that file, a lock that turns out to be on a replaced inode is
+        dropped and taken again on the current one.
+        """
+        while True:
+            path = self.locate(ulid)
+            pack = self.packed() if path is None else None
+            if path is None and pack is not None and pack.standalone(ulid):
+                # Packed only: the first loose write creates the card file, so
+                # serialise on the pack index instead.
+                path = pack.dir / INDEX_NAME
+            elif path is None:
+                yield None
+                return
+            try:
+                fh = path.open("rb")
+            except FileNotFoundError:
+                continue  # moved or replaced meanwhile
+            with fh, exclusive_lock(fh, path):
+                try:
+                    current = path.stat().st_ino
+                except FileNotFoundError:
+                    current = -1
+                if current != os.fstat(fh.fileno()).st_ino:
+                    continue
+                if pack is not None:
+                    if self.locate(ulid) is not None:
+                        continue  # written loose while we waited
+                    yield self._load_packed(ulid, pack).card_version
+                    return
+                data = yaml.safe_load(fh.read().decode("utf-8")) or {}
+                yield int(data["card_version"]) if "card_version" in data else None
+                return
+
+    def _packed_stamp(self, ulid: str, pack: CardPack) -> _Stamp:
+        # Negative "mtime" keeps packed stamps apart from loose-file stamps.
+        return (-(self._pack_stamp or (0, 0))[0], pack.entries[ulid].offset)
+
+    def _load_packed(self, ulid: str, pack: CardPack) -> IDCard:
+        stamp = self._packed_stamp(ulid, pack)
+        cached = self._cards.get(ulid)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with self._lock:  # the pack's file handle is shared
+            card = pack.get(ulid)
+        self._remember(card, stamp, key=ulid)
+        return card
+
+    def _load(self, ulid: str, path: Path, stamp: _Stamp) -> IDCard:
+        cached = self._cards.get(ulid)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        card = IDCard.from_dict(yaml.safe_load(path.read_text(encoding="utf-8")))
+        self._remember(card, stamp, key=ulid)
+        return card
+
+    def _remember(self, card: IDCard, stamp: _Stamp, key: str | None = None) -> None:
+        key = key or card.ulid
+        with self._lock:
+            self._forget(key)
+            self._cards[key] = (stamp, card)
+            self._by_key[card.doc_key] = key
+            for alias in card.aliases:
+                self._by_alias[alias] = key
+            self._by_status.setdefault(card.status, set()).add(key)
+            self._by_owner.setdefault(card.owner, set()).add(key)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            cached = self._cards.pop(key, None)
+            if cached is None:
+                return
+            card = cached[1]
+            if self._by_key.get(card.doc_key) == key:
+                del self._by_key[card.doc_key]
+            for alias in card.aliases:
+                if self._by_alias.get(alias) == key:
+                    del self._by_alias[alias]
+            self._by_status.get(card.status, set()).discard(key)
+            self._by_owner.get(card.owner, set()).discard(key)
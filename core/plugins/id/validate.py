@@ -7,27 +7,171 @@ matter against defined JSON schemas. Validation ensures the ID
 module remains consistent and prevents invalid data from entering
 the system. This skeleton demonstrates how to load and apply
 schemas using the ``jsonschema`` library.
+
+Schemas are compiled once per process (:func:`schema_validator`).
+Hot paths (ledger events, bulk-minted cards) go through a
+:class:`FastValidator`. It first runs a check compiled from the simple
+parts of the schema: required keys, types, enums, patterns, minimums,
+typed array items and no additional properties. It falls back to full
+``jsonschema`` validation, with its error messages, only when that
+check fails or cannot decide.
 """
 from __future__ import annotations
 
-from typing import Any, Dict
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
 import json
 from pathlib import Path
 
 from jsonschema import Draft7Validator
 
 from ..id.base import IDPlugin
-from ..models.id_card import IDCard
+from ...models.id_card import IDCard
+
+
+SCHEMA_DIR = Path(__file__).resolve().parents[3] / "schemas"
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+# Keywords that never affect validity under Draft 7 without a format checker.
+_ANNOTATIONS = {"description", "title", "format", "$schema", "$id", "examples", "default"}
+
+
+@lru_cache(maxsize=None)
+def schema_validator(name: str) -> Draft7Validator:
+    """Return the compiled validator for ``schemas/<name>.schema.json``."""
+    schema = json.loads((SCHEMA_DIR / f"{name}.schema.json").read_text())
+    return Draft7Validator(schema)
+
+
+def _type_check(kind: Any) -> Optional[Callable[[Any], bool]]:
+    kinds = [kind] if isinstance(kind, str) else kind
+    if not isinstance(kinds, list) or not kinds or any(k not in _TYPES for k in kinds):
+        return None
+    preds = [_TYPES[k] for k in kinds]
+    return preds[0] if len(preds) == 1 else lambda v: any(p(v) for p in preds)
+
+
+def _compile_property(prop: Dict[str, Any]) -> Optional[List[Callable[[Any], bool]]]:
+    if set(prop) - _ANNOTATIONS - {"type", "enum", "pattern", "minimum", "items"}:
+        return None
+    type_ok = _type_check(prop.get("type"))
+    if type_ok is None:
+        return None
+    preds = [type_ok]
+    if "enum" in prop:
+        preds.append(frozenset(prop["enum"]).__contains__)
+    if "pattern" in prop:
+        rx = re.compile(prop["pattern"])
+        preds.append(lambda v: not isinstance(v, str) or rx.search(v) is not None)
+    if "minimum" in prop:
+        low = prop["minimum"]
+        preds.append(lambda v: not _TYPES["number"](v) or v >= low)
+    if "items" in prop:
+        items = prop["items"]
+        item_ok = _type_check(items.get("type")) if set(items) <= {"type"} else None
+        if item_ok is None:
+            return None
+        preds.append(lambda v: not isinstance(v, list) or all(item_ok(i) for i in v))
+    return preds
+
+
+def _compile_fast(schema: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Compile a flat object schema into a predicate that implies validity.
+
+    Returns ``None`` if the schema uses keywords the fast path does not
+    model, in which case every instance takes the full validator.
+    """
+    supported = _ANNOTATIONS | {"type", "properties", "required", "additionalProperties"}
+    if set(schema) - supported or schema.get("type") != "object":
+        return None
+    checks: Dict[str, List[Callable[[Any], bool]]] = {}
+    for key, prop in schema.get("properties", {}).items():
+        preds = _compile_property(prop)
+        if preds is None:
+            return None
+        checks[key] = preds
+    required = tuple(schema.get("required", ()))
+    closed = schema.get("additionalProperties", True) is False
+
+    def fast(instance: Dict[str, Any]) -> bool:
+        if not isinstance(instance, dict) or any(k not in instance for k in required):
+            return False
+        for key, value in instance.items():
+            preds = checks.get(key)
+            if preds is None:
+                if closed:
+                    return False
+            elif not _all_pass(preds, value):
+                return False
+        return True
+
+    return fast
+
+
+def _all_pass(preds: List[Callable[[Any], bool]], value: Any) -> bool:
+    """True if every predicate accepts ``value``; a TypeError counts as a failure."""
+    try:
+        return all(pred(value) for pred in preds)
+    except TypeError:
+        return False
+
+
+class FastValidator:
+    """Validate instances against ``schemas/<name>.schema.json``, fast path first."""
+
+    def __init__(self, name: str) -> None:
+        self.validator = schema_validator(name)
+        self._fast = _compile_fast(self.validator.schema)
+
+    def is_valid(self, instance: Dict[str, Any]) -> bool:
+        if self._fast is not None and self._fast(instance):
+            return True
+        return bool(self.validator.is_valid(instance))
+
+    def errors(self, instance: Dict[str, Any]) -> List[str]:
+        """Return human-readable schema errors (empty if ``instance`` is valid)."""
+        if self._fast is not None and self._fast(instance):
+            return []
+        return [
+            f"{'/'.join(str(p) for p in err.path) or '<root>'}: {err.message}"
+            for err in self.validator.iter_errors(instance)
+        ]
+
+    def validate(self, instance: Dict[str, Any]) -> None:
+        """Raise ``jsonschema.exceptions.ValidationError`` if ``instance`` is invalid."""
+        if self._fast is None or not self._fast(instance):
+            self.validator.validate(instance)
+
+
+class LedgerEventValidator(FastValidator):
+    """Validate ledger event dictionaries against ``ledger_event.schema.json``."""
+
+    def __init__(self) -> None:
+        super().__init__("ledger_event")
+
+
+@lru_cache(maxsize=None)
+def ledger_event_validator() -> LedgerEventValidator:
+    """Process-wide :class:`LedgerEventValidator` instance."""
+    return LedgerEventValidator()
 
 
 class ValidatePlugin(IDPlugin):
     """Validate ID Cards using JSON Schema."""
 
     def __init__(self) -> None:
-        # Load schemas at initialisation time
-        base_path = Path(__file__).resolve().parents[3] / "schemas"
-        card_schema = json.loads((base_path / "id_card.schema.json").read_text())
-        self.card_validator = Draft7Validator(card_schema)
+        # Compiled once per process and shared between instances
+        self.card_validator = schema_validator("id_card")
+        self._fast = FastValidator("id_card")
 
     def run(self, card: IDCard) -> None:
         """Validate an IDCard instance.
@@ -35,4 +179,4 @@ class ValidatePlugin(IDPlugin):
         Raises:
             jsonschema.exceptions.ValidationError if invalid.
         """
-        self.card_validator.validate(card.to_dict())
+        self._fast.validate(card.to_dict())
@@ -3,7 +3,10 @@ import os
 import pathlib
 import shutil
 import tempfile
-from typing import Dict, Any, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import pydantic
 
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
@@ -11,7 +14,7 @@ from opentelemetry.sdk.resources import Resource
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 
-from .contracts import Plugin, Plan
+from .contracts import Plugin, Plan, PlanItem
 from .validation import deterministic_hash
 
 
@@ -46,9 +49,9 @@ def run(plugins: Sequence[Plugin], repo_root: str, context: Dict[str, Any]) -> d
                 recommendations.append({"plugin": p.name, "rec": rec.model_dump()})
         combined = _combine_plans([r["rec"]["proposed"] for r in recommendations])
         with tracer.start_as_current_span("validate"):
-            _validate_plan(combined)
+            plan, waves = _validate_plan(combined)
         with tracer.start_as_current_span("execute"):
-            artifacts = _apply_plan(repo_root, Plan.model_validate(combined))
+            artifacts = _apply_plan(repo_root, plan, waves=waves)
         result = {"recommendations": recommendations, "plan": combined, "artifacts": artifacts}
         span.set_attribute("plan.hash", deterministic_hash(combined))
         return result
@@ -61,32 +64,120 @@ def _combine_plans(plans: Sequence[dict]) -> dict:
     return {"version": "1.0", "items": items, "metadata": {"sources": len(plans)}}
 
 
-def _validate_plan(plan: dict) -> None:
+def _validate_plan(plan: dict) -> Tuple[Plan, List[List[int]]]:
+    """Return the parsed plan and its waves, so execution need not redo either."""
     if "items" not in plan:
         raise ValidationError("Plan missing items")
     # TODO: Optionally load and enforce schemas/plan.schema.json here
-
-
-def _apply_plan(repo_root: str, plan: Plan) -> dict:
+    try:
+        parsed = Plan.model_validate(plan)
+    except pydantic.ValidationError as exc:
+        raise ValidationError(f"invalid plan: {exc}") from exc
+    return parsed, _plan_waves(parsed.items)
+
+
+def _plan_waves(items: Sequence[PlanItem]) -> List[List[int]]:
+    """Group item indices into waves that can be applied concurrently.
+
+    ``depends_on`` entries reference the paths of other items. Items that
+    target the same path additionally keep their list order, so a delete
+    followed by a create of one file is never reordered.
+    """
+    return _waves(items, _dependencies(items))
+
+
+def _dependencies(items: Sequence[PlanItem]) -> List[set[int]]:
+    """Return, per item, the indices of the items that must apply before it."""
+    by_path: Dict[str, List[int]] = {}
+    for idx, it in enumerate(items):
+        by_path.setdefault(it.path, []).append(idx)
+    deps: List[set[int]] = []
+    for idx, it in enumerate(items):
+        before: set[int] = set()
+        for ref in it.depends_on:
+            if ref == it.path:
+                raise ValidationError(f"{it.path}: item depends on itself")
+            if ref not in by_path:
+                raise ValidationError(f"{it.path}: unknown dependency {ref}")
+            before.update(by_path[ref])
+        same_path = by_path[it.path]
+        pos = same_path.index(idx)
+        if pos:
+            before.add(same_path[pos - 1])
+        deps.append(before)
+    return deps
+
+
+def _waves(items: Sequence[PlanItem], deps: List[set[int]]) -> List[List[int]]:
+    """Topologically layer ``items`` given their ``deps`` (Kahn's algorithm)."""
+    dependents: List[List[int]] = [[] for _ in items]
+    pending = [len(d) for d in deps]
+    for idx, before in enumerate(deps):
+        for dep in before:
+            dependents[dep].append(idx)
+    waves: List[List[int]] = []
+    ready = [idx for idx, n in enumerate(pending) if n == 0]
+    placed = 0
+    while ready:
+        waves.append(ready)
+        placed += len(ready)
+        nxt: List[int] = []
+        for idx in ready:
+            for child in dependents[idx]:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    nxt.append(child)
+        ready = sorted(nxt)
+    if placed != len(items):
+        cyclic = sorted({items[idx].path for idx, n in enumerate(pending) if n})
+        raise ValidationError(f"dependency cycle between: {', '.join(cyclic)}")
+    return waves
+
+
+def _apply_plan(repo_root: str, plan: Plan, max_workers: int | None = None,
+                waves: Optional[List[List[int]]] = None) -> dict:
     tmpdir = tempfile.mkdtemp(prefix="worktree-")
     worktree = pathlib.Path(tmpdir) / "worktree"
     shutil.copytree(repo_root, worktree, dirs_exist_ok=True, ignore=shutil.ignore_patterns(".git"))
-    created, updated, deleted = 0, 0, 0
-    for it in plan.items:
-        target = worktree / it.path
-        if it.action == "create":
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_text(it.content or "", encoding="utf-8")
-            created += 1
-        elif it.action == "update":
-            if not target.exists():
-                raise ExecutionError(f"update target missing: {it.path}")
-            target.write_text(it.content or "", encoding="utf-8")
-            updated += 1
-        elif it.action == "delete":
-            if target.exists():
-                target.unlink()
-                deleted += 1
-        else:
-            raise ExecutionError(f"unknown action: {it.action}")
-    return {"worktree": str(worktree), "created": created, "updated": updated, "deleted": deleted}
\ No newline at end of file
+    counts = {"create": 0, "update": 0, "delete": 0}
+    if waves is None:
+        waves = _plan_waves(plan.items)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for n, wave in enumerate(waves):
+            with tracer.start_as_current_span("wave") as span:
+                span.set_attribute("wave.index", n)
+                span.set_attribute("wave.size", len(wave))
+                if len(wave) == 1:
+                    results = [_apply_item(worktree, plan.items[wave[0]])]
+                else:
+                    results = list(pool.map(lambda i: _apply_item(worktree, plan.items[i]), wave))
+            for action in results:
+                if action:
+                    counts[action] += 1
+    return {
+        "worktree": str(worktree),
+        "created": counts["create"],
+        "updated": counts["update"],
+        "deleted": counts["delete"],
+        "waves": len(waves),
+    }
+
+
+def _apply_item(worktree: pathlib.Path, it: PlanItem) -> str | None:
+    """Apply a single item; return the action counted, if any."""
+    target = worktree / it.path
+    if it.action == "create":
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(it.content or "", encoding="utf-8")
+        return "create"
+    if it.action == "update":
+        if not target.exists():
+            raise ExecutionError(f"update target missing: {it.path}")
+        target.write_text(it.content or "", encoding="utf-8")
+        return "update"
+    if it.action == "delete":
+        if target.exists():
+            target.unlink()
+            return "delete"
+        return None
+    raise ExecutionError(f"unknown action: {it.action}")
@@ -0,0 +1,86 @@
+"""
+bench_registry_build.py
+=======================
+
+Benchmark a full registry build, serial versus process-pool, over a
+synthetic cards directory. For example:
+
+    python -m AUTO_VERSIONING_MOD.scripts.bench_registry_build --cards 10000 100000
+
+Each size generates ``N`` cards in a temporary directory and times
+``RegistryBuildPlugin.run(full=True)`` with one worker and with
+``--workers`` workers (default: all cores). Both runs hash and parse
+cards with the same function and YAML loader, so the speedup reflects
+the process pool alone; with a single worker no speedup is reported.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from ..core.plugins.id.registry import RegistryBuildPlugin
+from ..core.plugins.id.store import CardStore
+
+
+def make_cards(cards_dir: Path, count: int) -> None:
+    """Write ``count`` synthetic ID cards to ``cards_dir``."""
+    cards_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        ulid = f"01HBENCH{i:018d}"
+        card = {
+            "doc_key": f"DOC_{i}",
+            "ulid": ulid,
+            "semver": "1.0.0",
+            "status": "active",
+            "effective_date": "2025-01-01",
+            "owner": "Platform.Engineering",
+            "contract_type": "policy",
+            "card_version": 1,
+            "aliases": [f"OLD_DOC_{i}"],
+            "supersedes_version": None,
+            "merged_into": None,
+            "absorbs": [],
+            "mfid": None,
+        }
+        (cards_dir / f"{ulid}.yaml").write_text(yaml.safe_dump(card), encoding="utf-8")
+
+
+def time_build(cards_dir: Path, registry_path: Path, workers: int) -> float:
+    plugin = RegistryBuildPlugin(
+        cards_dir=cards_dir, registry_path=registry_path,
+        store=CardStore(cards_dir), workers=workers,
+    )
+    start = time.perf_counter()
+    plugin.run(full=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel registry builds")
+    parser.add_argument("--cards", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Card counts to benchmark")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the parallel build")
+    args = parser.parse_args()
+
+    print(f"{'cards':>8} {'serial s':>10} {'parallel s':>11} {'speedup':>8}"
+          f"  (workers={args.workers}, cpus={os.cpu_count()})")
+    for count in args.cards:
+        with tempfile.TemporaryDirectory(prefix="bench-registry-") as tmp:
+            cards_dir = Path(tmp) / "cards"
+            make_cards(cards_dir, count)
+            serial = time_build(cards_dir, Path(tmp) / "serial.yaml", 1)
+            if args.workers <= 1:
+                print(f"{count:>8} {serial:>10.2f} {'-':>11} {'-':>8}")
+                continue
+            parallel = time_build(cards_dir, Path(tmp) / "parallel.yaml", args.workers)
+        print(f"{count:>8} {serial:>10.2f} {parallel:>11.2f} {serial / parallel:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
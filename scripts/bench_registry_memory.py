@@ -0,0 +1,70 @@
+"""
+bench_registry_memory.py
+========================
+
+Compare the memory footprint of :class:`Registry` and
+:class:`CompactRegistry` populated with synthetic entries. For example:
+
+    python -m AUTO_VERSIONING_MOD.scripts.bench_registry_memory --entries 1000000
+
+Each entry gets a canonical ULID, a doc_key and one alias. The strings
+are created while memory is traced, as they would be when loading a
+registry from disk, so both figures include the cost of holding them.
+Lookups are spot-checked against the plain registry.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Iterator, List, Tuple, Union
+
+from ..core.models.registry import CompactRegistry, Registry, ulid_from_bytes
+
+
+def make_rows(count: int) -> Iterator[Tuple[str, str, List[str]]]:
+    """Yield deterministic (ulid, doc_key, aliases) rows."""
+    base = 0x0190_0000_0000 << 80
+    for i in range(count):
+        u = ulid_from_bytes((base + i * 0x9E3779B97F4A7C15).to_bytes(16, "big"))
+        yield u, f"DOC_{i}", [f"OLD_DOC_{i}"]
+
+
+def measure(
+    factory: Callable[[], Union[Registry, CompactRegistry]], count: int
+) -> Tuple[Union[Registry, CompactRegistry], int, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    reg = factory()
+    for u, key, aliases in make_rows(count):
+        reg.add_entry(u, key, aliases=aliases)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return reg, size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark registry memory usage")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of entries")
+    args = parser.parse_args()
+
+    plain, plain_size, plain_s = measure(Registry, args.entries)
+    compact, compact_size, compact_s = measure(CompactRegistry, args.entries)
+    step = max(1, args.entries // 1000)
+    for n, (u, key, aliases) in enumerate(make_rows(args.entries)):
+        if n % step:
+            continue
+        assert compact.lookup_ulid(key) == plain.lookup_ulid(key) == u
+        assert compact.lookup_ulid(aliases[0]) == u
+        assert compact.lookup_key(u) == plain.lookup_key(u)
+
+    print(f"{'registry':>16} {'MiB':>9} {'bytes/entry':>12} {'build s':>8}")
+    for name, size, secs in (("Registry", plain_size, plain_s),
+                             ("CompactRegistry", compact_size, compact_s)):
+        print(f"{name:>16} {size / 2**20:>9.1f} {size / args.entries:>12.0f} {secs:>8.2f}")
+    print(f"reduction: {plain_size / compact_size:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
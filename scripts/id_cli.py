@@ -7,17 +7,188 @@ point to invoke various ID plugins from the shell. For example:
 
     python id_cli.py mint --doc-key OC_CORE --semver 1.0.0 --owner Platform.Engineering --contract-type policy
 
-Currently this CLI implements only the ``mint`` subcommand. Other
-subcommands can be added following the same pattern. See
-core/plugins/id for more details on each plugin's behaviour.
+    python id_cli.py lookup OC_CORE
+
+    python id_cli.py batch reorg.yaml      # [{op: rekey, ulid: 01J..., new_key: OC_NEW}, ...]
+
+    python id_cli.py search OC_CO          # prefix, then "did you mean"
+
+    python id_cli.py query --status active --owner Platform.Engineering --contract-type policy
+
+    python id_cli.py ledger query --ulid 01J... --since 2025-01-01T00:00:00Z > events.ndjson
+
+    python id_cli.py mfid refresh docs/
+
+    python id_cli.py cards migrate --layout sharded
+
+    python id_cli.py snapshot create ids-state.tar.gz   # CI cache artifact
+
+Subcommands import their plugins lazily so that quick queries such as
+``lookup`` (served from the memory-mapped ``ids/registry.idx``) do not
+pay for loading schemas or hashing libraries. See core/plugins/id for
+more details on each plugin's behaviour.
 """
 from __future__ import annotations
 
 import argparse
 from pathlib import Path
 
-from ..core.plugins.id.mint import MintPlugin
-from ..core.plugins.id.validate import ValidatePlugin
+DEFAULT_CARDS = Path("AUTO_VERSIONING_MOD/ids/cards")
+DEFAULT_INDEX = Path("AUTO_VERSIONING_MOD/ids/registry.idx")
+DEFAULT_SEARCH_INDEX = Path("AUTO_VERSIONING_MOD/ids/registry.search.tsv")
+DEFAULT_REGISTRY = Path("AUTO_VERSIONING_MOD/ids/registry.yaml")
+DEFAULT_LEDGER = Path("AUTO_VERSIONING_MOD/.ledger/ids.jsonl")
+DEFAULT_LINEAGE = Path("AUTO_VERSIONING_MOD/ids/registry.lineage.json")
+
+
+def _mint(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.mint import MintPlugin
+    from ..core.plugins.id.validate import ValidatePlugin
+
+    plugin = MintPlugin()
+    card = plugin.run(doc_key=args.doc_key, semver=args.semver, owner=args.owner,
+                      contract_type=args.contract_type)
+    validator = ValidatePlugin()
+    validator.run(card)
+    print(f"Minted ID card: {card.ulid} (doc_key: {card.doc_key})")
+
+
+def _batch(args: argparse.Namespace) -> None:
+    import yaml
+
+    from ..core.plugins.id.batch import BatchError, BatchPlugin, Operation
+
+    ops = [Operation.from_dict(item)
+           for item in yaml.safe_load(args.operations.read_text(encoding="utf-8")) or []]
+    plugin = BatchPlugin()
+    try:
+        cards = plugin.plan(ops)[0] if args.dry_run else plugin.run(ops)
+    except BatchError as exc:
+        raise SystemExit(str(exc)) from None
+    done = "checked" if args.dry_run else "updated"
+    print(f"{len(ops)} operations, {len(cards)} cards {done}")
+
+
+def _lookup(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.registry_index import RegistryIndex
+
+    with RegistryIndex(args.index) as index:
+        found = index.lookup_key(args.key) if args.reverse else index.lookup_ulid(args.key)
+    if found is None:
+        raise SystemExit(f"not found: {args.key}")
+    print(found)
+
+
+def _resolve(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.lineage import LineageIndex
+
+    lineage = LineageIndex.load(args.lineage)
+    for ulid in args.ulids:
+        line = f"{ulid}\t{lineage.resolve(ulid)}"
+        if args.ancestors:
+            line += "\t" + ",".join(lineage.ancestors(ulid))
+        print(line)
+
+
+def _search(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.search import SearchIndex
+
+    index = SearchIndex.load(args.search_index)
+    hits = [] if args.fuzzy else index.prefix(args.query, args.limit)
+    if not hits:
+        hits = index.fuzzy(args.query, args.limit)
+    for key, ulid in hits:
+        print(f"{key}\t{ulid}")
+
+
+def _query(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.registry import load_registry
+
+    registry = load_registry(args.registry)
+    filters = {name: value for name, value in (("status", args.status),
+                                               ("owner", args.owner),
+                                               ("contract_type", args.contract_type))
+               if value is not None}
+    for ulid in registry.query(**filters):
+        print(f"{ulid}\t{registry.lookup_key(ulid)}")
+
+
+def _ledger_query(args: argparse.Namespace) -> None:
+    import sys
+
+    from ..core.plugins.id.ledger_query import LedgerReader
+
+    reader = LedgerReader(args.ledger, ordered=args.ordered)
+    out = sys.stdout.buffer
+    for line in reader.lines(event_type=args.event_type, ulid=args.ulid,
+                             doc_key=args.doc_key, since=args.since, until=args.until):
+        out.write(line)
+    out.flush()
+
+
+def _ledger_compress(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.ledger_segments import SegmentedLedger
+
+    for path in SegmentedLedger(args.ledger_dir).compress_sealed(args.codec):
+        print(path)
+
+
+def _ledger_verify(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.ledger_verify import LedgerVerifier
+
+    result = LedgerVerifier(args.ledger, workers=args.workers).verify(full=args.full)
+    for error in result.errors:
+        print(error)
+    if not result.ok:
+        raise SystemExit(f"ledger verification failed ({len(result.errors)} errors)")
+    print(f"verified {result.events} events")
+
+
+def _ledger_validate(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.ledger_validate import validate_ledger
+
+    report = validate_ledger(args.ledger, workers=args.workers)
+    for problem in report.problems:
+        print(problem)
+    if not report.ok:
+        raise SystemExit(f"{len(report.problems)} invalid events")
+    print(f"validated {report.events} events")
+
+
+def _cards_migrate(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.store import CardStore
+
+    moved = CardStore.for_dir(args.cards_dir).migrate(args.layout)
+    print(f"moved {moved} cards to the {args.layout} layout")
+
+
+def _cards_pack(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.pack import write_pack
+    from ..core.plugins.id.store import CardStore
+
+    stats = write_pack(CardStore.for_dir(args.cards_dir), prune=args.prune)
+    print(", ".join(f"{name}: {count}" for name, count in stats.items()))
+
+
+def _snapshot_create(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.pack import create_snapshot
+
+    stats = create_snapshot(args.archive)
+    print(f"wrote {args.archive}: {stats['packed']} cards, {stats['files']} files")
+
+
+def _snapshot_restore(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.pack import restore_snapshot
+
+    print(f"restored {restore_snapshot(args.archive)} files")
+
+
+def _mfid_refresh(args: argparse.Namespace) -> None:
+    from ..core.plugins.id.mfid import MFIDPlugin
+
+    stats = MFIDPlugin().refresh(args.docs_dir, pattern=args.pattern, workers=args.workers,
+                                 normalize_newlines=args.normalize_newlines)
+    print(", ".join(f"{name}: {count}" for name, count in stats.items()))
 
 
 def main() -> None:
@@ -30,15 +201,143 @@ def main() -> None:
     mint_parser.add_argument("--semver", required=True, help="Initial semantic version")
     mint_parser.add_argument("--owner", required=True, help="Owner of the document")
     mint_parser.add_argument("--contract-type", required=True, help="Contract type")
+    mint_parser.set_defaults(func=_mint)
 
-    args = parser.parse_args()
+    # batch command
+    batch_parser = subparsers.add_parser(
+        "batch", help="Apply a YAML list of rekey/deprecate/consolidate operations atomically"
+    )
+    batch_parser.add_argument("operations", type=Path,
+                              help="YAML list of {op, ulid, new_key|reason|sources}")
+    batch_parser.add_argument("--dry-run", action="store_true",
+                              help="Only validate the batch")
+    batch_parser.set_defaults(func=_batch)
+
+    # lookup command
+    lookup_parser = subparsers.add_parser("lookup", help="Resolve a doc_key, alias or ULID")
+    lookup_parser.add_argument("key", help="doc_key or alias (or ULID with --reverse)")
+    lookup_parser.add_argument("--reverse", action="store_true",
+                               help="Treat KEY as a ULID and print its doc_key")
+    lookup_parser.add_argument("--index", type=Path, default=DEFAULT_INDEX,
+                               help="Binary registry index to read")
+    lookup_parser.set_defaults(func=_lookup)
 
-    if args.command == "mint":
-        plugin = MintPlugin()
-        card = plugin.run(doc_key=args.doc_key, semver=args.semver, owner=args.owner, contract_type=args.contract_type)
-        validator = ValidatePlugin()
-        validator.run(card)
-        print(f"Minted ID card: {card.ulid} (doc_key: {card.doc_key})")
+    # resolve command
+    resolve_parser = subparsers.add_parser(
+        "resolve", help="Resolve ULIDs to the card they were finally merged into"
+    )
+    resolve_parser.add_argument("ulids", nargs="+", help="ULIDs to resolve")
+    resolve_parser.add_argument("--ancestors", action="store_true",
+                                help="Also list every ULID merged into or superseded by each")
+    resolve_parser.add_argument("--lineage", type=Path, default=DEFAULT_LINEAGE,
+                                help="Lineage index written by the registry build")
+    resolve_parser.set_defaults(func=_resolve)
+
+    # search command
+    search_parser = subparsers.add_parser("search", help="Prefix or fuzzy doc_key search")
+    search_parser.add_argument("query", help="Prefix or approximate doc_key/alias")
+    search_parser.add_argument("--fuzzy", action="store_true",
+                               help="Rank by edit distance instead of prefix matching")
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum results")
+    search_parser.add_argument("--search-index", type=Path, default=DEFAULT_SEARCH_INDEX,
+                               help="Search index written by the registry build")
+    search_parser.set_defaults(func=_search)
+
+    # query command
+    query_parser = subparsers.add_parser("query", help="Filter registry entries by card fields")
+    query_parser.add_argument("--status", help="e.g. active or deprecated")
+    query_parser.add_argument("--owner", help="Owning team or individual")
+    query_parser.add_argument("--contract-type", help="e.g. policy")
+    query_parser.add_argument("--registry", type=Path, default=DEFAULT_REGISTRY,
+                              help="Registry YAML written by the registry build")
+    query_parser.set_defaults(func=_query)
+
+    # ledger commands
+    ledger_parser = subparsers.add_parser("ledger", help="Read the event ledger")
+    ledger_commands = ledger_parser.add_subparsers(dest="ledger_command", required=True)
+    ledger_query_parser = ledger_commands.add_parser(
+        "query", help="Stream matching ledger events as NDJSON"
+    )
+    ledger_query_parser.add_argument("--event-type", help="e.g. CREATE or DEPRECATE")
+    ledger_query_parser.add_argument("--ulid", help="Events for this ULID")
+    ledger_query_parser.add_argument("--doc-key", help="Events recorded under this doc_key")
+    ledger_query_parser.add_argument("--since", help="Inclusive ISO 8601 lower bound")
+    ledger_query_parser.add_argument("--until", help="Inclusive ISO 8601 upper bound")
+    ledger_query_parser.add_argument("--ledger", type=Path, default=DEFAULT_LEDGER,
+                                     help="Ledger JSONL file or segment directory")
+    ledger_query_parser.add_argument("--ordered", action="store_true",
+                                     help="The ledger file is time-ordered (written with "
+                                          "locking); enables seeking to --since")
+    ledger_query_parser.set_defaults(func=_ledger_query)
+    ledger_compress_parser = ledger_commands.add_parser(
+        "compress", help="Compress sealed segments of a segmented ledger"
+    )
+    ledger_compress_parser.add_argument("ledger_dir", type=Path, help="Segment directory")
+    ledger_compress_parser.add_argument("--codec", choices=("gzip", "lzma"), default="gzip")
+    ledger_compress_parser.set_defaults(func=_ledger_compress)
+    ledger_verify_parser = ledger_commands.add_parser(
+        "verify", help="Check the hash chain since the last checkpoint"
+    )
+    ledger_verify_parser.add_argument("--ledger", type=Path, default=DEFAULT_LEDGER,
+                                      help="Ledger JSONL file or segment directory")
+    ledger_verify_parser.add_argument("--full", action="store_true",
+                                      help="Re-check the whole ledger in parallel")
+    ledger_verify_parser.add_argument("--workers", type=int, help="Worker processes")
+    ledger_verify_parser.set_defaults(func=_ledger_verify)
+    ledger_validate_parser = ledger_commands.add_parser(
+        "validate", help="Check every event against ledger_event.schema.json"
+    )
+    ledger_validate_parser.add_argument("--ledger", type=Path, default=DEFAULT_LEDGER,
+                                        help="Ledger JSONL file or segment directory")
+    ledger_validate_parser.add_argument("--workers", type=int, help="Worker processes")
+    ledger_validate_parser.set_defaults(func=_ledger_validate)
+
+    # cards commands
+    cards_parser = subparsers.add_parser("cards", help="Maintain the cards directory")
+    cards_commands = cards_parser.add_subparsers(dest="cards_command", required=True)
+    cards_migrate_parser = cards_commands.add_parser(
+        "migrate", help="Move cards between the flat and sharded layouts"
+    )
+    cards_migrate_parser.add_argument("--layout", choices=("flat", "sharded"), required=True)
+    cards_migrate_parser.add_argument("--cards-dir", type=Path, default=DEFAULT_CARDS,
+                                      help="ID Card directory")
+    cards_migrate_parser.set_defaults(func=_cards_migrate)
+    cards_pack_parser = cards_commands.add_parser(
+        "pack", help="Regenerate the card pack used for cold-start reads"
+    )
+    cards_pack_parser.add_argument("--prune", action="store_true",
+                                   help="Remove loose card files once they are packed")
+    cards_pack_parser.add_argument("--cards-dir", type=Path, default=DEFAULT_CARDS,
+                                   help="ID Card directory")
+    cards_pack_parser.set_defaults(func=_cards_pack)
+
+    # snapshot commands
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Save or restore the whole ID state as one archive"
+    )
+    snapshot_commands = snapshot_parser.add_subparsers(dest="snapshot_command", required=True)
+    snapshot_create_parser = snapshot_commands.add_parser("create", help="Write an archive")
+    snapshot_create_parser.add_argument("archive", type=Path, help="Output .tar.gz")
+    snapshot_create_parser.set_defaults(func=_snapshot_create)
+    snapshot_restore_parser = snapshot_commands.add_parser("restore", help="Unpack an archive")
+    snapshot_restore_parser.add_argument("archive", type=Path, help="Archive to restore")
+    snapshot_restore_parser.set_defaults(func=_snapshot_restore)
+
+    # mfid commands
+    mfid_parser = subparsers.add_parser("mfid", help="Maintain content fingerprints")
+    mfid_commands = mfid_parser.add_subparsers(dest="mfid_command", required=True)
+    mfid_refresh_parser = mfid_commands.add_parser(
+        "refresh", help="Re-hash changed documents and update their cards"
+    )
+    mfid_refresh_parser.add_argument("docs_dir", type=Path, help="Directory of documents")
+    mfid_refresh_parser.add_argument("--pattern", default="**/*.md", help="Glob for documents")
+    mfid_refresh_parser.add_argument("--workers", type=int, help="Hashing threads")
+    mfid_refresh_parser.add_argument("--normalize-newlines", action="store_true",
+                                     help="Hash CRLF/CR line endings as LF")
+    mfid_refresh_parser.set_defaults(func=_mfid_refresh)
+
+    args = parser.parse_args()
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -16,9 +16,9 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
-import yaml
 
 from ..core.plugins.id.mint import MintPlugin
+from ..core.plugins.id.store import CardStore
 from ..core.plugins.id.ledger import LedgerPlugin
 from ..core.plugins.id.validate import ValidatePlugin
 
@@ -32,10 +32,8 @@ def migrate_directory(directory: Path) -> None:
         doc_key = file.stem.upper()
         card = MintPlugin().run(doc_key=doc_key, semver="1.0.0", owner="Unknown", contract_type="policy")
         ValidatePlugin().run(card)
-        # Persist ID Card YAML
-        cards_dir = Path("AUTO_VERSIONING_MOD/ids/cards")
-        cards_dir.mkdir(parents=True, exist_ok=True)
-        yaml.safe_dump(card.to_dict(), (cards_dir / f"{card.ulid}.yaml").open("w", encoding="utf-8"))
+        # Persist ID Card YAML (in whichever layout the cards directory uses)
+        CardStore.for_dir(Path("AUTO_VERSIONING_MOD/ids/cards")).put(card)
         # Append event handled by MintPlugin in future
         print(f"Migrated {file.name} -> {card.ulid}")
 
@@ -4,11 +4,11 @@ conftest.py
 
 Pytest configuration and fixtures for the ID module tests. This file
 defines shared fixtures used across unit tests. For example, it
-provides helper functions to create sample card data for tests.
-
-Currently this skeleton does not implement any complex fixtures.
-Workstream A can add fixtures here as needed.
+provides helper functions to create sample card data for tests, and
+the ``make_card``/``write_card`` factories built on it.
 """
+from pathlib import Path
+from typing import Any, Callable
 
 import pytest
 
@@ -18,7 +18,7 @@ def sample_card_data() -> dict:
     """Return a minimal dictionary representing an ID card for tests."""
     return {
         "doc_key": "TEST_DOC",
-        "ulid": "01HXXXXXXULIDXXXXXXTESTXX",
+        "ulid": "01HTESTXXXXXXXXXXXXXXXXXXX",
         "semver": "1.0.0",
         "status": "active",
         "effective_date": "2025-01-01",
@@ -31,3 +31,28 @@ def sample_card_data() -> dict:
         "absorbs": [],
         "mfid": None,
     }
+
+
+@pytest.fixture
+def make_card(sample_card_data: dict) -> Callable[..., Any]:
+    """Return a factory ``make_card(ulid, doc_key, **fields)`` for IDCards."""
+    from AUTO_VERSIONING_MOD.core.models.id_card import IDCard
+
+    def factory(ulid: str, doc_key: str, **fields: Any) -> IDCard:
+        return IDCard.from_dict({**sample_card_data, "ulid": ulid, "doc_key": doc_key, **fields})
+
+    return factory
+
+
+@pytest.fixture
+def write_card(make_card: Callable[..., Any]) -> Callable[..., Any]:
+    """Return a factory ``write_card(cards_dir, ulid, doc_key, **fields)`` that writes YAML."""
+    import yaml
+
+    def factory(cards_dir: Path, ulid: str, doc_key: str, **fields: Any) -> Any:
+        card = make_card(ulid, doc_key, **fields)
+        with (cards_dir / f"{ulid}.yaml").open("w", encoding="utf-8") as fh:
+            yaml.safe_dump(card.to_dict(), fh)
+        return card
+
+    return factory
@@ -0,0 +1,53 @@
+"""
+Tests for CompactRegistry parity with Registry.
+"""
+from AUTO_VERSIONING_MOD.core.models.registry import (
+    CompactRegistry,
+    Registry,
+    ulid_from_bytes,
+    ulid_to_bytes,
+)
+
+
+def test_ulid_binary_round_trip() -> None:
+    ulid = "01HZX3Q4N5M6P7R8S9T0V1W2XY"
+    raw = ulid_to_bytes(ulid)
+    assert raw is not None and len(raw) == 16
+    assert ulid_from_bytes(raw) == ulid
+    assert ulid_to_bytes("01HXXXXXXULIDXXXXXXTESTXX") is None
+
+
+def test_compact_registry_matches_registry() -> None:
+    plain, compact = Registry(), CompactRegistry()
+    rows = [
+        ("01HZX3Q4N5M6P7R8S9T0V1W2X0", "DOC0", ["OLD0"]),
+        ("01HZX3Q4N5M6P7R8S9T0V1W2X1", "DOC1", None),
+        ("01HXXXXXXULIDXXXXXXTESTXX", "ODD", ["ODD_ALIAS"]),
+        ("01HZX3Q4N5M6P7R8S9T0V1W2X0", "DOC0_NEW", ["DOC0"]),
+    ]
+    for ulid, key, aliases in rows:
+        plain.add_entry(ulid, key, aliases=aliases)
+        compact.add_entry(ulid, key, aliases=aliases)
+    assert len(compact) == 3
+    assert dict(compact.by_ulid) == plain.by_ulid
+    assert dict(compact.by_key) == plain.by_key
+    assert dict(compact.aliases) == plain.aliases
+    assert compact.lookup_ulid("MISSING") is None
+    assert compact.lookup_key("01HZX3Q4N5M6P7R8S9T0V1W2X9") is None
+    assert dict(CompactRegistry.from_registry(plain).by_key) == plain.by_key
+
+
+def test_field_updates_move_entry_between_buckets() -> None:
+    for reg in (Registry(), CompactRegistry()):
+        reg.add_entry("01HZX3Q4N5M6P7R8S9T0V1W2X0", "DOC0", owner="QA", status="active")
+        reg.add_entry("01HZX3Q4N5M6P7R8S9T0V1W2X1", "DOC1", owner="QA")
+        reg.add_entry("01HZX3Q4N5M6P7R8S9T0V1W2X0", "DOC0", owner="Ops")
+        assert reg.query(owner="QA") == ["01HZX3Q4N5M6P7R8S9T0V1W2X1"]
+        assert reg.query(owner="Ops", status="active") == ["01HZX3Q4N5M6P7R8S9T0V1W2X0"]
+        assert reg.field_value("01HZX3Q4N5M6P7R8S9T0V1W2X0", "owner") == "Ops"
+        assert reg.field_value("01HZX3Q4N5M6P7R8S9T0V1W2X1", "status") is None
+        assert reg.field_value("01HZX3Q4N5M6P7R8S9T0V1W2X9", "owner") is None
+    plain = Registry()
+    plain.add_entry("01HZX3Q4N5M6P7R8S9T0V1W2X0", "DOC0", owner="QA")
+    compact = CompactRegistry.from_registry(plain)
+    assert compact.field_value("01HZX3Q4N5M6P7R8S9T0V1W2X0", "owner") == "QA"
@@ -14,7 +14,7 @@ def test_append_event_creates_file(tmp_path: Path) -> None:
     event = LedgerEvent(
         event_type="CREATE",
         timestamp="2025-11-03T00:00:00Z",
-        ulid="01HXXXXXXULIDXXXXXXLEDGERX",
+        ulid="01HEVENTXXXXXXXXXXXXXXXXXX",
         doc_key="LEDGER_TEST",
         data={},
     )
@@ -22,3 +22,76 @@ def test_append_event_creates_file(tmp_path: Path) -> None:
     assert ledger_path.exists()
     contents = ledger_path.read_text().strip().splitlines()
     assert json.loads(contents[0])["event_type"] == "CREATE"
+
+
+def make_event(n: int) -> LedgerEvent:
+    return LedgerEvent(
+        event_type="CREATE",
+        timestamp="2025-11-03T00:00:00Z",
+        ulid=f"01HEVENTXXXXXXXXXXXXXXXX{n:02d}",
+        doc_key=f"DOC_{n}",
+        data={},
+    )
+
+
+def test_session_groups_writes_by_count(tmp_path: Path) -> None:
+    ledger_path = tmp_path / "ids.jsonl"
+    plugin = LedgerPlugin(ledger_path)
+    with plugin.session(batch_size=4, max_delay=60, fsync="none") as writer:
+        for n in range(10):
+            plugin.run(make_event(n))
+        assert writer.metrics()["pending"] == 2
+        assert len(ledger_path.read_text().splitlines()) == 8
+    metrics = writer.metrics()
+    assert (metrics["events"], metrics["flushes"]) == (10, 3)
+    lines = ledger_path.read_text().splitlines()
+    assert [json.loads(line)["doc_key"] for line in lines] == [f"DOC_{n}" for n in range(10)]
+    # Once the session is closed, run() appends directly again.
+    plugin.run(make_event(10))
+    assert len(ledger_path.read_text().splitlines()) == 11
+
+
+def test_every_policy_writes_each_event(tmp_path: Path) -> None:
+    from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerWriter
+
+    with LedgerWriter(tmp_path / "ids.jsonl", batch_size=100, fsync="every") as writer:
+        writer.append(make_event(1))
+        writer.append(make_event(2))
+        assert writer.metrics()["flushes"] == 2
+
+
+def _locked_writer(args) -> None:
+    from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerWriter
+
+    ledger_path, worker = args
+    with LedgerWriter(Path(ledger_path), batch_size=8, fsync="none", lock=True) as writer:
+        for n in range(50):
+            event = make_event(n)
+            event.data = {"worker": worker, "padding": "x" * 8192}
+            writer.append(event)
+
+
+def test_concurrent_locked_writers_do_not_interleave(tmp_path: Path) -> None:
+    import multiprocessing
+
+    ledger_path = tmp_path / "ids.jsonl"
+    with multiprocessing.Pool(4) as pool:
+        pool.map(_locked_writer, [(str(ledger_path), w) for w in range(4)])
+    lines = ledger_path.read_text().splitlines()
+    assert len(lines) == 200
+    assert all(json.loads(line)["data"]["padding"] for line in lines)
+
+
+def test_locked_writer_keeps_timestamps_monotonic(tmp_path: Path) -> None:
+    ledger_path = tmp_path / "ids.jsonl"
+    late, early = make_event(1), make_event(2)
+    late.timestamp = "2025-11-03T10:00:00.500000Z"
+    early.timestamp = "2025-11-03T10:00:00Z"
+    plugin = LedgerPlugin(ledger_path, lock=True)
+    plugin.run(late)
+    plugin.run(early)
+    lines = [json.loads(line) for line in ledger_path.read_text().splitlines()]
+    # The event keeps its own time and is ordered at the previous commit's.
+    assert [e["timestamp"] for e in lines] == [late.timestamp, "2025-11-03T10:00:00Z"]
+    assert [e.get("committed_at") for e in lines] == [None, late.timestamp]
+    assert early.timestamp == "2025-11-03T10:00:00Z" and early.committed_at is None
@@ -0,0 +1,60 @@
+"""
+Tests for the streaming ledger reader.
+"""
+from pathlib import Path
+
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_query import LedgerReader
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_segments import SegmentedLedger
+from AUTO_VERSIONING_MOD.core.models.ledger_event import LedgerEvent
+
+
+def make_event(n: int) -> LedgerEvent:
+    return LedgerEvent(
+        event_type="CREATE" if n % 2 == 0 else "DEPRECATE",
+        timestamp=f"2025-11-03T{n // 3600:02d}:{n // 60 % 60:02d}:{n % 60:02d}Z",
+        ulid=f"01HQRYXXXXXXXXXXXXXXXXXX{n % 5:02d}",
+        doc_key=f"DOC_{n % 7}",
+        data={"n": n},
+    )
+
+
+def write_file(path: Path, count: int) -> None:
+    plugin = LedgerPlugin(path)
+    with plugin.session(batch_size=500, fsync="none"):
+        for n in range(count):
+            plugin.run(make_event(n))
+
+
+def test_filters_on_file(tmp_path: Path) -> None:
+    path = tmp_path / "ids.jsonl"
+    write_file(path, 200)
+    reader = LedgerReader(path)
+    got = [e.data["n"] for e in reader.query(event_type="DEPRECATE",
+                                             ulid="01HQRYXXXXXXXXXXXXXXXXXX01")]
+    assert got == [n for n in range(200) if n % 2 == 1 and n % 5 == 1]
+    got = [e.data["n"] for e in reader.query(doc_key="DOC_3", since="2025-11-03T00:01:00Z",
+                                             until="2025-11-03T00:02:00Z")]
+    assert got == [n for n in range(60, 121) if n % 7 == 3]
+    assert not list(reader.query(ulid="01HQRYXXXXXXXXXXXXXXXXXX99"))
+
+
+def test_ordered_file_seeks_to_since(tmp_path: Path) -> None:
+    path = tmp_path / "ids.jsonl"
+    write_file(path, 5000)
+    reader = LedgerReader(path, ordered=True)
+    got = [e.data["n"] for e in reader.query(since="2025-11-03T01:00:00Z",
+                                             until="2025-11-03T01:00:09Z")]
+    assert got == list(range(3600, 3610))
+    lines = list(reader.lines(since="2025-11-03T01:23:00Z"))
+    assert len(lines) == 5000 - 83 * 60
+    assert all(line.endswith(b"\n") for line in lines)
+
+
+def test_segment_directory_uses_indexes(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path / "ids", max_bytes=4000)
+    ledger.append_many([make_event(n) for n in range(300)])
+    reader = LedgerReader(tmp_path / "ids")
+    got = [e.data["n"] for e in reader.query(ulid="01HQRYXXXXXXXXXXXXXXXXXX02",
+                                             since="2025-11-03T00:02:00Z")]
+    assert got == [n for n in range(120, 300) if n % 5 == 2]
@@ -0,0 +1,116 @@
+"""
+Tests for the segmented ledger.
+"""
+from pathlib import Path
+
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_segments import SegmentedLedger
+from AUTO_VERSIONING_MOD.core.models.ledger_event import LedgerEvent
+
+
+def make_event(n: int, ulid: str = "01HSEGXXXXXXXXXXXXXXXXXX00") -> LedgerEvent:
+    return LedgerEvent(
+        event_type="MFID_UPDATE",
+        timestamp=f"2025-11-03T00:{n // 60:02d}:{n % 60:02d}Z",
+        ulid=ulid,
+        doc_key=f"DOC_{n}",
+        data={"n": n},
+    )
+
+
+def test_rotation_by_size_seals_segments(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path, max_bytes=1000, interval=4)
+    ledger.append_many([make_event(n) for n in range(50)])
+    segments = ledger.segment_paths()
+    assert len(segments) > 1
+    assert all(ledger.is_sealed(s) for s in segments[:-1])
+    assert not ledger.is_sealed(segments[-1])
+    assert all(s.stat().st_size <= 1000 for s in segments)
+    assert [e.data["n"] for e in ledger.events()] == list(range(50))
+
+
+def test_rotation_by_time_span(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path, max_span=60)
+    for n in range(0, 300, 10):
+        ledger.append(make_event(n))
+    for segment in ledger.segment_paths()[:-1]:
+        idx = ledger.index_for(segment)
+        assert idx is not None and idx.count <= 7
+
+
+def test_query_by_ulid_and_time(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path, max_bytes=2000, interval=3)
+    events = [
+        make_event(n, ulid="01HSEGXXXXXXXXXXXXXXXXXX0" + str(n % 3)) for n in range(120)
+    ]
+    ledger.append_many(events)
+    ledger.seal()
+    got = [e.data["n"] for e in ledger.events(ulid="01HSEGXXXXXXXXXXXXXXXXXX01")]
+    assert got == list(range(1, 120, 3))
+    window = [
+        e.data["n"]
+        for e in ledger.events(since="2025-11-03T00:01:00Z", until="2025-11-03T00:01:09Z")
+    ]
+    assert window == list(range(60, 70))
+    assert not list(ledger.events(since="2025-11-04T00:00:00Z"))
+
+
+def test_since_keeps_events_sharing_a_sampled_timestamp(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path, interval=2)
+    seconds = [0, 1, 1, 1, 2]
+    ledger.append_many([
+        LedgerEvent(event_type="MFID_UPDATE", timestamp=f"2025-11-03T00:00:{s:02d}Z",
+                    ulid=f"01HSEGXXXXXXXXXXXXXXXXXX0{n}", doc_key=f"DOC_{n}", data={"n": n})
+        for n, s in enumerate(seconds)
+    ])
+    ledger.seal()
+    got = [e.data["n"] for e in ledger.events(since="2025-11-03T00:00:01Z")]
+    assert got == [1, 2, 3, 4]
+
+
+def test_plugin_session_writes_segments(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path / "ids", max_bytes=1000)
+    plugin = LedgerPlugin(tmp_path / "ids.jsonl", segments=ledger)
+    plugin.run(make_event(0))
+    with plugin.session(batch_size=10, fsync="none") as writer:
+        for n in range(1, 40):
+            plugin.run(make_event(n))
+    assert writer.metrics()["events"] == 39
+    assert not (tmp_path / "ids.jsonl").exists()
+    assert len(list(ledger.events())) == 40
+
+
+def test_compressed_segments_read_like_plain(tmp_path: Path) -> None:
+    plain = SegmentedLedger(tmp_path / "plain", max_bytes=4000, interval=4)
+    packed = SegmentedLedger(tmp_path / "packed", max_bytes=4000, interval=4,
+                             compress="gzip", block_size=500)
+    events = [
+        make_event(n, ulid="01HSEGXXXXXXXXXXXXXXXXXX0" + str(n % 3)) for n in range(200)
+    ]
+    plain.append_many(events)
+    packed.append_many(events)
+    sealed = packed.segment_paths()[:-1]
+    assert sealed and all(p.name.endswith(".jsonl.gz") for p in sealed)
+    assert sum(p.stat().st_size for p in sealed) < sum(
+        p.stat().st_size for p in plain.segment_paths()[:-1]
+    )
+    for query in ({}, {"ulid": "01HSEGXXXXXXXXXXXXXXXXXX02"},
+                  {"since": "2025-11-03T00:01:30Z", "until": "2025-11-03T00:02:10Z"}):
+        assert list(packed.events(**query)) == list(plain.events(**query))
+    assert plain.compress_sealed("lzma")
+    assert list(plain.events()) == list(packed.events())
+
+
+def test_late_events_keep_their_timestamp(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path, interval=1)
+    ledger.append_many([make_event(30)])
+    late = make_event(10)
+    ledger.append_many([late, make_event(40)])
+    ledger.seal()
+    got = [(e.timestamp, e.committed_at) for e in ledger.events(since="2025-11-03T00:00:30Z")]
+    assert got == [
+        ("2025-11-03T00:00:30Z", None),
+        ("2025-11-03T00:00:10Z", "2025-11-03T00:00:30Z"),
+        ("2025-11-03T00:00:40Z", None),
+    ]
+    assert late.committed_at is None
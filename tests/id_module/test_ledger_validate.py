@@ -0,0 +1,63 @@
+"""
+Tests for ledger event schema validation.
+"""
+import json
+from pathlib import Path
+
+import pytest
+from jsonschema.exceptions import ValidationError
+
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_validate import validate_ledger
+from AUTO_VERSIONING_MOD.core.plugins.id.validate import LedgerEventValidator
+from AUTO_VERSIONING_MOD.core.models.ledger_event import LedgerEvent
+
+
+def make_event(n: int, event_type: str = "CREATE") -> LedgerEvent:
+    return LedgerEvent(
+        event_type=event_type,
+        timestamp="2025-11-03T00:00:00Z",
+        ulid=f"01HZZZZZZZZZZZZZZZZZZZZ{n:03d}",
+        doc_key=f"DOC_{n}",
+        data={"n": n},
+    )
+
+
+def test_fast_path_agrees_with_schema() -> None:
+    validator = LedgerEventValidator()
+    good = make_event(1).to_dict()
+    assert validator.is_valid(good) and validator.errors(good) == []
+    for bad in (
+        {**good, "event_type": "BOGUS"},
+        {**good, "ulid": "not-a-ulid"},
+        {**good, "extra": 1},
+        {k: v for k, v in good.items() if k != "data"},
+        {**good, "data": []},
+    ):
+        assert not validator.is_valid(bad)
+        assert validator.errors(bad)
+        assert not validator.validator.is_valid(bad)
+
+
+def test_plugin_validates_on_append_by_default(tmp_path: Path) -> None:
+    plugin = LedgerPlugin(tmp_path / "ids.jsonl")
+    plugin.run(make_event(1))
+    with pytest.raises(ValidationError):
+        plugin.run(make_event(2, event_type="BOGUS"))
+    with plugin.session(fsync="none"):
+        with pytest.raises(ValidationError):
+            plugin.run(make_event(3, event_type="BOGUS"))
+    assert len((tmp_path / "ids.jsonl").read_text().splitlines()) == 1
+
+
+def test_bulk_validation_reports_line_numbers(tmp_path: Path) -> None:
+    path = tmp_path / "ids.jsonl"
+    lines = [json.dumps(make_event(n).to_dict()) for n in range(200)]
+    lines[17] = json.dumps(make_event(17, event_type="BOGUS").to_dict())
+    lines[150] = "{not json"
+    path.write_text("\n".join(lines) + "\n")
+    report = validate_ledger(path, workers=4, chunk_bytes=2000)
+    assert report.events == 200
+    assert [(p.line, p.errors[0][:12]) for p in report.problems] == [
+        (18, "event_type: "), (151, "invalid JSON"),
+    ]
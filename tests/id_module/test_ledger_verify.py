@@ -0,0 +1,86 @@
+"""
+Tests for hash-chained ledger verification.
+"""
+from pathlib import Path
+
+import pytest
+
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger import GENESIS, LedgerPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_segments import SegmentedLedger
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_verify import LedgerVerifier
+from AUTO_VERSIONING_MOD.core.models.ledger_event import LedgerEvent
+
+
+def make_event(n: int) -> LedgerEvent:
+    return LedgerEvent(
+        event_type="MFID_UPDATE",
+        timestamp=f"2025-11-03T00:{n // 60 % 60:02d}:{n % 60:02d}Z",
+        ulid=f"01HVERXXXXXXXXXXXXXXXXXX{n % 10:02d}",
+        doc_key=f"DOC_{n}",
+        data={"n": n},
+    )
+
+
+def write(path: Path, start: int, stop: int) -> None:
+    plugin = LedgerPlugin(path, chain=True)
+    with plugin.session(batch_size=16, fsync="none"):
+        for n in range(start, stop):
+            plugin.run(make_event(n))
+
+
+def test_chain_detects_tampering(tmp_path: Path) -> None:
+    path = tmp_path / "ids.jsonl"
+    write(path, 0, 50)
+    assert b'"prev_hash": "' + GENESIS.encode() in path.read_bytes().splitlines()[0]
+    result = LedgerVerifier(path, workers=1).verify(record=False)
+    assert result.ok and result.events == 50
+    lines = path.read_bytes().splitlines(keepends=True)
+    path.write_bytes(b"".join(lines[:20] + lines[21:]))
+    result = LedgerVerifier(path, workers=1).verify(record=False)
+    assert not result.ok and "chain broken" in result.errors[0]
+
+
+def test_incremental_verify_uses_checkpoints(tmp_path: Path) -> None:
+    path = tmp_path / "ids.jsonl"
+    write(path, 0, 30)
+    verifier = LedgerVerifier(path, workers=1)
+    assert verifier.verify().events == 30
+    write(path, 30, 45)
+    result = verifier.verify()
+    assert result.ok and result.events == 45
+    assert [c["events"] for c in verifier.checkpoints()] == [30, 45]
+    data = path.read_bytes()
+    path.write_bytes(data.replace(b'"n": 44', b'"n": 99'))
+    assert not verifier.verify().ok
+    path.write_bytes(data.replace(b'"n": 3}', b'"n": 4}'))
+    assert verifier.verify().ok  # before the checkpoint: only a full audit sees it
+    assert not verifier.verify(full=True).ok
+
+
+def test_parallel_audit_of_segments(tmp_path: Path) -> None:
+    ledger = SegmentedLedger(tmp_path / "ids", max_bytes=2000, chain=True, compress="gzip")
+    for n in range(0, 120, 20):
+        ledger.append_many([make_event(i) for i in range(n, n + 20)])
+    assert len(ledger.segment_paths()) > 3
+    verifier = LedgerVerifier(tmp_path / "ids", workers=2)
+    result = verifier.verify(full=True)
+    assert result.ok and result.events == 120
+    ledger.append_many([make_event(120)])
+    assert verifier.verify().events == 121
+    middle = ledger.segment_paths()[2]
+    ledger.sidecar_for(middle).unlink()
+    middle.unlink()
+    result = verifier.verify(full=True)
+    assert not result.ok
+
+
+def test_chain_setting_must_match_segments(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        LedgerPlugin(tmp_path / "ids.jsonl", segments=SegmentedLedger(tmp_path / "a"), chain=True)
+    plugin = LedgerPlugin(tmp_path / "ids.jsonl",
+                          segments=SegmentedLedger(tmp_path / "b", chain=True))
+    with plugin.session(fsync="none") as writer:
+        assert plugin.chain and writer.chain
+        plugin.run(make_event(0))
+    result = LedgerVerifier(tmp_path / "b").verify(full=True)
+    assert result.ok and result.events == 1
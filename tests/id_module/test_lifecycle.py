@@ -1,9 +1,14 @@
 """
 Tests for lifecycle operation plugins (Rekey, Deprecate, Consolidate).
 """
+import json
 from pathlib import Path
+
+import pytest
 import yaml
 
+from AUTO_VERSIONING_MOD.core.plugins.id.batch import BatchError, BatchPlugin, Operation
+
 from AUTO_VERSIONING_MOD.core.plugins.id.rekey import RekeyPlugin
 from AUTO_VERSIONING_MOD.core.plugins.id.deprecate import DeprecatePlugin
 from AUTO_VERSIONING_MOD.core.plugins.id.consolidate import ConsolidatePlugin
@@ -28,7 +33,7 @@ def test_rekey(tmp_path: Path) -> None:
     cards_dir = tmp_path / "cards"
     ledger_path = tmp_path / "ledger.jsonl"
     cards_dir.mkdir()
-    ulid = "01HXXXXXXULIDXXREKEYXXXXX"
+    ulid = "01HREKEYXXXXXXXXXXXXXXXXXX"
     create_card(cards_dir / f"{ulid}.yaml", ulid, "OLD")
     plugin = RekeyPlugin(cards_dir=cards_dir, ledger_path=ledger_path)
     plugin.run(ulid=ulid, new_key="NEW")
@@ -41,7 +46,7 @@ def test_deprecate(tmp_path: Path) -> None:
     cards_dir = tmp_path / "cards"
     ledger_path = tmp_path / "ledger.jsonl"
     cards_dir.mkdir()
-    ulid = "01HXXXXXXULIDXXDEPXXXXXX"
+    ulid = "01HDEPXXXXXXXXXXXXXXXXXXXX"
     create_card(cards_dir / f"{ulid}.yaml", ulid, "DOC")
     plugin = DeprecatePlugin(cards_dir=cards_dir, ledger_path=ledger_path)
     plugin.run(ulid=ulid, reason="obsolete")
@@ -53,9 +58,9 @@ def test_consolidate(tmp_path: Path) -> None:
     cards_dir = tmp_path / "cards"
     ledger_path = tmp_path / "ledger.jsonl"
     cards_dir.mkdir()
-    target = "01HXXXXXXULIDXXTARGETXXX"
-    src1 = "01HXXXXXXULIDXXSRC1XXXXX"
-    src2 = "01HXXXXXXULIDXXSRC2XXXXX"
+    target = "01HTARGETXXXXXXXXXXXXXXXXX"
+    src1 = "01HSRC1XXXXXXXXXXXXXXXXXXX"
+    src2 = "01HSRC2XXXXXXXXXXXXXXXXXXX"
     create_card(cards_dir / f"{target}.yaml", target, "TARGET")
     create_card(cards_dir / f"{src1}.yaml", src1, "SRC1")
     create_card(cards_dir / f"{src2}.yaml", src2, "SRC2")
@@ -70,3 +75,52 @@ def test_consolidate(tmp_path: Path) -> None:
     target_data = yaml.safe_load((cards_dir / f"{target}.yaml").read_text())
     assert src1 in target_data["absorbs"]
     assert src2 in target_data["absorbs"]
+
+
+def _valid_cards(cards_dir: Path, *keys: str) -> list:
+    ulids = [f"01HBATCH{i:018d}" for i in range(len(keys))]
+    for ulid, key in zip(ulids, keys):
+        create_card(cards_dir / f"{ulid}.yaml", ulid, key)
+    return ulids
+
+
+def test_batch_coalesces_operations_per_card(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    ledger_path = tmp_path / "ledger.jsonl"
+    cards_dir.mkdir()
+    a, b, c = _valid_cards(cards_dir, "A", "B", "C")
+    plugin = BatchPlugin(cards_dir=cards_dir, ledger_path=ledger_path)
+    changed = plugin.run([
+        Operation("rekey", a, new_key="A2"),
+        Operation("rekey", a, new_key="A3"),
+        Operation("deprecate", a, reason="obsolete"),
+        Operation("consolidate", b, sources=[c]),
+    ])
+    assert [card.ulid for card in changed] == [a, b, c]
+    data = yaml.safe_load((cards_dir / f"{a}.yaml").read_text())
+    assert data["doc_key"] == "A3"
+    assert data["aliases"] == ["A", "A2"]
+    assert data["status"] == "deprecated"
+    assert data["card_version"] == 4
+    assert yaml.safe_load((cards_dir / f"{c}.yaml").read_text())["merged_into"] == b
+    events = [json.loads(line) for line in ledger_path.read_text().splitlines()]
+    assert [e["event_type"] for e in events] == ["REKEY", "REKEY", "DEPRECATE", "CONSOLIDATE"]
+    assert not list(cards_dir.glob("*.tmp"))
+
+
+def test_batch_is_rejected_as_a_whole(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    ledger_path = tmp_path / "ledger.jsonl"
+    cards_dir.mkdir()
+    a, b = _valid_cards(cards_dir, "A", "B")
+    before = {p.name: p.read_text() for p in cards_dir.iterdir()}
+    plugin = BatchPlugin(cards_dir=cards_dir, ledger_path=ledger_path)
+    with pytest.raises(BatchError) as exc:
+        plugin.run([
+            Operation("deprecate", a, reason="obsolete"),
+            Operation("rekey", b, new_key="A"),
+            Operation("rekey", "01HBATCH999999999999999999", new_key="Z"),
+        ])
+    assert len(exc.value.problems) == 2
+    assert {p.name: p.read_text() for p in cards_dir.iterdir()} == before
+    assert not ledger_path.exists()
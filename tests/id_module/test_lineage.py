@@ -0,0 +1,59 @@
+"""
+Tests for the merge-graph lineage index.
+"""
+from pathlib import Path
+
+import pytest
+
+from AUTO_VERSIONING_MOD.core.plugins.id.consolidate import ConsolidatePlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.lineage import (
+    LineageCycleError,
+    LineageIndex,
+    check_merge,
+)
+from AUTO_VERSIONING_MOD.core.plugins.id.registry import RegistryBuildPlugin
+
+
+def test_resolution_and_ancestry_through_registry_build(tmp_path: Path, write_card) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    write_card(cards_dir, "01HMERGE00000000000000000A", "A",
+               merged_into="01HMERGE00000000000000000B")
+    write_card(cards_dir, "01HMERGE00000000000000000B", "B",
+               absorbs=["01HMERGE00000000000000000A"])
+    write_card(cards_dir, "01HMERGE00000000000000000C", "C",
+               absorbs=["01HMERGE00000000000000000B"])
+    write_card(cards_dir, "01HMERGE00000000000000000D", "D", supersedes_version="C")
+    plugin = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml")
+    plugin.run()
+
+    index = LineageIndex.load(plugin.lineage_path)
+    assert index.resolve("01HMERGE00000000000000000A") == "01HMERGE00000000000000000C"
+    assert index.resolve("01HMERGE00000000000000000D") == "01HMERGE00000000000000000D"
+    assert index.chain("01HMERGE00000000000000000A") == [
+        "01HMERGE00000000000000000A", "01HMERGE00000000000000000B",
+        "01HMERGE00000000000000000C",
+    ]
+    assert index.ancestors("01HMERGE00000000000000000D") == [
+        "01HMERGE00000000000000000A", "01HMERGE00000000000000000B",
+        "01HMERGE00000000000000000C",
+    ]
+    assert index.cycles == []
+
+
+def test_cycles_are_reported_and_prevented(tmp_path: Path, write_card) -> None:
+    index = LineageIndex({"X": "Y", "Y": "Z", "Z": "X", "W": "X"})
+    assert len(index.cycles) == 1 and sorted(index.cycles[0]) == ["X", "Y", "Z"]
+    assert index.resolve("W") in {"X", "Y", "Z"}
+    with pytest.raises(LineageCycleError):
+        check_merge({}.get, "A", ["A"])  # a card cannot absorb itself
+
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    write_card(cards_dir, "01HMERGE00000000000000000A", "A")
+    write_card(cards_dir, "01HMERGE00000000000000000B", "B")
+    plugin = ConsolidatePlugin(cards_dir=cards_dir, ledger_path=tmp_path / "ledger.jsonl")
+    plugin.run("01HMERGE00000000000000000B", ["01HMERGE00000000000000000A"])
+    with pytest.raises(LineageCycleError):
+        plugin.run("01HMERGE00000000000000000A", ["01HMERGE00000000000000000B"])
+    assert plugin.store.get("01HMERGE00000000000000000A").card_version == 2
@@ -0,0 +1,104 @@
+"""
+Tests for streaming MFID hashing.
+"""
+from dataclasses import replace
+from pathlib import Path
+
+import blake3
+
+from AUTO_VERSIONING_MOD.core.plugins.id.deprecate import DeprecatePlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.mfid import MFIDPlugin, hash_file
+from AUTO_VERSIONING_MOD.core.plugins.id.mint import MintPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.store import CardStore
+
+
+def test_streaming_matches_whole_file_hash(tmp_path: Path) -> None:
+    path = tmp_path / "doc.bin"
+    data = bytes(range(256)) * 5000
+    path.write_bytes(data)
+    expected = blake3.blake3(data).hexdigest()
+    assert hash_file(path, chunk_size=4096) == expected
+    assert hash_file(path, threaded_threshold=1) == expected
+
+
+def test_newline_normalisation_across_chunk_boundaries(tmp_path: Path) -> None:
+    text = b"line one\r\nline two\rline three\n" * 300 + b"end\r"
+    unix = text.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    (tmp_path / "dos.txt").write_bytes(text)
+    (tmp_path / "unix.txt").write_bytes(unix)
+    expected = blake3.blake3(unix).hexdigest()
+    dos = tmp_path / "dos.txt"
+    for chunk in (1, 7, 10, 4096):
+        assert hash_file(dos, normalize_newlines=True, chunk_size=chunk) == expected
+    assert hash_file(dos, normalize_newlines=True, threaded_threshold=1) == expected
+    assert hash_file(tmp_path / "unix.txt", normalize_newlines=True) == expected
+
+
+def _doc(path: Path, ulid: str, body: str) -> None:
+    path.write_text(f"---\nulid: {ulid}\ntitle: Doc\n---\n{body}\n", encoding="utf-8")
+
+
+def test_refresh_updates_only_changed_documents(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "ids" / "cards"
+    ledger_path = tmp_path / "ids.jsonl"
+    cards = MintPlugin(cards_dir, ledger_path, index_path=tmp_path / "none.idx").mint_many([
+        {"doc_key": f"DOC-{i}", "semver": "1.0.0", "owner": "ops", "contract_type": "policy"}
+        for i in range(3)
+    ])
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    _doc(docs / "a.md", cards[0].ulid, "alpha")
+    _doc(docs / "sub" / "b.md", cards[1].ulid, "beta")
+    (docs / "orphan.md").write_text("no front matter\n", encoding="utf-8")
+    plugin = MFIDPlugin(cards_dir, ledger_path)
+
+    first = plugin.refresh(docs, workers=2)
+    assert first == {"scanned": 3, "hashed": 3, "checked": 2, "updated": 2, "unlinked": 1}
+    assert plugin.store.get(cards[0].ulid).mfid == hash_file(docs / "a.md")
+
+    # Unchanged documents whose cards are in sync are not even looked up.
+    assert plugin.refresh(docs) == {
+        "scanned": 3, "hashed": 0, "checked": 0, "updated": 0, "unlinked": 1,
+    }
+
+    _doc(docs / "sub" / "b.md", cards[1].ulid, "beta, revised")
+    events_before = len(ledger_path.read_text().splitlines())
+    assert plugin.refresh(docs)["updated"] == 1
+    card = plugin.store.get(cards[1].ulid)
+    assert card.mfid == hash_file(docs / "sub" / "b.md")
+    assert card.card_version == 3
+    assert plugin.store.get(cards[0].ulid).card_version == 2
+    new_events = ledger_path.read_text().splitlines()[events_before:]
+    assert len(new_events) == 1 and cards[1].ulid in new_events[0]
+
+    # A card whose MFID changed behind the cache's back is checked and repaired.
+    stale = replace(plugin.store.get(cards[0].ulid), mfid="0" * 64)
+    CardStore(cards_dir).put(stale)
+    assert plugin.refresh(docs) == {
+        "scanned": 3, "hashed": 0, "checked": 1, "updated": 1, "unlinked": 1,
+    }
+    assert plugin.store.get(cards[0].ulid).mfid == hash_file(docs / "a.md")
+
+
+def test_run_does_not_overwrite_a_concurrent_change(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    ledger_path = tmp_path / "ids.jsonl"
+    card = MintPlugin(cards_dir, ledger_path, index_path=tmp_path / "none.idx").mint_many([
+        {"doc_key": "DOC", "semver": "1.0.0", "owner": "ops", "contract_type": "policy"}
+    ])[0]
+
+    class RacingStore(CardStore):
+        raced = False
+
+        def get(self, ulid: str):
+            got = super().get(ulid)
+            if not self.raced:  # another writer deprecates right after our read
+                self.raced = True
+                DeprecatePlugin(cards_dir, ledger_path, store=CardStore(cards_dir)).run(ulid, "x")
+            return got
+
+    (tmp_path / "a.md").write_text("alpha\n", encoding="utf-8")
+    plugin = MFIDPlugin(cards_dir, ledger_path, store=RacingStore(cards_dir))
+    digest = plugin.run(card.ulid, tmp_path / "a.md")
+    final = CardStore(cards_dir).get(card.ulid)
+    assert (final.status, final.mfid, final.card_version) == ("deprecated", digest, 3)
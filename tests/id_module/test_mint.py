@@ -5,7 +5,18 @@ These tests exercise the ability of MintPlugin to generate new
 ULIDs and construct IDCard instances. The ULID pattern is not
 strictly enforced here but should produce a 26-character string.
 """
-from AUTO_VERSIONING_MOD.core.plugins.id.mint import MintPlugin
+from pathlib import Path
+
+import pytest
+
+from AUTO_VERSIONING_MOD.core.plugins.id.mint import (
+    DocKeyCollisionError,
+    MintPlugin,
+    MonotonicULID,
+)
+from AUTO_VERSIONING_MOD.core.plugins.id.pack import write_pack
+from AUTO_VERSIONING_MOD.core.plugins.id.registry import RegistryBuildPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.store import CardStore
 
 
 def test_mint_returns_idcard() -> None:
@@ -14,3 +25,89 @@ def test_mint_returns_idcard() -> None:
     assert card.doc_key == "TEST_DOC"
     assert len(card.ulid) == 26
     assert card.status == "active"
+
+
+def test_monotonic_ulids_within_one_millisecond() -> None:
+    gen = MonotonicULID(clock=lambda: 1_700_000_000_000_000_000)
+    ulids = [gen() for _ in range(1000)]
+    assert ulids == sorted(ulids) and len(set(ulids)) == 1000
+    assert all(len(u) == 26 and u[:10] == ulids[0][:10] for u in ulids)
+
+
+def specs(prefix: str, count: int) -> list:
+    return [
+        {"doc_key": f"{prefix}_{i}", "semver": "1.0.0", "owner": "QA",
+         "contract_type": "policy"}
+        for i in range(count)
+    ]
+
+
+def test_mint_many_persists_cards_and_events(tmp_path: Path) -> None:
+    plugin = MintPlugin(cards_dir=tmp_path / "cards", ledger_path=tmp_path / "ids.jsonl",
+                        store=CardStore(tmp_path / "cards"),
+                        index_path=tmp_path / "registry.idx")
+    cards = plugin.mint_many(specs("BULK", 50))
+    assert [c.ulid for c in cards] == sorted(c.ulid for c in cards)
+    assert len(list((tmp_path / "cards").glob("*.yaml"))) == 50
+    events = (tmp_path / "ids.jsonl").read_text().splitlines()
+    assert len(events) == 50 and all('"CREATE"' in e for e in events)
+
+
+def test_mint_many_rejects_collisions(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    plugin = MintPlugin(cards_dir=cards_dir, ledger_path=tmp_path / "ids.jsonl",
+                        store=CardStore(cards_dir), index_path=tmp_path / "registry.idx")
+    plugin.mint_many(specs("OLD", 3))
+    RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml",
+                        store=CardStore(cards_dir)).run()
+    plugin.mint_many(specs("NEW", 2))  # newer than the index
+    for batch in (specs("OLD", 1), specs("NEW", 1), specs("DUP", 1) * 2):
+        with pytest.raises(DocKeyCollisionError):
+            plugin.mint_many(batch)
+    assert len(list(cards_dir.glob("*.yaml"))) == 5
+
+
+def test_mint_many_sees_cards_kept_only_in_the_pack(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    store = CardStore(cards_dir)
+    plugin = MintPlugin(cards_dir=cards_dir, ledger_path=tmp_path / "ids.jsonl",
+                        store=store, index_path=tmp_path / "registry.idx")
+    plugin.mint_many(specs("DUP", 1))
+    write_pack(store, prune=True)
+    assert not list(cards_dir.glob("*.yaml"))
+    with pytest.raises(DocKeyCollisionError):
+        plugin.mint_many(specs("DUP", 1))
+
+
+def test_concurrent_minters_cannot_claim_the_same_key(tmp_path: Path) -> None:
+    import threading
+
+    cards_dir = tmp_path / "cards"
+    outcomes: list = []
+
+    def mint(n: int) -> None:
+        # A store per thread, as separate processes would have.
+        plugin = MintPlugin(cards_dir=cards_dir, ledger_path=tmp_path / "ids.jsonl",
+                            store=CardStore(cards_dir), index_path=tmp_path / "registry.idx")
+        try:
+            plugin.mint_many(specs(f"OWN{n}", 2) + specs("RACE", 1))
+            outcomes.append("minted")
+        except DocKeyCollisionError:
+            outcomes.append("rejected")
+
+    threads = [threading.Thread(target=mint, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes) == ["minted", "rejected", "rejected", "rejected"]
+    assert len(list(cards_dir.glob("*.yaml"))) == 3
+
+
+def test_specs_cannot_set_reserved_fields(tmp_path: Path) -> None:
+    plugin = MintPlugin(cards_dir=tmp_path / "cards", ledger_path=tmp_path / "ids.jsonl",
+                        store=CardStore(tmp_path / "cards"), index_path=tmp_path / "registry.idx")
+    for field in ("ulid", "card_version", "status"):
+        with pytest.raises(ValueError, match=field):
+            plugin.mint_many([{**specs("RESERVED", 1)[0], field: "x"}])
+    assert not (tmp_path / "cards").exists() or not list((tmp_path / "cards").glob("*.yaml"))
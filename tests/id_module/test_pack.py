@@ -0,0 +1,99 @@
+"""
+Tests for the packed card archive and ID state snapshots.
+"""
+from pathlib import Path
+import os
+
+import pytest
+
+from AUTO_VERSIONING_MOD.core.plugins.id.pack import (
+    CardPack,
+    create_snapshot,
+    restore_snapshot,
+    write_pack,
+)
+from AUTO_VERSIONING_MOD.core.plugins.id.registry import RegistryBuildPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.store import CardStore
+
+
+@pytest.fixture
+def card(make_card):
+    """``card(i)`` is the numbered pack test card ``DOC<i>``."""
+    return lambda i, **fields: make_card(f"01HPACKXXXXXXXXXXXXXXXXX{i:02d}", f"DOC{i}", **fields)
+
+
+def test_pack_is_incremental_and_loose_cards_override(tmp_path: Path, card) -> None:
+    cards_dir = tmp_path / "cards"
+    store = CardStore(cards_dir)
+    store.put_many([card(i) for i in range(5)])
+    assert write_pack(store)["parsed"] == 5
+
+    store.put(card(1, owner="Ops", card_version=2))
+    os.unlink(cards_dir / f"{card(4).ulid}.yaml")
+    stats = write_pack(store, prune=True)
+    assert (stats["reused"], stats["parsed"], stats["dropped"], stats["pruned"]) == (3, 1, 1, 4)
+    assert not list(cards_dir.glob("*.yaml"))
+    assert len(CardPack.open(cards_dir)) == 4
+
+    cold = CardStore(cards_dir)
+    assert cold.get(card(1).ulid).owner == "Ops"
+    assert not cold.exists(card(4).ulid)
+    # A loose write overrides the packed record.
+    cold.put(card(2, status="deprecated", card_version=2), expected_version=1)
+    assert CardStore(cards_dir).get(card(2).ulid).status == "deprecated"
+    assert sorted(c.doc_key for c in CardStore(cards_dir).cards()) == [f"DOC{i}" for i in range(4)]
+    assert write_pack(CardStore(cards_dir)) == {
+        "packed": 4, "reused": 3, "parsed": 1, "dropped": 0, "pruned": 0,
+    }
+
+
+def test_snapshot_restores_a_cold_tree(tmp_path: Path, card) -> None:
+    root = tmp_path / "src"
+    cards_dir = root / "ids" / "cards"
+    CardStore(cards_dir).put_many([card(i) for i in range(3)])
+    (root / ".ledger").mkdir(parents=True)
+    (root / ".ledger" / "ids.jsonl").write_text('{"event_type": "CREATE"}\n')
+    archive = tmp_path / "state.tar.gz"
+    assert create_snapshot(archive, root=root)["packed"] == 3
+
+    restored = tmp_path / "restored"
+    restore_snapshot(archive, root=restored)
+    new_cards = restored / "ids" / "cards"
+    assert not list(new_cards.glob("*.yaml"))
+    assert (restored / ".ledger" / "ids.jsonl").read_text() == '{"event_type": "CREATE"}\n'
+    registry = RegistryBuildPlugin(cards_dir=new_cards,
+                                   registry_path=restored / "ids" / "registry.yaml",
+                                   store=CardStore(new_cards)).run()
+    assert registry.lookup_ulid("DOC2") == card(2).ulid
+
+
+def test_restored_snapshot_survives_repack_and_resnapshot(tmp_path: Path, card) -> None:
+    root = tmp_path / "src"
+    CardStore(root / "ids" / "cards").put_many([card(i) for i in range(3)])
+    create_snapshot(tmp_path / "a.tar.gz", root=root)
+    first = tmp_path / "first"
+    restore_snapshot(tmp_path / "a.tar.gz", root=first)
+    cards_dir = first / "ids" / "cards"
+    assert write_pack(CardStore(cards_dir)) == {
+        "packed": 3, "reused": 3, "parsed": 0, "dropped": 0, "pruned": 0,
+    }
+    assert create_snapshot(tmp_path / "b.tar.gz", root=first)["packed"] == 3
+    second = tmp_path / "second"
+    restore_snapshot(tmp_path / "b.tar.gz", root=second)
+    store = CardStore(second / "ids" / "cards")
+    assert sorted(c.doc_key for c in store.cards()) == ["DOC0", "DOC1", "DOC2"]
+
+
+def test_deleted_loose_card_is_not_served_from_the_pack(tmp_path: Path, card) -> None:
+    cards_dir = tmp_path / "cards"
+    store = CardStore(cards_dir)
+    store.put_many([card(i) for i in range(2)])
+    write_pack(store)
+    os.unlink(cards_dir / f"{card(0).ulid}.yaml")
+    cold = CardStore(cards_dir)
+    assert not cold.exists(card(0).ulid)
+    assert [c.doc_key for c in cold.cards()] == ["DOC1"]
+    registry = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml",
+                                   store=cold).run()
+    assert registry.lookup_ulid("DOC0") is None
+    assert write_pack(cold)["dropped"] == 1
@@ -1,10 +1,17 @@
 """
 Tests for the RegistryBuildPlugin.
 """
+import json
+import os
 from pathlib import Path
+import pytest
 import yaml
 
-from AUTO_VERSIONING_MOD.core.plugins.id.registry import RegistryBuildPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.registry import (
+    MANIFEST_VERSION,
+    RegistryBuildPlugin,
+    RegistryConflictError,
+)
 from AUTO_VERSIONING_MOD.core.models.registry import Registry
 
 
@@ -38,3 +45,172 @@ def test_registry_build(tmp_path: Path) -> None:
     registry = plugin.run()
     assert registry.lookup_ulid("DOC1") == card1["ulid"]
     assert registry.lookup_key(card2["ulid"]) == "DOC2"
+
+
+def test_incremental_build_reparses_only_changes(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+
+    def write(ulid: str, doc_key: str) -> None:
+        card = {
+            "doc_key": doc_key,
+            "ulid": ulid,
+            "semver": "1.0.0",
+            "status": "active",
+            "effective_date": "2025-01-01",
+            "owner": "QA",
+            "contract_type": "policy",
+            "card_version": 1,
+        }
+        with (cards_dir / f"{ulid}.yaml").open("w") as fh:
+            yaml.safe_dump(card, fh)
+
+    write("01HINCXXXXXXXXXXXXXXXXXXX1", "DOC1")
+    write("01HINCXXXXXXXXXXXXXXXXXXX2", "DOC2")
+    registry_path = tmp_path / "registry.yaml"
+    plugin = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=registry_path)
+    plugin.run()
+    assert plugin.stats == {"parsed": 2, "removed": 0, "written": 1}
+    # Unchanged runs take the previous entries from the manifest, not registry.yaml.
+    registry_path.write_text("{not yaml")
+    mtime = registry_path.stat().st_mtime_ns
+    registry = plugin.run()
+    assert plugin.stats == {"parsed": 0, "removed": 0, "written": 0}
+    assert registry_path.stat().st_mtime_ns == mtime
+    assert registry.lookup_ulid("DOC2") == "01HINCXXXXXXXXXXXXXXXXXXX2"
+    write("01HINCXXXXXXXXXXXXXXXXXXX2", "DOC2_RENAMED")
+    (cards_dir / "01HINCXXXXXXXXXXXXXXXXXXX1.yaml").unlink()
+    registry = plugin.run()
+    assert plugin.stats == {"parsed": 1, "removed": 1, "written": 1}
+    assert registry.lookup_ulid("DOC2_RENAMED") == "01HINCXXXXXXXXXXXXXXXXXXX2"
+    assert registry.lookup_ulid("DOC1") is None
+    assert set(yaml.safe_load(registry_path.read_text())) == {"01HINCXXXXXXXXXXXXXXXXXXX2"}
+
+
+def test_touched_cards_only_refresh_their_stamp(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    card = cards_dir / "01HTCHXXXXXXXXXXXXXXXXXXX1.yaml"
+    card.write_text(yaml.safe_dump({"doc_key": "DOC1", "ulid": "01HTCHXXXXXXXXXXXXXXXXXXX1"}))
+    plugin = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml")
+    plugin.run()
+    st = card.stat()
+    os.utime(card, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    plugin.run()
+    assert plugin.stats == {"parsed": 0, "removed": 0, "written": 0}
+    files = json.loads(plugin.manifest_path.read_text())["files"]
+    assert files[card.name][1] == card.stat().st_mtime_ns
+
+
+def test_unreadable_manifest_falls_back_to_full_build(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    card = cards_dir / "01HMANXXXXXXXXXXXXXXXXXXX1.yaml"
+    card.write_text(yaml.safe_dump({"doc_key": "DOC1", "ulid": "01HMANXXXXXXXXXXXXXXXXXXX1"}))
+    plugin = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml")
+    plugin.run()
+    version = MANIFEST_VERSION
+    for broken in (f'{{"version": {version}, "fi', "[]", f'{{"version": {version}}}'):
+        plugin.manifest_path.write_text(broken)
+        registry = plugin.run()
+        assert plugin.stats["parsed"] == 1
+        assert registry.lookup_ulid("DOC1") == "01HMANXXXXXXXXXXXXXXXXXXX1"
+
+
+def test_parallel_build_matches_serial_and_reports_conflicts(tmp_path: Path) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    for i in range(12):
+        ulid = f"01HPARXXXXXXXXXXXXXXXXXX{i:02d}"
+        card = {
+            "doc_key": f"DOC{i}",
+            "ulid": ulid,
+            "semver": "1.0.0",
+            "status": "active",
+            "effective_date": "2025-01-01",
+            "owner": "QA",
+            "contract_type": "policy",
+            "card_version": 1,
+            "aliases": ["DOC0"] if i == 5 else [],
+        }
+        with (cards_dir / f"{ulid}.yaml").open("w") as fh:
+            yaml.safe_dump(card, fh)
+    serial = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "serial.yaml")
+    parallel = RegistryBuildPlugin(
+        cards_dir=cards_dir, registry_path=tmp_path / "parallel.yaml", workers=2
+    )
+    assert parallel.run().by_ulid == serial.run().by_ulid
+    assert (tmp_path / "parallel.yaml").read_text() == (tmp_path / "serial.yaml").read_text()
+    assert parallel.conflicts == [
+        ("DOC0", ["01HPARXXXXXXXXXXXXXXXXXX00", "01HPARXXXXXXXXXXXXXXXXXX05"])
+    ]
+    strict = RegistryBuildPlugin(
+        cards_dir=cards_dir, registry_path=tmp_path / "strict.yaml", strict=True
+    )
+    with pytest.raises(RegistryConflictError):
+        strict.run()
+
+
+def test_build_writes_binary_index(tmp_path: Path) -> None:
+    from AUTO_VERSIONING_MOD.core.plugins.id.registry_index import RegistryIndex
+
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    card = {
+        "doc_key": "DOC1",
+        "ulid": "01HIDXBUILDXXXXXXXXXXXXXX1",
+        "semver": "1.0.0",
+        "status": "active",
+        "effective_date": "2025-01-01",
+        "owner": "QA",
+        "contract_type": "policy",
+        "card_version": 1,
+        "aliases": ["OLD1"],
+    }
+    with (cards_dir / f"{card['ulid']}.yaml").open("w") as fh:
+        yaml.safe_dump(card, fh)
+    RegistryBuildPlugin(cards_dir=cards_dir, registry_path=tmp_path / "registry.yaml").run()
+    with RegistryIndex(tmp_path / "registry.idx") as index:
+        assert index.lookup_ulid("OLD1") == card["ulid"]
+        assert index.lookup_key(card["ulid"]) == "DOC1"
+
+
+def test_field_indexes_persist_with_registry(tmp_path: Path) -> None:
+    from AUTO_VERSIONING_MOD.core.plugins.id.registry import load_registry
+
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    rows = [
+        ("01HQRYXXXXXXXXXXXXXXXXXXX1", "active", "Platform.Engineering", "policy"),
+        ("01HQRYXXXXXXXXXXXXXXXXXXX2", "active", "QA", "policy"),
+        ("01HQRYXXXXXXXXXXXXXXXXXXX3", "deprecated", "Platform.Engineering", "policy"),
+        ("01HQRYXXXXXXXXXXXXXXXXXXX4", "active", "Platform.Engineering", "intent"),
+    ]
+    for ulid, status, owner, contract_type in rows:
+        card = {
+            "doc_key": f"DOC_{ulid[-1]}",
+            "ulid": ulid,
+            "semver": "1.0.0",
+            "status": status,
+            "effective_date": "2025-01-01",
+            "owner": owner,
+            "contract_type": contract_type,
+            "card_version": 1,
+        }
+        with (cards_dir / f"{ulid}.yaml").open("w") as fh:
+            yaml.safe_dump(card, fh)
+    registry_path = tmp_path / "registry.yaml"
+    built = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=registry_path).run()
+    expected = ["01HQRYXXXXXXXXXXXXXXXXXXX1"]
+    assert built.query(status="active", owner="Platform.Engineering",
+                       contract_type="policy") == expected
+    loaded = load_registry(registry_path)
+    assert loaded.query(status="active", owner="Platform.Engineering",
+                        contract_type="policy") == expected
+    assert loaded.query(status="deprecated") == ["01HQRYXXXXXXXXXXXXXXXXXXX3"]
+    compact = load_registry(registry_path, compact=True)
+    assert compact.query(owner="Platform.Engineering", contract_type="intent") == [
+        "01HQRYXXXXXXXXXXXXXXXXXXX4"
+    ]
+    with pytest.raises(ValueError):
+        loaded.query(semver="1.0.0")
@@ -0,0 +1,31 @@
+"""
+Tests for the memory-mapped binary registry index.
+"""
+from pathlib import Path
+
+from AUTO_VERSIONING_MOD.core.models.registry import Registry
+from AUTO_VERSIONING_MOD.core.plugins.id.registry_index import RegistryIndex, write_index
+
+
+def test_index_matches_registry_lookups(tmp_path: Path) -> None:
+    reg = Registry()
+    for i in range(200):
+        reg.add_entry(f"01HIDX{i:020d}", f"DOC_{i}", aliases=[f"OLD_{i}", f"ÄLT_{i}"])
+    path = tmp_path / "registry.idx"
+    write_index(reg, path)
+    with RegistryIndex(path) as index:
+        assert len(index) == 200
+        for key, ulid in reg.by_key.items():
+            assert index.lookup_ulid(key) == ulid
+        for ulid, key in reg.by_ulid.items():
+            assert index.lookup_key(ulid) == key
+        assert index.lookup_ulid("MISSING") is None
+        assert index.lookup_key("01HIDXMISSING") is None
+
+
+def test_empty_registry_index(tmp_path: Path) -> None:
+    path = tmp_path / "registry.idx"
+    write_index(Registry(), path)
+    with RegistryIndex(path) as index:
+        assert len(index) == 0
+        assert index.lookup_ulid("DOC") is None
@@ -0,0 +1,83 @@
+"""
+Tests for ledger replay and snapshots.
+"""
+from pathlib import Path
+
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger import LedgerPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.ledger_segments import SegmentedLedger
+from AUTO_VERSIONING_MOD.core.plugins.id.replay import ReplayEngine
+from AUTO_VERSIONING_MOD.core.models.id_card import IDCard
+from AUTO_VERSIONING_MOD.core.models.ledger_event import LedgerEvent
+
+A = "01HREPXXXXXXXXXXXXXXXXXXXA"
+B = "01HREPXXXXXXXXXXXXXXXXXXXB"
+
+
+def ts(n: int) -> str:
+    return f"2025-11-03T00:{n // 60:02d}:{n % 60:02d}Z"
+
+
+def create(ulid: str, doc_key: str, n: int) -> LedgerEvent:
+    card = IDCard(
+        doc_key=doc_key, ulid=ulid, semver="1.0.0", status="active",
+        effective_date="2025-11-03", owner="Platform.Engineering",
+        contract_type="policy", card_version=1,
+    )
+    return LedgerEvent("CREATE", ts(n), ulid, doc_key, card.to_dict())
+
+
+def history() -> list[LedgerEvent]:
+    return [
+        create(A, "DOC_A", 0),
+        create(B, "DOC_B", 1),
+        LedgerEvent("REKEY", ts(2), A, "DOC_A2", {"old_key": "DOC_A", "new_key": "DOC_A2"}),
+        LedgerEvent("MFID_UPDATE", ts(3), A, "DOC_A2", {"mfid": "abc"}),
+        LedgerEvent("CONSOLIDATE", ts(4), A, "DOC_A2", {"sources": [B]}),
+        LedgerEvent("DEPRECATE", ts(5), B, "DOC_B", {"reason": "merged"}),
+    ]
+
+
+def write(path: Path, events: list[LedgerEvent]) -> None:
+    plugin = LedgerPlugin(path)
+    for event in events:
+        plugin.run(event)
+
+
+def test_rebuild_folds_lifecycle_events(tmp_path: Path) -> None:
+    ledger = tmp_path / "ids.jsonl"
+    write(ledger, history())
+    cards = ReplayEngine(ledger, tmp_path / "snaps").rebuild(snapshot=False)
+    a, b = cards[A], cards[B]
+    assert (a.doc_key, a.aliases, a.mfid, a.absorbs, a.card_version) == (
+        "DOC_A2", ["DOC_A"], "abc", [B], 4
+    )
+    assert (b.merged_into, b.status, b.card_version) == (A, "deprecated", 3)
+
+
+def test_rebuild_resumes_from_snapshot(tmp_path: Path) -> None:
+    ledger = tmp_path / "ids.jsonl"
+    events = history()
+    write(ledger, events[:3])
+    engine = ReplayEngine(ledger, tmp_path / "snaps", snapshot_every=2)
+    engine.rebuild()
+    assert [s["events"] for s in engine.snapshots()] == [2, 3]
+    write(ledger, events[3:])
+    engine = ReplayEngine(ledger, tmp_path / "snaps")
+    cards = engine.rebuild()
+    assert engine.stats["replayed"] == 3
+    assert cards == ReplayEngine(ledger, tmp_path / "other").rebuild(full=True)
+
+
+def test_card_at_time(tmp_path: Path) -> None:
+    ledger = tmp_path / "ids"
+    SegmentedLedger(ledger, max_bytes=600).append_many(history())
+    engine = ReplayEngine(ledger, tmp_path / "snaps", snapshot_every=2)
+    engine.rebuild()
+    assert engine.card_at(A, ts(0)).doc_key == "DOC_A"
+    assert engine.card_at(A, ts(2)).aliases == ["DOC_A"]
+    b = engine.card_at(B, ts(4))
+    assert (b.merged_into, b.status) == (A, "active")
+    assert engine.card_at(B, ts(0)) is None
+    SegmentedLedger(ledger).compress_sealed("lzma")
+    assert engine.card_at(A, ts(3)).mfid == "abc"
+    assert engine.rebuild(full=True, snapshot=False)[B].status == "deprecated"
@@ -0,0 +1,33 @@
+"""
+Tests for the prefix/fuzzy SearchIndex.
+"""
+from pathlib import Path
+
+from AUTO_VERSIONING_MOD.core.models.registry import Registry
+from AUTO_VERSIONING_MOD.core.plugins.id.search import SearchIndex, edit_distance
+
+
+def build_index() -> SearchIndex:
+    reg = Registry()
+    reg.add_entry("01HSEARCHXXXXXXXXXXXXXXXX1", "OC_CORE", aliases=["OC_CORE_V1"])
+    reg.add_entry("01HSEARCHXXXXXXXXXXXXXXXX2", "OC_COMPLIANCE")
+    reg.add_entry("01HSEARCHXXXXXXXXXXXXXXXX3", "R_PIPELINE_GUIDE")
+    return SearchIndex.from_registry(reg)
+
+
+def test_prefix_is_sorted_and_case_insensitive() -> None:
+    index = build_index()
+    assert [k for k, _ in index.prefix("oc_co")] == ["OC_COMPLIANCE", "OC_CORE", "OC_CORE_V1"]
+    assert index.prefix("OC_CO", limit=1) == [("OC_COMPLIANCE", "01HSEARCHXXXXXXXXXXXXXXXX2")]
+    assert index.prefix("ZZZ") == []
+
+
+def test_fuzzy_ranks_by_edit_distance(tmp_path: Path) -> None:
+    path = tmp_path / "registry.search.tsv"
+    build_index().save(path)
+    index = SearchIndex.load(path)
+    assert len(index) == 4
+    assert index.fuzzy("OC_COER")[0] == ("OC_CORE", "01HSEARCHXXXXXXXXXXXXXXXX1")
+    assert index.fuzzy("R_PIPLINE_GUIDE") == [("R_PIPELINE_GUIDE", "01HSEARCHXXXXXXXXXXXXXXXX3")]
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("kitten", "sitting", limit=1) == 2
@@ -0,0 +1,40 @@
+"""
+Tests for the SQLite card backend.
+"""
+from pathlib import Path
+
+import yaml
+
+from AUTO_VERSIONING_MOD.core.plugins.id.sqlite_store import SQLiteCardStore
+from AUTO_VERSIONING_MOD.core.plugins.id.deprecate import DeprecatePlugin
+
+
+def test_sync_from_yaml_and_query(tmp_path: Path, write_card) -> None:
+    cards_dir = tmp_path / "cards"
+    cards_dir.mkdir()
+    write_card(cards_dir, "01HSQXXXXXXXXXXXXXXXXXXXX1", "DOC1", aliases=["OLD1"])
+    write_card(cards_dir, "01HSQXXXXXXXXXXXXXXXXXXXX2", "DOC2", owner="Platform",
+               status="deprecated")
+    db = SQLiteCardStore(tmp_path / "ids.db", cards_dir)
+    assert db.sync_from_yaml() == {"imported": 2, "removed": 0}
+    assert db.sync_from_yaml() == {"imported": 0, "removed": 0}
+    assert db.find_by_alias("OLD1").doc_key == "DOC1"
+    assert [c.doc_key for c in db.query(status="deprecated", owner="Platform")] == ["DOC2"]
+    assert db.registry().lookup_ulid("OLD1") == "01HSQXXXXXXXXXXXXXXXXXXXX1"
+    (cards_dir / "01HSQXXXXXXXXXXXXXXXXXXXX2.yaml").unlink()
+    assert db.sync_from_yaml() == {"imported": 0, "removed": 1}
+
+
+def test_plugins_write_through_to_yaml(tmp_path: Path, make_card) -> None:
+    cards_dir = tmp_path / "cards"
+    db = SQLiteCardStore(tmp_path / "ids.db", cards_dir)
+    ulid = "01HSQXXXXXXXXXXXXXXXXXXXX3"
+    db.put(make_card(ulid, "DOC3"), write_yaml=False)
+    assert not (cards_dir / f"{ulid}.yaml").exists()
+    assert db.sync_to_yaml() == 1
+    DeprecatePlugin(cards_dir, tmp_path / "ledger.jsonl", store=db).run(ulid, "obsolete")
+    data = yaml.safe_load((cards_dir / f"{ulid}.yaml").read_text())
+    assert data["status"] == "deprecated"
+    assert db.sync_from_yaml()["imported"] == 0
+    db.set_ledger_offset(tmp_path / "ledger.jsonl", 42)
+    assert db.get_ledger_offset(tmp_path / "ledger.jsonl") == 42
@@ -0,0 +1,141 @@
+"""
+Tests for the CardStore cache and indexes.
+"""
+from dataclasses import replace
+from pathlib import Path
+import os
+import threading
+
+import pytest
+
+from AUTO_VERSIONING_MOD.core.plugins.id.registry import RegistryBuildPlugin
+from AUTO_VERSIONING_MOD.core.plugins.id.store import CardConflictError, CardStore
+
+
+def test_indexes_follow_writes(tmp_path: Path, make_card) -> None:
+    store = CardStore(tmp_path)
+    store.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX1", "DOC1", aliases=["OLD1"]))
+    store.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX2", "DOC2", owner="Platform"))
+    assert store.find_by_doc_key("DOC1").ulid == "01HSTOREXXXXXXXXXXXXXXXXX1"
+    assert store.find_by_alias("OLD1").doc_key == "DOC1"
+    assert [c.doc_key for c in store.find_by_owner("Platform")] == ["DOC2"]
+    store.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX1", "DOC1", status="deprecated"))
+    assert store.find_by_alias("OLD1") is None
+    assert [c.doc_key for c in store.find_by_status("deprecated")] == ["DOC1"]
+
+
+def test_lookups_recheck_only_the_cards_they_return(tmp_path: Path, make_card) -> None:
+    store = CardStore(tmp_path)
+    store.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX7", "DOC7"))
+    other = CardStore(tmp_path)
+    other.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX8", "DOC8"))
+    assert store.find_by_doc_key("DOC8") is None  # not seen yet
+    store.refresh()
+    assert store.find_by_doc_key("DOC8").ulid == "01HSTOREXXXXXXXXXXXXXXXXX8"
+    other.put(make_card("01HSTOREXXXXXXXXXXXXXXXXX7", "DOC7_NEW", card_version=2))
+    store.path_for("01HSTOREXXXXXXXXXXXXXXXXX8").unlink()
+    assert store.find_by_doc_key("DOC7") is None
+    assert store.find_by_doc_key("DOC7_NEW").card_version == 2
+    assert store.find_by_doc_key("DOC8") is None
+
+
+def test_external_change_invalidates_cache(tmp_path: Path, make_card) -> None:
+    store = CardStore(tmp_path)
+    ulid = "01HSTOREXXXXXXXXXXXXXXXXX3"
+    store.put(make_card(ulid, "DOC3"))
+    assert store.get(ulid).doc_key == "DOC3"
+    other = CardStore(tmp_path)
+    other.put(make_card(ulid, "DOC3_RENAMED"))
+    st = store.path_for(ulid).stat()
+    os.utime(store.path_for(ulid), ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert store.get(ulid).doc_key == "DOC3_RENAMED"
+    store.path_for(ulid).unlink()
+    assert list(store.cards()) == []
+
+
+def test_compare_and_swap_rejects_stale_writes(tmp_path: Path, make_card) -> None:
+    ulid = "01HSTOREXXXXXXXXXXXXXXXXX5"
+    first, second = CardStore(tmp_path), CardStore(tmp_path)
+    first.put(make_card(ulid, "DOC5"))
+    stale = second.get(ulid)
+    first.put(replace(first.get(ulid), card_version=2, owner="Ops"), expected_version=1)
+    with pytest.raises(CardConflictError) as exc:
+        second.put(replace(stale, card_version=2, status="deprecated"), expected_version=1)
+    assert (exc.value.expected, exc.value.actual) == (1, 2)
+    assert second.get(ulid).owner == "Ops"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_parallel_commutative_updates_are_not_lost(tmp_path: Path, make_card) -> None:
+    ulid = "01HSTOREXXXXXXXXXXXXXXXXX6"
+    CardStore(tmp_path).put(make_card(ulid, "DOC6"))
+
+    def absorb(n: int) -> None:
+        store = CardStore(tmp_path)
+        for i in range(10):
+            store.update(
+                ulid,
+                lambda c: replace(c, card_version=c.card_version + 1,
+                                  absorbs=c.absorbs + [f"{n}-{i}"]),
+                retries=1000,
+            )
+
+    threads = [threading.Thread(target=absorb, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    card = CardStore(tmp_path).get(ulid)
+    assert card.card_version == 41
+    assert sorted(card.absorbs) == sorted(f"{n}-{i}" for n in range(4) for i in range(10))
+
+
+def test_shared_store_indexes_stay_consistent_across_threads(tmp_path: Path, make_card) -> None:
+    store = CardStore.for_dir(tmp_path)
+    assert CardStore.for_dir(tmp_path) is store
+
+    def rekey(n: int) -> None:
+        ulid = f"01HTHREADXXXXXXXXXXXXXXX{n:02d}"
+        for i in range(20):
+            store.put(make_card(ulid, f"DOC{n}_{i}", aliases=[f"DOC{n}_{j}" for j in range(i)],
+                                card_version=i + 1))
+            assert store.find_by_doc_key(f"DOC{n}_{i}").ulid == ulid
+
+    threads = [threading.Thread(target=rekey, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for n in range(8):
+        assert store.find_by_doc_key(f"DOC{n}_19").card_version == 20
+        assert store.find_by_alias(f"DOC{n}_0").doc_key == f"DOC{n}_19"
+    assert len(store.find_by_status("active")) == 8
+
+
+def test_sharded_layout_migration_is_transparent(tmp_path: Path, make_card) -> None:
+    cards_dir = tmp_path / "cards"
+    ulids = [f"01HSHARDXXXXXXXXXXXXXXXX{i:02d}" for i in range(12)]
+    flat = CardStore(cards_dir)
+    for i, ulid in enumerate(ulids):
+        flat.put(make_card(ulid, f"DOC{i}"))
+    registry_path = tmp_path / "registry.yaml"
+    RegistryBuildPlugin(cards_dir=cards_dir, registry_path=registry_path, store=flat).run()
+
+    store = CardStore(cards_dir)
+    assert store.migrate("sharded") == 12
+    assert not list(cards_dir.glob("*.yaml"))
+    assert (cards_dir / "05" / f"{ulids[5]}.yaml").exists()
+    # A store still configured for the flat layout finds moved cards ...
+    assert flat.get(ulids[5]).doc_key == "DOC5"
+    # ... and a write through it leaves a single copy.
+    flat.put(make_card(ulids[5], "DOC5", card_version=2))
+    assert CardStore(cards_dir).get(ulids[5]).card_version == 2
+    assert sorted(c.ulid for c in CardStore(cards_dir).cards()) == ulids
+
+    registry = RegistryBuildPlugin(cards_dir=cards_dir, registry_path=registry_path,
+                                   store=CardStore(cards_dir)).run()
+    assert registry.lookup_ulid("DOC11") == ulids[11]
+
+    assert CardStore(cards_dir).migrate("flat") == 11
+    assert len(list(cards_dir.glob("*.yaml"))) == 12
+    assert not [p for p in cards_dir.iterdir() if p.is_dir()]
@@ -31,3 +31,15 @@ def test_validate_card_missing_field_raises() -> None:
     del data["semver"]
     with pytest.raises(Exception):
         validator.card_validator.validate(data)
+
+
+def test_fast_card_validation_agrees_with_schema() -> None:
+    from AUTO_VERSIONING_MOD.core.plugins.id.validate import FastValidator
+
+    validator = FastValidator("id_card")
+    good = MintPlugin().run(doc_key="VAL", semver="1.0.0", owner="QA", contract_type="policy")
+    data = good.to_dict()
+    assert validator._fast is not None and validator._fast(data)
+    for bad in ({**data, "card_version": 0}, {**data, "aliases": [1]},
+                {**data, "mfid": 3}, {**data, "status": "gone"}):
+        assert not validator.is_valid(bad) and validator.errors(bad)
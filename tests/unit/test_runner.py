@@ -19,4 +19,56 @@ def test_update_missing_target_raises(tmp_path):
     except ExecutionError:
         assert True
     else:
-        assert False
\ No newline at end of file
+        assert False
+
+def test_depends_on_orders_items_into_waves(tmp_path):
+    from core.contracts import Plan, PlanItem
+    from core.runner import _apply_plan
+
+    plan = Plan(items=[
+        PlanItem(path="b.txt", action="update", content="b2", depends_on=["a.txt"]),
+        PlanItem(path="a.txt", action="create", content="a"),
+        PlanItem(path="c.txt", action="create", content="c"),
+    ])
+    (tmp_path / "b.txt").write_text("b")
+    result = _apply_plan(str(tmp_path), plan)
+    assert result["waves"] == 2
+    assert (result["created"], result["updated"]) == (2, 1)
+
+
+def test_dependency_cycle_rejected():
+    from core.runner import ValidationError, _validate_plan
+
+    plan = {"items": [
+        {"path": "a.txt", "action": "create", "depends_on": ["b.txt"]},
+        {"path": "b.txt", "action": "create", "depends_on": ["a.txt"]},
+    ]}
+    try:
+        _validate_plan(plan)
+    except ValidationError as exc:
+        assert "a.txt" in str(exc)
+    else:
+        assert False
+
+
+def test_self_dependency_rejected():
+    from core.runner import ValidationError, _validate_plan
+
+    plan = {"items": [{"path": "a.txt", "action": "create", "depends_on": ["a.txt"]}]}
+    try:
+        _validate_plan(plan)
+    except ValidationError as exc:
+        assert "depends on itself" in str(exc)
+    else:
+        assert False
+
+
+def test_malformed_item_raises_runner_validation_error():
+    from core.runner import ValidationError, _validate_plan
+
+    try:
+        _validate_plan({"items": [{"action": "create"}]})
+    except ValidationError as exc:
+        assert "path" in str(exc)
+    else:
+        assert False